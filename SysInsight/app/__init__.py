@@ -53,4 +53,14 @@ def create_app(config_name='development'):
     app.register_blueprint(api_bp, url_prefix='/api')
     app.register_blueprint(health_bp)
 
+    # Start background metrics collection
+    from app.services.system_metrics import system_metrics
+    from app.services.sampler import metrics_sampler
+    from app.services.history import metrics_history
+    system_metrics.configure(app.config)
+    # With a shared collector process, it records history and workers only read
+    metrics_history.configure(app.config, writable=not app.config['METRICS_SHARED_PATH'],
+                              interval=system_metrics.scheduler.tick_interval)
+    metrics_sampler.init_app(app)
+
     return app
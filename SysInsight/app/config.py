@@ -10,7 +10,50 @@ class Config:
 
     # Monitoring settings
     METRICS_INTERVAL = int(os.environ.get('METRICS_INTERVAL', '5'))  # seconds
-    METRICS_RETENTION_DAYS = int(os.environ.get('METRICS_RETENTION_DAYS', '7'))
+    # Expensive collectors (process table) run on this slower schedule;
+    # COLLECTOR_INTERVALS overrides single collectors, e.g. "processes=15"
+    METRICS_SLOW_INTERVAL = int(os.environ.get('METRICS_SLOW_INTERVAL', '30'))
+    COLLECTOR_INTERVALS = os.environ.get('COLLECTOR_INTERVALS', '').split(',')
+    # Sub-interval readings of cpu/memory/disk/network for min/max/avg/p95
+    # per interval (0 disables)
+    METRICS_SUBSAMPLE_MS = int(os.environ.get('METRICS_SUBSAMPLE_MS', '250'))
+    METRICS_RETENTION_DAYS = int(os.environ.get('METRICS_RETENTION_DAYS', '7'))  # raw samples
+    # History is also rolled up to 1-minute and 1-hour buckets, kept longer
+    ROLLUP_1M_RETENTION_DAYS = int(os.environ.get('ROLLUP_1M_RETENTION_DAYS', '30'))
+    ROLLUP_1H_RETENTION_DAYS = int(os.environ.get('ROLLUP_1H_RETENTION_DAYS', '365'))
+    # Hours of every series kept in in-memory ring buffers (per process
+    # serving requests; 0 disables)
+    RECENT_HISTORY_HOURS = float(os.environ.get('RECENT_HISTORY_HOURS', '6'))
+    # Worker processes under gunicorn (set by gunicorn_config.py)
+    GUNICORN_WORKERS = int(os.environ.get('GUNICORN_WORKERS', '1'))
+    # Rolling windows of /api/metrics/summary, seconds (empty disables)
+    SUMMARY_WINDOWS = [int(s) for s in os.environ.get('SUMMARY_WINDOWS', '60,300,900').split(',') if s]
+    ENABLE_BACKGROUND_SAMPLER = os.environ.get('ENABLE_SAMPLER', 'true').lower() == 'true'
+    # Read /proc directly on Linux instead of going through psutil
+    ENABLE_PROC_FASTPATH = os.environ.get('PROC_FASTPATH', 'true').lower() == 'true'
+
+    # Shared collector segment; when set, workers read snapshots from it
+    METRICS_SHARED_PATH = os.environ.get('METRICS_SHARED_PATH', '')
+    METRICS_SHARED_SIZE = int(os.environ.get('METRICS_SHARED_SIZE', str(1024 * 1024)))
+
+    # Disk usage collection: partitions are filtered by fstype and by
+    # mountpoint glob (comma-separated; empty include list means all)
+    DISK_USAGE_INTERVAL = int(os.environ.get('DISK_USAGE_INTERVAL', '30'))  # seconds
+    DISK_INCLUDE_FSTYPES = os.environ.get('DISK_INCLUDE_FSTYPES', '').split(',')
+    DISK_EXCLUDE_FSTYPES = os.environ.get('DISK_EXCLUDE_FSTYPES', 'squashfs,iso9660').split(',')
+    DISK_INCLUDE_MOUNTPOINTS = os.environ.get('DISK_INCLUDE_MOUNTPOINTS', '').split(',')
+    DISK_EXCLUDE_MOUNTPOINTS = os.environ.get('DISK_EXCLUDE_MOUNTPOINTS', '/snap/*,/var/lib/docker/*').split(',')
+
+    # Number of processes kept per sort key for /api/processes
+    PROCESS_TOP_N = int(os.environ.get('PROCESS_TOP_N', '10'))
+
+    # Container cgroups (globs relative to /sys/fs/cgroup) and how often the
+    # hierarchy is walked for new ones; known containers are read every interval
+    CONTAINER_CGROUP_PATTERNS = os.environ.get(
+        'CONTAINER_CGROUP_PATTERNS',
+        'docker/*,*docker-*.scope,*libpod-*.scope,*cri-containerd-*.scope,*crio-*.scope'
+    ).split(',')
+    CONTAINER_RESCAN_INTERVAL = int(os.environ.get('CONTAINER_RESCAN_INTERVAL', '30'))  # seconds
 
     # Alert thresholds (percentage)
     CPU_WARNING_THRESHOLD = float(os.environ.get('CPU_WARNING', '70'))
@@ -19,6 +62,15 @@ class Config:
     MEMORY_CRITICAL_THRESHOLD = float(os.environ.get('MEMORY_CRITICAL', '90'))
     DISK_WARNING_THRESHOLD = float(os.environ.get('DISK_WARNING', '80'))
     DISK_CRITICAL_THRESHOLD = float(os.environ.get('DISK_CRITICAL', '90'))
+    # Pressure stall thresholds (percent of time some task stalled, avg10)
+    PSI_CPU_WARNING_THRESHOLD = float(os.environ.get('PSI_CPU_WARNING', '20'))
+    PSI_CPU_CRITICAL_THRESHOLD = float(os.environ.get('PSI_CPU_CRITICAL', '50'))
+    PSI_MEMORY_WARNING_THRESHOLD = float(os.environ.get('PSI_MEMORY_WARNING', '10'))
+    PSI_MEMORY_CRITICAL_THRESHOLD = float(os.environ.get('PSI_MEMORY_CRITICAL', '30'))
+    PSI_IO_WARNING_THRESHOLD = float(os.environ.get('PSI_IO_WARNING', '20'))
+    PSI_IO_CRITICAL_THRESHOLD = float(os.environ.get('PSI_IO_CRITICAL', '50'))
+    # Evaluate CPU/memory alerts against the 'host' or this container's 'cgroup'
+    ALERT_SCOPE = os.environ.get('ALERT_SCOPE', 'host').lower()
 
     # CORS configuration
     CORS_ORIGINS = os.environ.get('CORS_ORIGINS', '*').split(',')
@@ -28,7 +80,15 @@ class Config:
     ENABLE_ALERTS = os.environ.get('ENABLE_ALERTS', 'false').lower() == 'true'
 
     # Storage settings
+    # 'sqlite' (STORAGE_PATH, with rollups) or 'segments' (append-only
+    # mmap'd files under SEGMENT_PATH, raw samples only)
+    STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'sqlite').lower()
     STORAGE_PATH = os.environ.get('STORAGE_PATH', '/data/metrics.db')
+    SEGMENT_PATH = os.environ.get('SEGMENT_PATH', '/data/segments')
+    # Samples are batched and committed by one writer thread this often
+    STORAGE_FLUSH_INTERVAL = float(os.environ.get('STORAGE_FLUSH_INTERVAL', '5'))  # seconds
+    # Raw samples are compressed in blocks of this many per series (0 keeps rows)
+    STORAGE_CHUNK_SAMPLES = int(os.environ.get('STORAGE_CHUNK_SAMPLES', '120'))
 
 class DevelopmentConfig(Config):
     """Development configuration"""
@@ -45,6 +105,10 @@ class TestingConfig(Config):
     """Testing configuration"""
     TESTING = True
     METRICS_INTERVAL = 1
+    ENABLE_BACKGROUND_SAMPLER = False  # Sample on demand instead
+    METRICS_SHARED_PATH = ''
+    ENABLE_HISTORICAL_STORAGE = False
+    RECENT_HISTORY_HOURS = 0
 
 config_by_name = {
     'development': DevelopmentConfig,
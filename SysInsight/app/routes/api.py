@@ -1,11 +1,23 @@
 """
 API routes for metrics endpoints
 """
-from flask import Blueprint, jsonify, current_app
+import time
+from flask import Blueprint, Response, jsonify, current_app, request, stream_with_context
 from app.services.system_metrics import system_metrics
+from app.services.sampler import metrics_sampler
+from app.services.processes import select_top
+from app.services.containers import check_sort, sort_containers
+from app.services.export import encode_rows
+from app.services.history import metrics_history
+from app.utils.downsample import lttb
 
 api_bp = Blueprint('api', __name__)
 
+# Bounds on the per-series point budget of /metrics/history
+HISTORY_DEFAULT_POINTS = 800
+HISTORY_MAX_POINTS = 10000
+HISTORY_DEFAULT_PERCENTILES = '50,95,99'
+
 @api_bp.route('/metrics/cpu', methods=['GET'])
 def get_cpu():
     """
@@ -15,7 +27,7 @@ def get_cpu():
         JSON response with CPU data
     """
     try:
-        data = system_metrics.get_cpu_metrics()
+        data = metrics_sampler.latest('cpu')
         return jsonify(data), 200
     except Exception as e:
         current_app.logger.error(f"CPU metrics error: {e}")
@@ -30,7 +42,7 @@ def get_memory():
         JSON response with memory data
     """
     try:
-        data = system_metrics.get_memory_metrics()
+        data = metrics_sampler.latest('memory')
         return jsonify(data), 200
     except Exception as e:
         current_app.logger.error(f"Memory metrics error: {e}")
@@ -45,12 +57,27 @@ def get_disk():
         JSON response with disk data
     """
     try:
-        data = system_metrics.get_disk_metrics()
+        data = metrics_sampler.latest('disk')
         return jsonify(data), 200
     except Exception as e:
         current_app.logger.error(f"Disk metrics error: {e}")
         return jsonify({'error': 'Failed to collect disk metrics'}), 500
 
+@api_bp.route('/metrics/network', methods=['GET'])
+def get_network():
+    """
+    Get network metrics
+
+    Returns:
+        JSON response with network interface and TCP data
+    """
+    try:
+        data = metrics_sampler.latest('network')
+        return jsonify(data), 200
+    except Exception as e:
+        current_app.logger.error(f"Network metrics error: {e}")
+        return jsonify({'error': 'Failed to collect network metrics'}), 500
+
 @api_bp.route('/metrics/all', methods=['GET'])
 def get_all():
     """
@@ -60,7 +87,7 @@ def get_all():
         JSON response with all metrics data
     """
     try:
-        data = system_metrics.get_all_metrics()
+        data = metrics_sampler.latest()
 
         # Add alert evaluations if enabled
         if current_app.config['ENABLE_ALERTS']:
@@ -72,6 +99,240 @@ def get_all():
         current_app.logger.error(f"All metrics error: {e}")
         return jsonify({'error': 'Failed to collect metrics'}), 500
 
+@api_bp.route('/host', methods=['GET'])
+def get_host():
+    """
+    Get static host facts (cores, frequency range, RAM/swap and partition
+    sizes, boot time, kernel)
+
+    Returns:
+        JSON response with host data
+    """
+    try:
+        data = system_metrics.get_host_info()
+        return jsonify(data), 200
+    except Exception as e:
+        current_app.logger.error(f"Host info error: {e}")
+        return jsonify({'error': 'Failed to collect host info'}), 500
+
+@api_bp.route('/processes', methods=['GET'])
+def get_processes():
+    """
+    Get the top processes
+
+    Query parameters:
+        sort: cpu (default), memory or io
+        limit: Number of processes (up to PROCESS_TOP_N)
+
+    Returns:
+        JSON response with the top-N process table
+    """
+    sort = request.args.get('sort', 'cpu')
+    limit = request.args.get('limit', type=int)
+    try:
+        data = metrics_sampler.latest('processes')
+        if 'error' in data:
+            return jsonify(data), 500
+        return jsonify({
+            'sort': sort,
+            'processes': select_top(data, sort, limit),
+            'count': data['count'],
+            'running': data['running'],
+            'timestamp': data['timestamp'],
+            'sample_age': data['sample_age']
+        }), 200
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        current_app.logger.error(f"Process metrics error: {e}")
+        return jsonify({'error': 'Failed to collect process metrics'}), 500
+
+@api_bp.route('/containers', methods=['GET'])
+def get_containers():
+    """
+    Get per-container usage from the cgroup hierarchy
+
+    Query parameters:
+        sort: cpu (default), memory or io
+        limit: Number of containers (default all)
+
+    Returns:
+        JSON response with the container table
+    """
+    sort = request.args.get('sort', 'cpu')
+    limit = request.args.get('limit', type=int)
+    try:
+        # Bad arguments are a 400 even on hosts without containers
+        check_sort(sort, limit)
+        data = metrics_sampler.latest('containers')
+        if 'error' in data:
+            return jsonify(data), 500
+        return jsonify({
+            'sort': sort,
+            'containers': sort_containers(data['containers'], sort, limit),
+            'count': data['count'],
+            'timestamp': data['timestamp'],
+            'sample_age': data['sample_age']
+        }), 200
+    except KeyError:
+        # No collector registered: the host has no cgroup v2 hierarchy
+        return jsonify({'error': 'Container metrics require cgroup v2'}), 404
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        current_app.logger.error(f"Container metrics error: {e}")
+        return jsonify({'error': 'Failed to collect container metrics'}), 500
+
+@api_bp.route('/metrics/history', methods=['GET'])
+def get_history():
+    """
+    Get stored series over a time range, downsampled for charting
+
+    Query parameters:
+        series: Comma-separated series names (e.g. cpu.percent,memory.virtual.percent)
+        from: Epoch seconds (default one hour before to)
+        to: Epoch seconds (default now)
+        points: Maximum points per series (default 800)
+        percentiles: Comma-separated percentiles over the whole range
+            (default 50,95,99; empty for none)
+
+    Returns:
+        JSON response with [timestamp, value] pairs and percentiles per series
+    """
+    try:
+        names = [s for s in request.args.get('series', '').split(',') if s]
+        end = int(float(request.args.get('to', time.time())))
+        start = int(float(request.args.get('from', end - 3600)))
+        points = int(request.args.get('points', HISTORY_DEFAULT_POINTS))
+        percentiles = [float(p) for p in request.args.get(
+            'percentiles', HISTORY_DEFAULT_PERCENTILES).split(',') if p]
+        if not names:
+            raise ValueError('series is required')
+        if start > end:
+            raise ValueError('from must not be after to')
+        if not 3 <= points <= HISTORY_MAX_POINTS:
+            raise ValueError(f'points must be between 3 and {HISTORY_MAX_POINTS}')
+        if not all(0 <= p <= 100 for p in percentiles):
+            raise ValueError('percentiles must be between 0 and 100')
+
+        series = {}
+        for name in names:
+            # From memory when recent enough, else the coarsest stored tier
+            # that still gives at least `points` buckets
+            source, timestamps, values = metrics_history.points(
+                name, start, end, (end - start) / points
+            )
+            series[name] = {
+                'tier': source,
+                'stored': len(timestamps),
+                'points': [[timestamps[i], round(values[i], 3)]
+                           for i in lttb(timestamps, values, points)]
+            }
+            if percentiles:
+                # Merged from per-bucket sketches: within 1% of the true value
+                sketch = metrics_history.sketch(name, start, end)
+                quantiles = {}
+                for p in percentiles:
+                    value = sketch.quantile(p / 100) if sketch is not None else None
+                    quantiles[f'p{p:g}'] = round(value, 3) if value is not None else None
+                series[name]['percentiles'] = quantiles
+        return jsonify({'from': start, 'to': end, 'series': series}), 200
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except RuntimeError as e:
+        # Neither the buffer nor ENABLE_HISTORICAL is on
+        return jsonify({'error': str(e)}), 503
+    except Exception as e:
+        current_app.logger.error(f"History query error: {e}")
+        return jsonify({'error': 'Failed to query metric history'}), 500
+
+@api_bp.route('/metrics/export', methods=['GET'])
+def export_history():
+    """
+    Stream stored history as a file download
+
+    Query parameters:
+        series: Comma-separated series names or globs (default all)
+        from: Epoch seconds (default the start of the tier's retention)
+        to: Epoch seconds (default now)
+        tier: raw (default), 1m or 1h
+        format: ndjson (default) or csv
+        gzip: true to compress the stream
+
+    Returns:
+        Streamed NDJSON or CSV rows, one per sample or bucket
+    """
+    try:
+        patterns = [s for s in request.args.get('series', '*').split(',') if s]
+        end = int(float(request.args.get('to', time.time())))
+        start = int(float(request.args.get('from', 0)))
+        fmt = request.args.get('format', 'ndjson')
+        compress = request.args.get('gzip', 'false').lower() == 'true'
+        columns, rows = metrics_history.export(
+            patterns, start, end, request.args.get('tier', 'raw')
+        )
+        chunks = encode_rows(rows, fmt, columns, compress)
+        # Encoding is lazy: pull the first chunk so a bad format fails here
+        first = next(chunks, b'')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except RuntimeError as e:
+        return jsonify({'error': str(e)}), 503
+    except Exception as e:
+        current_app.logger.error(f"History export error: {e}")
+        return jsonify({'error': 'Failed to export metric history'}), 500
+
+    def generate():
+        yield first
+        try:
+            yield from chunks
+        except Exception as e:
+            # Headers are sent: all that is left is to cut the stream short
+            current_app.logger.error(f"History export failed mid-stream: {e}")
+
+    filename = f'sysinsight-{start}-{end}.{fmt}' + ('.gz' if compress else '')
+    mimetype = 'application/gzip' if compress else (
+        'text/csv' if fmt == 'csv' else 'application/x-ndjson')
+    return Response(
+        stream_with_context(generate()), mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename={filename}'}
+    )
+
+@api_bp.route('/metrics/history/memory', methods=['GET'])
+def get_history_memory():
+    """
+    Get the size of the in-memory history buffer
+
+    Returns:
+        JSON response with samples and bytes per series
+    """
+    try:
+        return jsonify(metrics_history.memory_usage()), 200
+    except RuntimeError as e:
+        # RECENT_HISTORY_HOURS is 0
+        return jsonify({'error': str(e)}), 503
+    except Exception as e:
+        current_app.logger.error(f"History memory error: {e}")
+        return jsonify({'error': 'Failed to report history memory'}), 500
+
+@api_bp.route('/metrics/summary', methods=['GET'])
+def get_summary():
+    """
+    Get min/max/mean/stddev/slope of every series over the rolling windows
+
+    Returns:
+        JSON response encoded by the sampler after its last tick
+    """
+    try:
+        # Maintained per sample and encoded once per tick: nothing to compute
+        return Response(metrics_history.summary_json(), mimetype='application/json')
+    except RuntimeError as e:
+        # SUMMARY_WINDOWS is empty
+        return jsonify({'error': str(e)}), 503
+    except Exception as e:
+        current_app.logger.error(f"Summary error: {e}")
+        return jsonify({'error': 'Failed to get metric summary'}), 500
+
 @api_bp.errorhandler(404)
 def api_not_found(error):
     """Handle 404 errors in API"""
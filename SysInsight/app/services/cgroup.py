@@ -0,0 +1,191 @@
+"""
+cgroup v2 metrics
+
+Reads the interface files of a cgroup (cpu.stat, cpu.max, memory.current,
+memory.max, memory.stat, io.stat) and reports usage against its limits, so
+a container limited to 1 CPU / 512M shows how close it is to being
+throttled or OOM-killed rather than how busy the whole host is.
+"""
+import os
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+from app.utils.rates import RateTracker
+
+CGROUP_ROOT = '/sys/fs/cgroup'
+PROC_SELF_CGROUP = '/proc/self/cgroup'
+
+
+def read_file(path: str) -> Optional[str]:
+    """Read a small interface file, or None if it does not exist"""
+    try:
+        with open(path) as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def parse_flat_keyed(data: Optional[str]) -> Dict[str, int]:
+    """
+    Parse "key value" lines (cpu.stat, memory.stat)
+
+    Args:
+        data: File contents
+
+    Returns:
+        Dictionary of key to integer value
+    """
+    values = {}
+    for line in (data or '').splitlines():
+        key, _, value = line.partition(' ')
+        if value:
+            values[key] = int(value)
+    return values
+
+
+def parse_limit(data: Optional[str]) -> Optional[int]:
+    """
+    Parse a single-value limit file (memory.max)
+
+    Returns:
+        The limit, or None when unlimited ('max') or missing
+    """
+    if data is None:
+        return None
+    value = data.strip()
+    return None if value == 'max' else int(value)
+
+
+def parse_cpu_max(data: Optional[str]) -> Optional[float]:
+    """
+    Parse cpu.max ("$QUOTA $PERIOD")
+
+    Returns:
+        Limit in CPUs, or None when unlimited or missing
+    """
+    if data is None:
+        return None
+    quota, _, period = data.strip().partition(' ')
+    if quota == 'max' or not period:
+        return None
+    return int(quota) / int(period)
+
+
+def parse_io_stat(data: Optional[str]) -> Tuple[int, int, int, int]:
+    """
+    Sum io.stat over devices
+
+    Each line is "MAJ:MIN rbytes=.. wbytes=.. rios=.. wios=.. ..."
+
+    Returns:
+        (rbytes, wbytes, rios, wios) totals
+    """
+    totals = {'rbytes': 0, 'wbytes': 0, 'rios': 0, 'wios': 0}
+    for line in (data or '').splitlines():
+        for field in line.split()[1:]:
+            key, _, value = field.partition('=')
+            if key in totals:
+                totals[key] += int(value)
+    return totals['rbytes'], totals['wbytes'], totals['rios'], totals['wios']
+
+
+def own_cgroup_path(root: str = CGROUP_ROOT,
+                    proc_cgroup: str = PROC_SELF_CGROUP) -> Optional[str]:
+    """
+    Find this process's cgroup v2 directory
+
+    Args:
+        root: cgroup2 mount point
+        proc_cgroup: Path of /proc/self/cgroup
+
+    Returns:
+        Directory path, or None if cgroup v2 is not in use
+    """
+    if not os.path.exists(os.path.join(root, 'cgroup.controllers')):
+        return None
+    for line in (read_file(proc_cgroup) or '').splitlines():
+        # Unified hierarchy entry: "0::/path"
+        if line.startswith('0::'):
+            relative = line[3:].strip().strip('/')
+            path = os.path.join(root, relative) if relative else root
+            # With a private cgroup namespace the path may not resolve from
+            # here; the mount itself is then this process's cgroup
+            return path if os.path.isdir(path) else root
+    return None
+
+
+class CgroupMetrics:
+    """Collects usage-against-limit metrics for one cgroup"""
+
+    def __init__(self, path: str, host_cpus: int = None, host_memory: int = None):
+        self.path = path
+        self.host_cpus = host_cpus or os.cpu_count() or 1
+        self.host_memory = host_memory
+        self._rates = RateTracker()
+
+    def _read(self, name: str) -> Optional[str]:
+        return read_file(os.path.join(self.path, name))
+
+    def collect(self, now: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Read the cgroup's interface files
+
+        Args:
+            now: Monotonic time of the reading (defaults to now)
+
+        Returns:
+            Dictionary with cpu, memory and io usage against limits
+        """
+        now = time.monotonic() if now is None else now
+        cpu_stat = parse_flat_keyed(self._read('cpu.stat'))
+        cpu_limit = parse_cpu_max(self._read('cpu.max'))
+        memory_current = parse_limit(self._read('memory.current'))
+        memory_max = parse_limit(self._read('memory.max'))
+        memory_stat = parse_flat_keyed(self._read('memory.stat'))
+        io = parse_io_stat(self._read('io.stat'))
+
+        # CPU: usage in CPUs over the interval, against cpu.max (or the host)
+        cpu = {
+            'limit_cores': round(cpu_limit, 2) if cpu_limit else None,
+            'nr_throttled': cpu_stat.get('nr_throttled', 0),
+            'usage_cores': 0.0, 'percent': 0.0,
+            'throttled_percent': 0.0, 'throttled_ms_s': 0.0
+        }
+        deltas = self._rates.deltas('cpu', (
+            cpu_stat.get('usage_usec', 0), cpu_stat.get('nr_periods', 0),
+            cpu_stat.get('nr_throttled', 0), cpu_stat.get('throttled_usec', 0)
+        ), now)
+        if deltas:
+            (usage_usec, periods, throttled, throttled_usec), elapsed = deltas
+            usage_cores = usage_usec / 1e6 / elapsed
+            cpu['usage_cores'] = round(usage_cores, 3)
+            cpu['percent'] = round(usage_cores / (cpu_limit or self.host_cpus) * 100, 2)
+            cpu['throttled_percent'] = round(throttled / periods * 100, 2) if periods else 0.0
+            cpu['throttled_ms_s'] = round(throttled_usec / 1000 / elapsed, 2)
+
+        # Memory: against memory.max (or host RAM when unlimited)
+        memory_limit = memory_max or self.host_memory
+        memory = {
+            'current_mb': round((memory_current or 0) / (1024**2), 2),
+            'max_mb': round(memory_max / (1024**2), 2) if memory_max else None,
+            'percent': round((memory_current or 0) / memory_limit * 100, 2)
+            if memory_limit else None,
+            'anon_mb': round(memory_stat.get('anon', 0) / (1024**2), 2),
+            'file_mb': round(memory_stat.get('file', 0) / (1024**2), 2)
+        }
+
+        io_rates = self._rates.rates('io', io, now) or (0.0, 0.0, 0.0, 0.0)
+
+        return {
+            'path': self.path,
+            'cpu': cpu,
+            'memory': memory,
+            'io': {
+                'read_mb_s': round(io_rates[0] / (1024**2), 2),
+                'write_mb_s': round(io_rates[1] / (1024**2), 2),
+                'read_iops': round(io_rates[2], 2),
+                'write_iops': round(io_rates[3], 2)
+            },
+            'timestamp': datetime.utcnow().isoformat()
+        }
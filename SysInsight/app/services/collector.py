@@ -0,0 +1,127 @@
+"""
+Shared metrics collector process
+
+Runs one MetricsSampler for the whole server and publishes its snapshots into
+the shared segment at METRICS_SHARED_PATH, so N gunicorn workers cost one
+sampler. Started from the gunicorn master (see gunicorn_config.py) or run
+standalone with ``python -m app.services.collector``.
+"""
+import logging
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+from flask import Config
+
+from app.config import config_by_name
+from app.services.history import metrics_history
+from app.services.sampler import MetricsSampler
+from app.services.shared_snapshot import SharedSnapshotWriter
+from app.services.system_metrics import system_metrics
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def load_config(config_name: str = 'production') -> Config:
+    """
+    Build a standalone config mapping (no Flask app needed)
+
+    Args:
+        config_name: Configuration name (development, testing, production)
+
+    Returns:
+        Config mapping with the same values create_app would load
+    """
+    config = Config(os.getcwd())
+    config.from_object(config_by_name[config_name])
+    return config
+
+
+def run_collector(path: str, config_name: str = 'production'):
+    """
+    Sample and publish until terminated or the parent process exits
+
+    Args:
+        path: Shared segment path
+        config_name: Configuration name
+    """
+    config = load_config(config_name)
+    system_metrics.configure(config)
+    metrics_history.configure(config, writable=True, buffered=False)
+    writer = SharedSnapshotWriter(path, config['METRICS_SHARED_SIZE'])
+    sampler = MetricsSampler(
+        interval=system_metrics.scheduler.tick_interval, writer=writer,
+        subsample_interval=config['METRICS_SUBSAMPLE_MS'] / 1000
+    )
+
+    signal.signal(signal.SIGTERM, lambda signum, frame: sampler.stop())
+    signal.signal(signal.SIGINT, lambda signum, frame: sampler.stop())
+
+    # Exit if the gunicorn master goes away without stopping us
+    parent = os.getppid()
+
+    def watch_parent():
+        while os.getppid() == parent:
+            time.sleep(1)
+        sampler.stop()
+
+    threading.Thread(target=watch_parent, daemon=True).start()
+
+    logger.info(f"Metrics collector publishing to {path}")
+    try:
+        sampler.run()
+    finally:
+        writer.close()
+        metrics_history.close()
+
+
+def start_collector(path: str, config_name: str = 'production') -> subprocess.Popen:
+    """
+    Start the collector as a child process
+
+    A fresh interpreter is used rather than multiprocessing so that gunicorn
+    workers forked later do not inherit (and try to reap) the child.
+
+    Args:
+        path: Shared segment path
+        config_name: Configuration name
+
+    Returns:
+        The started process
+    """
+    env = dict(os.environ, METRICS_SHARED_PATH=path, FLASK_ENV=config_name)
+    return subprocess.Popen(
+        [sys.executable, '-m', 'app.services.collector'],
+        cwd=PROJECT_ROOT,
+        env=env
+    )
+
+
+def stop_collector(process: subprocess.Popen, timeout: float = 5):
+    """
+    Terminate a collector started with start_collector
+
+    Args:
+        process: Collector process
+        timeout: Seconds to wait before killing it
+    """
+    if process.poll() is None:
+        process.terminate()
+        try:
+            process.wait(timeout)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    run_collector(
+        os.environ.get('METRICS_SHARED_PATH', '/dev/shm/sysinsight-metrics'),
+        os.environ.get('FLASK_ENV', 'production')
+    )
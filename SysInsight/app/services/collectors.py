@@ -0,0 +1,197 @@
+"""
+Collector registry and scheduler
+
+Each collector produces one section of the metrics snapshot (cpu, memory,
+disk, ...) and declares its cost; cheap collectors run every
+METRICS_INTERVAL, expensive ones every METRICS_SLOW_INTERVAL, and any
+collector can be given its own interval with COLLECTOR_INTERVALS
+("name=seconds,..."). The scheduler runs whatever is due and merges the
+latest result of every collector into one snapshot with per-section
+timestamps.
+"""
+import logging
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+COST_LOW = 'low'
+COST_HIGH = 'high'
+
+
+class Collector:
+    """A named snapshot section with its own schedule"""
+
+    def __init__(self, name: str, collect: Callable[[], Dict[str, Any]],
+                 cost: str = COST_LOW, interval: Optional[float] = None):
+        if cost not in (COST_LOW, COST_HIGH):
+            raise ValueError(f"cost must be '{COST_LOW}' or '{COST_HIGH}'")
+        self.name = name
+        self.collect = collect
+        self.cost = cost
+        self.interval = interval
+
+
+class CollectorRegistry:
+    """Ordered set of collectors"""
+
+    def __init__(self):
+        self._collectors: Dict[str, Collector] = {}
+
+    def register(self, name: str, collect: Callable[[], Dict[str, Any]],
+                 cost: str = COST_LOW, interval: Optional[float] = None) -> Collector:
+        """
+        Add or replace a collector
+
+        Args:
+            name: Section name in the snapshot
+            collect: Callable returning the section dictionary
+            cost: COST_LOW or COST_HIGH; picks the default interval
+            interval: Fixed interval in seconds, overriding the cost default
+
+        Returns:
+            The registered Collector
+        """
+        collector = Collector(name, collect, cost, interval)
+        self._collectors[name] = collector
+        return collector
+
+    def unregister(self, name: str):
+        """Remove a collector if present"""
+        self._collectors.pop(name, None)
+
+    def get(self, name: str) -> Optional[Collector]:
+        """Look up a collector by name"""
+        return self._collectors.get(name)
+
+    def __iter__(self) -> Iterator[Collector]:
+        return iter(list(self._collectors.values()))
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._collectors
+
+    def __len__(self) -> int:
+        return len(self._collectors)
+
+
+def parse_intervals(entries: Iterable[str]) -> Dict[str, float]:
+    """
+    Parse COLLECTOR_INTERVALS entries
+
+    Args:
+        entries: Strings like 'processes=15'
+
+    Returns:
+        Dictionary of collector name to interval in seconds
+    """
+    intervals = {}
+    for entry in entries:
+        name, sep, value = entry.partition('=')
+        if not sep or not name.strip():
+            continue
+        intervals[name.strip()] = float(value)
+    return intervals
+
+
+class CollectorScheduler:
+    """Runs due collectors and merges their latest results"""
+
+    def __init__(self, registry: CollectorRegistry,
+                 low_interval: float = 5, high_interval: float = 30,
+                 overrides: Optional[Dict[str, float]] = None):
+        self.registry = registry
+        self.low_interval = low_interval
+        self.high_interval = high_interval
+        self.overrides = overrides or {}
+        # name -> (data, collected_at monotonic)
+        self._results: Dict[str, Any] = {}
+        self._next_due: Dict[str, float] = {}
+
+    def interval_for(self, collector: Collector) -> float:
+        """
+        Effective interval of a collector
+
+        Args:
+            collector: Registered collector
+
+        Returns:
+            Seconds between runs
+        """
+        if collector.name in self.overrides:
+            return self.overrides[collector.name]
+        if collector.interval is not None:
+            return collector.interval
+        return self.high_interval if collector.cost == COST_HIGH else self.low_interval
+
+    @property
+    def tick_interval(self) -> float:
+        """Shortest collector interval (how often the sampler should tick)"""
+        return min(
+            (self.interval_for(c) for c in self.registry),
+            default=self.low_interval
+        )
+
+    def run_due(self, now: Optional[float] = None) -> List[str]:
+        """
+        Run every collector whose interval has elapsed
+
+        Args:
+            now: Monotonic time (defaults to now)
+
+        Returns:
+            Names of the collectors that ran
+        """
+        now = time.monotonic() if now is None else now
+        ran = []
+        for collector in self.registry:
+            # Small slack so a tick that wakes a little early still counts
+            if self._next_due.get(collector.name, 0.0) > now + 0.05:
+                continue
+            try:
+                data = collector.collect()
+            except Exception as e:
+                logger.error(f"Collector {collector.name} failed: {e}")
+                data = {'error': str(e), 'timestamp': datetime.utcnow().isoformat()}
+            collected_at = time.monotonic()
+            self._results[collector.name] = (data, collected_at)
+            self._next_due[collector.name] = now + self.interval_for(collector)
+            ran.append(collector.name)
+
+        # Forget collectors that were unregistered
+        for name in [n for n in self._results if n not in self.registry]:
+            del self._results[name]
+            self._next_due.pop(name, None)
+        return ran
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Merge the latest result of every collector
+
+        Returns:
+            Dictionary of section name to data, plus 'timestamp' and a
+            'sections' map with each section's collection time and interval
+        """
+        merged = {}
+        sections = {}
+        for name, (data, collected_at) in self._results.items():
+            merged[name] = data
+            collector = self.registry.get(name)
+            sections[name] = {
+                'collected_at': collected_at,
+                'interval': self.interval_for(collector),
+                'cost': collector.cost
+            }
+        merged['sections'] = sections
+        merged['timestamp'] = datetime.utcnow().isoformat()
+        return merged
+
+    def collect_due(self) -> Dict[str, Any]:
+        """
+        Run due collectors and return the merged snapshot
+
+        Returns:
+            Merged snapshot (see snapshot())
+        """
+        self.run_due()
+        return self.snapshot()
@@ -0,0 +1,197 @@
+"""
+Per-container metrics from the cgroup v2 hierarchy
+
+The hierarchy is walked once per CONTAINER_RESCAN_INTERVAL (or as soon as
+a known container disappears); the directories that match a container
+pattern are cached and only those are read on every sample, so the cost
+grows with the number of containers, not with the size of the tree. The
+walk does not descend into matched directories.
+"""
+import fnmatch
+import os
+import re
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+from app.services.cgroup import CGROUP_ROOT, CgroupMetrics
+
+# Relative cgroup paths that are containers (systemd and cgroupfs drivers);
+# a match must also end in a hex id. Podman and CRI-O put each container's
+# monitor in a sibling <runtime>-conmon-<id>.scope, which is skipped
+DEFAULT_PATTERNS = (
+    'docker/*',
+    '*docker-*.scope',
+    '*libpod-*.scope',
+    '*cri-containerd-*.scope',
+    '*crio-*.scope',
+)
+CONTAINER_ID_RE = re.compile(r'[0-9a-f]{12,64}')
+SORT_KEYS = {
+    'cpu': lambda c: c['cpu']['usage_cores'],
+    'memory': lambda c: c['memory']['current_mb'],
+    'io': lambda c: c['io']['read_mb_s'] + c['io']['write_mb_s'],
+}
+MAX_DEPTH = 6
+
+
+def _full_id(relative_path: str) -> str:
+    name = relative_path.rsplit('/', 1)[-1]
+    if name.endswith('.scope'):
+        name = name[:-len('.scope')].rsplit('-', 1)[-1]
+    return name
+
+
+def container_id(relative_path: str) -> str:
+    """
+    Short container id from a cgroup path
+
+    Args:
+        relative_path: e.g. 'system.slice/docker-<id>.scope' or 'docker/<id>'
+
+    Returns:
+        First 12 characters of the id (like `docker ps`)
+    """
+    return _full_id(relative_path)[:12]
+
+
+class ContainerTable:
+    """Tracks every container cgroup and samples their usage"""
+
+    def __init__(self, root: str = CGROUP_ROOT,
+                 patterns: Iterable[str] = DEFAULT_PATTERNS,
+                 rescan_interval: float = 30,
+                 host_cpus: Optional[int] = None,
+                 host_memory: Optional[int] = None):
+        self.root = root
+        self.patterns = [p for p in patterns if p]
+        self.rescan_interval = rescan_interval
+        self.host_cpus = host_cpus
+        self.host_memory = host_memory
+        # relative path -> CgroupMetrics (keeps that cgroup's counter state)
+        self._cgroups: Dict[str, CgroupMetrics] = {}
+        self._next_rescan = 0.0
+        self.walks = 0
+
+    @classmethod
+    def from_config(cls, config, host_memory: Optional[int] = None) -> 'ContainerTable':
+        """
+        Build a table from the CONTAINER_* settings
+
+        Args:
+            config: Flask config object (or any mapping)
+            host_memory: Host RAM in bytes, for containers without memory.max
+
+        Returns:
+            ContainerTable instance
+        """
+        return cls(
+            patterns=config.get('CONTAINER_CGROUP_PATTERNS', DEFAULT_PATTERNS),
+            rescan_interval=config.get('CONTAINER_RESCAN_INTERVAL', 30),
+            host_memory=host_memory
+        )
+
+    @staticmethod
+    def available(root: str = CGROUP_ROOT) -> bool:
+        """Whether a cgroup v2 hierarchy is mounted at root"""
+        return os.path.exists(os.path.join(root, 'cgroup.controllers'))
+
+    def _matches(self, relative: str) -> bool:
+        if '-conmon-' in relative.rsplit('/', 1)[-1]:
+            return False
+        return CONTAINER_ID_RE.fullmatch(_full_id(relative)) is not None and \
+            any(fnmatch.fnmatchcase(relative, p) for p in self.patterns)
+
+    def _walk(self) -> List[str]:
+        found = []
+        stack = [('', 0)]
+        while stack:
+            relative, depth = stack.pop()
+            try:
+                entries = os.scandir(os.path.join(self.root, relative))
+            except OSError:
+                continue
+            with entries:
+                for entry in entries:
+                    if not entry.is_dir(follow_symlinks=False):
+                        continue
+                    child = f'{relative}/{entry.name}' if relative else entry.name
+                    if self._matches(child):
+                        found.append(child)
+                    elif depth + 1 < MAX_DEPTH:
+                        stack.append((child, depth + 1))
+        return found
+
+    def rescan(self):
+        """Walk the hierarchy and refresh the cached container list"""
+        self.walks += 1
+        found = self._walk()
+        self._cgroups = {
+            relative: self._cgroups.get(relative) or CgroupMetrics(
+                os.path.join(self.root, relative),
+                host_cpus=self.host_cpus, host_memory=self.host_memory
+            )
+            for relative in found
+        }
+        self._next_rescan = time.monotonic() + self.rescan_interval
+
+    def sample(self) -> Dict[str, Any]:
+        """
+        Read every cached container cgroup
+
+        Returns:
+            Dictionary with one row per container
+        """
+        if time.monotonic() >= self._next_rescan:
+            self.rescan()
+
+        now = time.monotonic()
+        containers = []
+        vanished = False
+        for relative, metrics in self._cgroups.items():
+            if not os.path.isdir(metrics.path):
+                vanished = True
+                continue
+            data = metrics.collect(now)
+            del data['timestamp']
+            data['id'] = container_id(relative)
+            data['cgroup'] = relative
+            del data['path']
+            containers.append(data)
+
+        if vanished:
+            # A container stopped: rescan on the next sample to pick up changes
+            self._next_rescan = 0.0
+
+        return {'count': len(containers), 'containers': containers}
+
+
+def check_sort(sort: str, limit: Optional[int]):
+    """
+    Reject an unknown sort key or a negative limit with ValueError
+
+    Args:
+        sort: One of SORT_KEYS
+        limit: Maximum rows (None for all)
+    """
+    if sort not in SORT_KEYS:
+        raise ValueError(f"sort must be one of: {', '.join(SORT_KEYS)}")
+    if limit is not None and limit < 0:
+        raise ValueError('limit must not be negative')
+
+
+def sort_containers(containers: List[Dict[str, Any]], sort: str,
+                    limit: Optional[int]) -> List[Dict[str, Any]]:
+    """
+    Order container rows for display
+
+    Args:
+        containers: Rows from ContainerTable.sample()
+        sort: One of SORT_KEYS
+        limit: Maximum rows (None for all)
+
+    Returns:
+        Sorted (and truncated) list of rows
+    """
+    check_sort(sort, limit)
+    rows = sorted(containers, key=SORT_KEYS[sort], reverse=True)
+    return rows[:limit] if limit is not None else rows
@@ -0,0 +1,165 @@
+"""
+Gorilla-style compression of (timestamp, value) blocks
+
+Follows the encoding of Facebook's Gorilla TSDB (Pelkonen et al., VLDB 2015):
+timestamps as delta-of-delta with variable-length prefixes, so a steady
+sampling interval costs one bit per sample, and each float as the XOR with
+its predecessor, so a repeated value costs one bit and a slowly moving one
+only its changed middle bits.
+
+A chunk is a small header (sample count, first timestamp, first value)
+followed by one bit stream: all timestamp codes, then all value codes. Bits are assembled as '0'/'1' strings and
+converted with int(), which is far faster in CPython than shifting an
+integer bit by bit.
+"""
+import struct
+from typing import List, Sequence, Tuple
+
+# count (u16), first timestamp (u32 epoch seconds), first value (f64)
+HEADER = struct.Struct('>HId')
+MAX_SAMPLES = 0xFFFF
+
+_DOUBLE = struct.Struct('>d')
+_UINT64 = struct.Struct('>Q')
+
+# Delta-of-delta classes: (prefix, value bits, offset added before packing)
+DOD_CLASSES = (
+    ('10', 7, 63),      # -63..64
+    ('110', 9, 255),    # -255..256
+    ('1110', 12, 2047)  # -2047..2048
+)
+DOD_WIDE_PREFIX = '1111'  # anything else, as 64-bit two's complement
+
+
+def _float_bits(value: float) -> int:
+    return _UINT64.unpack(_DOUBLE.pack(value))[0]
+
+
+def encode_chunk(timestamps: Sequence[int], values: Sequence[float]) -> bytes:
+    """
+    Compress a block of samples
+
+    Args:
+        timestamps: Epoch seconds, ascending
+        values: Sample values, same length (at most MAX_SAMPLES)
+
+    Returns:
+        Encoded chunk
+    """
+    count = len(timestamps)
+    if not count:
+        return HEADER.pack(0, 0, 0.0)
+    if count > MAX_SAMPLES:
+        raise ValueError(f'A chunk holds at most {MAX_SAMPLES} samples')
+
+    bits = []
+    put = bits.append
+
+    previous_ts = timestamps[0]
+    previous_delta = 0
+    for ts in timestamps[1:]:
+        delta = ts - previous_ts
+        dod = delta - previous_delta
+        previous_ts = ts
+        previous_delta = delta
+        if dod == 0:
+            put('0')
+            continue
+        for prefix, width, offset in DOD_CLASSES:
+            if -offset <= dod <= offset + 1:
+                put(prefix)
+                put(format(dod + offset, f'0{width}b'))
+                break
+        else:
+            put(DOD_WIDE_PREFIX)
+            put(format(dod & 0xFFFFFFFFFFFFFFFF, '064b'))
+
+    previous = _float_bits(values[0])
+    leading = trailing = -1  # no window yet
+    for value in values[1:]:
+        current = _float_bits(value)
+        xor = current ^ previous
+        previous = current
+        if not xor:
+            put('0')
+            continue
+        new_leading = min(64 - xor.bit_length(), 31)
+        new_trailing = (xor & -xor).bit_length() - 1
+        if leading >= 0 and new_leading >= leading and new_trailing >= trailing:
+            # Fits the previous meaningful-bit window
+            width = 64 - leading - trailing
+            put('10')
+            put(format(xor >> trailing, f'0{width}b'))
+            continue
+        leading, trailing = new_leading, new_trailing
+        width = 64 - leading - trailing
+        put('11')
+        put(format(leading, '05b'))
+        put(format(width & 63, '06b'))  # 64 is stored as 0
+        put(format(xor >> trailing, f'0{width}b'))
+
+    stream = ''.join(bits)
+    padding = -len(stream) % 8
+    stream += '0' * padding
+    body = int(stream, 2).to_bytes(len(stream) // 8, 'big') if stream else b''
+    return HEADER.pack(count, timestamps[0], values[0]) + body
+
+
+def decode_chunk(data: bytes) -> Tuple[List[int], List[float]]:
+    """
+    Decompress a block written by encode_chunk()
+
+    Args:
+        data: Encoded chunk
+
+    Returns:
+        (timestamps, values)
+    """
+    count, ts, first = HEADER.unpack_from(data, 0)
+    if not count:
+        return [], []
+    body = data[HEADER.size:]
+    stream = bin(int.from_bytes(body, 'big'))[2:].zfill(len(body) * 8) if body else ''
+    pos = 0
+
+    timestamps = [ts]
+    delta = 0
+    for _ in range(count - 1):
+        if stream[pos] == '0':
+            pos += 1
+        else:
+            for prefix, width, offset in DOD_CLASSES:
+                if stream.startswith(prefix, pos):
+                    pos += len(prefix)
+                    delta += int(stream[pos:pos + width], 2) - offset
+                    pos += width
+                    break
+            else:
+                pos += len(DOD_WIDE_PREFIX)
+                dod = int(stream[pos:pos + 64], 2)
+                delta += dod - (1 << 64) if dod >> 63 else dod
+                pos += 64
+        ts += delta
+        timestamps.append(ts)
+
+    values = [first]
+    previous = _float_bits(first)
+    unpack = _DOUBLE.unpack
+    pack = _UINT64.pack
+    trailing = width = 0
+    for _ in range(count - 1):
+        if stream[pos] == '0':
+            pos += 1
+            values.append(values[-1])
+            continue
+        if stream[pos + 1] == '1':
+            leading = int(stream[pos + 2:pos + 7], 2)
+            width = int(stream[pos + 7:pos + 13], 2) or 64
+            trailing = 64 - leading - width
+            pos += 13
+        else:
+            pos += 2
+        previous ^= int(stream[pos:pos + width], 2) << trailing
+        pos += width
+        values.append(unpack(pack(previous))[0])
+    return timestamps, values
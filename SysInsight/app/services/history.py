@@ -0,0 +1,404 @@
+"""
+Historical metrics storage
+
+Each snapshot is flattened into numeric series ('cpu.percent',
+'memory.virtual.percent', 'network.interfaces.eth0.bytes_recv_s', ...);
+sections are recorded only when their collector actually ran. Samples are
+queued for a single writer thread that commits them in batches every
+STORAGE_FLUSH_INTERVAL seconds, so the sampler never waits on disk.
+
+Under gunicorn the collector process is the only writer; workers open the
+store to read.
+
+Independently of the store, the last RECENT_HISTORY_HOURS of every series
+are kept in memory (see app.services.recent_history) and recent ranges are
+served from there, and rolling 1/5/15-minute statistics of every series are
+kept up to date (see app.services.rolling_summary).
+"""
+import atexit
+import fnmatch
+import logging
+import queue
+import threading
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from app.services.recent_history import RecentHistory
+from app.services.rolling_summary import RollingSummary
+from app.services.segment_store import SegmentStore
+from app.services.sketch import DDSketch
+from app.services.export import RAW_COLUMNS, ROLLUP_COLUMNS
+from app.services.sqlite_store import DAY, Bucket, SqliteStore
+
+logger = logging.getLogger(__name__)
+
+# Sections that are not time series (per-process rows, metadata)
+SKIP_SECTIONS = {'processes', 'sections', 'alerts', 'timestamp', 'sample_age'}
+SKIP_KEYS = {'timestamp', 'sample_age', 'error'}
+# Field naming a list entry, used in place of its index
+LIST_KEYS = ('name', 'device', 'mountpoint', 'id')
+# Seconds between compactions of raw rows into compressed blocks and
+# between retention sweeps
+COMPACT_INTERVAL = 600
+EXPIRY_INTERVAL = 3600
+
+
+def flatten(data: Any, prefix: str) -> Iterator[Tuple[str, float]]:
+    """
+    Yield the numeric leaves of a snapshot section
+
+    Args:
+        data: Section data (dicts, lists and scalars)
+        prefix: Dotted path of data
+
+    Yields:
+        (series name, value) pairs
+    """
+    if isinstance(data, bool) or data is None:
+        return
+    if isinstance(data, (int, float)):
+        yield prefix, float(data)
+    elif isinstance(data, dict):
+        for key, value in data.items():
+            if key not in SKIP_KEYS:
+                yield from flatten(value, f'{prefix}.{key}')
+    elif isinstance(data, list):
+        for index, item in enumerate(data):
+            label = index
+            if isinstance(item, dict):
+                label = next((item[k] for k in LIST_KEYS if k in item), index)
+            yield from flatten(item, f'{prefix}.{label}')
+
+
+def changed_rows(snapshot: Dict[str, Any],
+                 recorded: Dict[str, float]) -> List[Tuple[int, str, float]]:
+    """
+    Flatten the sections of a snapshot that were collected since the last call
+
+    Args:
+        snapshot: Merged snapshot from the collector scheduler
+        recorded: section -> monotonic collection time already recorded
+            (updated in place)
+
+    Returns:
+        (epoch seconds, series, value) rows
+    """
+    now_wall = time.time()
+    now = time.monotonic()
+    sections = snapshot.get('sections', {})
+    rows = []
+    for name, data in snapshot.items():
+        if name in SKIP_SECTIONS or not isinstance(data, dict) or 'error' in data:
+            continue
+        collected_at = sections.get(name, {}).get('collected_at', now)
+        if recorded.get(name) == collected_at:
+            continue  # not re-collected this tick
+        recorded[name] = collected_at
+        ts = int(now_wall - (now - collected_at))
+        rows.extend((ts, series, value) for series, value in flatten(data, name))
+    return rows
+
+
+def open_store(config):
+    """
+    Open the history backend named by STORAGE_BACKEND
+
+    Args:
+        config: Flask config object (or any mapping)
+
+    Returns:
+        SqliteStore ('sqlite') or SegmentStore ('segments')
+    """
+    backend = config.get('STORAGE_BACKEND', 'sqlite')
+    if backend == 'sqlite':
+        return SqliteStore(
+            config.get('STORAGE_PATH'), config.get('METRICS_RETENTION_DAYS', 7),
+            rollup_retention_days={
+                '1m': config.get('ROLLUP_1M_RETENTION_DAYS', 30),
+                '1h': config.get('ROLLUP_1H_RETENTION_DAYS', 365)
+            },
+            chunk_samples=config.get('STORAGE_CHUNK_SAMPLES', 0)
+        )
+    if backend == 'segments':
+        return SegmentStore(config.get('SEGMENT_PATH'), config.get('METRICS_RETENTION_DAYS', 7))
+    raise ValueError(f"STORAGE_BACKEND must be 'sqlite' or 'segments', not {backend!r}")
+
+
+class HistoryWriter:
+    """Queues samples and writes them to the store in batches"""
+
+    def __init__(self, store, flush_interval: float = 5):
+        self.store = store
+        self.flush_interval = flush_interval
+        self._queue = queue.SimpleQueue()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def put(self, rows: List[Tuple[int, str, float]]):
+        """Queue rows already flattened by changed_rows()"""
+        if rows:
+            self._queue.put(rows)
+
+    def flush(self) -> int:
+        """
+        Write everything queued so far in one transaction
+
+        Returns:
+            Number of rows written
+        """
+        rows = []
+        while True:
+            try:
+                rows.extend(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return self.store.write_batch(rows) if rows else 0
+
+    def start(self):
+        """Start the writer thread"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self.run, name='history-writer', daemon=True)
+        self._thread.start()
+
+    def run(self):
+        """Flush every interval until stop() is called"""
+        last_expiry = 0.0
+        last_compaction = time.monotonic()
+        while not self._stop_event.wait(self.flush_interval):
+            try:
+                self.flush()
+                if time.monotonic() - last_compaction >= COMPACT_INTERVAL:
+                    self.store.compact()
+                    last_compaction = time.monotonic()
+                if time.monotonic() - last_expiry >= EXPIRY_INTERVAL:
+                    self.store.drop_expired()
+                    last_expiry = time.monotonic()
+            except Exception as e:
+                logger.error(f"History write failed: {e}")
+
+    def stop(self, timeout: Optional[float] = None):
+        """Stop the thread and write what is left"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self.flush()
+
+
+class MetricsHistory:
+    """
+    Keeps recent samples in memory, stores snapshots when
+    ENABLE_HISTORICAL_STORAGE is set and serves queries from either
+    """
+
+    def __init__(self):
+        self.store = None
+        self.writer = None
+        self.recent = None
+        self.summary = None
+        # Processes keeping their own buffer (every gunicorn worker)
+        self.processes = 1
+        self._recorded: Dict[str, float] = {}
+
+    @property
+    def enabled(self) -> bool:
+        """Whether a store is open"""
+        return self.store is not None
+
+    def configure(self, config, writable: bool = True, buffered: bool = True,
+                  interval: Optional[float] = None):
+        """
+        Open the store and the in-memory buffer from configuration
+
+        Args:
+            config: Flask config object (or any mapping)
+            writable: Whether this process records samples (False for
+                gunicorn workers, which only read what the collector writes)
+            buffered: Whether this process keeps recent samples and rolling
+                statistics in memory (False for the collector, which serves
+                no requests)
+            interval: Seconds between sampler ticks, which sizes the buffer
+                (defaults to METRICS_INTERVAL; faster collector overrides
+                make the scheduler tick more often)
+        """
+        self.close()
+        hours = config.get('RECENT_HISTORY_HOURS', 0)
+        if buffered and hours > 0:
+            interval = interval or config.get('METRICS_INTERVAL', 5)
+            # Rings keep at most one sample per second
+            self.recent = RecentHistory(hours, max(1.0, interval))
+        # With a shared collector every worker buffers the same samples
+        self.processes = config.get('GUNICORN_WORKERS', 1) \
+            if config.get('METRICS_SHARED_PATH') else 1
+        windows = config.get('SUMMARY_WINDOWS', [])
+        if buffered and windows:
+            self.summary = RollingSummary(windows)
+        if not config.get('ENABLE_HISTORICAL_STORAGE', False):
+            return
+        self.store = open_store(config)
+        if writable:
+            self.writer = HistoryWriter(self.store, config.get('STORAGE_FLUSH_INTERVAL', 5))
+            self.writer.start()
+            atexit.register(self.close)
+
+    @property
+    def buffered(self) -> bool:
+        """Whether this process keeps anything in memory to record into"""
+        return self.recent is not None or self.summary is not None
+
+    def record(self, snapshot: Dict[str, Any]):
+        """Buffer a snapshot and queue it for storage (no-op when neither is on)"""
+        if self.writer is None and not self.buffered:
+            return
+        rows = changed_rows(snapshot, self._recorded)
+        if self.recent is not None:
+            self.recent.extend(rows)
+        if self.summary is not None:
+            # Every tick, so windows expire even when nothing was re-collected
+            self.summary.update(rows)
+        if self.writer is not None:
+            self.writer.put(rows)
+
+    def query(self, series: str, start: int, end: int,
+              resolution: float = 0) -> Tuple[str, List[Bucket]]:
+        """
+        Read one series over a time range from the best tier
+
+        Args:
+            series: Series name
+            start: Epoch seconds, inclusive
+            end: Epoch seconds, inclusive
+            resolution: Coarsest acceptable point spacing in seconds; the
+                coarsest tier (raw, 1m, 1h) that meets it is read
+
+        Returns:
+            (tier name, buckets in time order)
+        """
+        if self.store is None:
+            raise RuntimeError('Historical storage is disabled')
+        tier = self.store.select_tier(start, resolution)
+        return tier.name, self.store.query_tier(series, start, end, tier)
+
+    def points(self, series: str, start: int, end: int,
+               resolution: float = 0) -> Tuple[str, Sequence[int], Sequence[float]]:
+        """
+        Read one series as (timestamp, value) columns, from memory when the
+        buffer reaches back to start and from the store otherwise
+
+        Args:
+            series: Series name
+            start: Epoch seconds, inclusive
+            end: Epoch seconds, inclusive
+            resolution: Coarsest acceptable point spacing in seconds (store only)
+
+        Returns:
+            (source, timestamps, values); source is 'memory' or the store
+            tier, and the columns may be views into the buffer
+        """
+        recent = self.recent
+        if recent is not None and (self.store is None or recent.covers(series, start)):
+            timestamps, values = recent.window(series, start, end)
+            return 'memory', timestamps, values
+        tier, buckets = self.query(series, start, end, resolution)
+        return tier, [b.ts for b in buckets], [b.avg for b in buckets]
+
+    def sketch(self, series: str, start: int, end: int) -> Optional[DDSketch]:
+        """
+        Quantile sketch of one series over a time range, from the same
+        source points() would read
+
+        Args:
+            series: Series name
+            start: Epoch seconds, inclusive
+            end: Epoch seconds, inclusive
+
+        Returns:
+            Sketch (see app.services.sketch), or None if the store has no
+            complete sketches for the range
+        """
+        recent = self.recent
+        if recent is not None and (self.store is None or recent.covers(series, start)):
+            sketch = DDSketch()
+            sketch.update(recent.window(series, start, end)[1])
+            return sketch
+        if self.store is None:
+            raise RuntimeError('Historical storage is disabled')
+        return self.store.sketch(series, start, end)
+
+    def export(self, patterns: Iterable[str], start: int, end: int,
+               tier_name: str = 'raw') -> Tuple[Tuple[str, ...], Iterator[Tuple]]:
+        """
+        Select series for export and return a lazy row iterator
+
+        Rows are read one series-day at a time, days in order, so only one
+        day of one series is in memory however long the range is.
+
+        Args:
+            patterns: Series names or globs (e.g. 'cpu.*')
+            start: Epoch seconds, inclusive (clamped to the tier's retention)
+            end: Epoch seconds, inclusive
+            tier_name: 'raw', '1m' or '1h'
+
+        Returns:
+            (column names after series and ts, iterator of rows)
+        """
+        if self.store is None:
+            raise RuntimeError('Historical storage is disabled')
+        store = self.store
+        tier = store.tier(tier_name)
+        known = store.series_names()
+        names = [n for n in known if any(fnmatch.fnmatchcase(n, p) for p in patterns)]
+        start = max(start, int(time.time()) - tier.retention_days * DAY)
+        columns = RAW_COLUMNS if tier.resolution == 0 else ROLLUP_COLUMNS
+
+        def rows():
+            for day_start in range(start - start % DAY, end + 1, DAY):
+                low, high = max(start, day_start), min(end, day_start + DAY - 1)
+                for name in names:
+                    for b in store.query_tier(name, low, high, tier):
+                        if tier.resolution == 0:
+                            yield name, b.ts, b.avg
+                        else:
+                            yield name, b.ts, b.min, b.max, b.avg, b.count, b.last
+
+        return columns, rows()
+
+    def memory_usage(self) -> Dict[str, Any]:
+        """
+        Per-series size of the in-memory buffer (see RecentHistory.memory_usage)
+
+        Returns:
+            This process's usage, plus the number of processes holding a
+            buffer and their combined total_bytes
+        """
+        if self.recent is None:
+            raise RuntimeError('In-memory history is disabled')
+        usage = self.recent.memory_usage()
+        usage['processes'] = self.processes
+        usage['all_processes_bytes'] = usage['total_bytes'] * self.processes
+        return usage
+
+    def summary_json(self) -> bytes:
+        """Rolling statistics of every series, already encoded (see RollingSummary)"""
+        summary = self.summary
+        if summary is None:
+            raise RuntimeError('Rolling statistics are disabled')
+        return summary.body
+
+    def close(self):
+        """Flush pending samples, close the store and drop the buffers"""
+        if self.writer is not None:
+            self.writer.stop(timeout=5)
+            self.writer = None
+        if self.store is not None:
+            self.store.close()
+            self.store = None
+        self.recent = None
+        self.summary = None
+        self._recorded = {}
+
+
+# Create history instance
+metrics_history = MetricsHistory()
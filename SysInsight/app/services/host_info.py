@@ -0,0 +1,57 @@
+"""
+Static host facts
+
+Values that do not change while the host is up (core counts, frequency
+range, RAM/swap size, boot time, kernel, partition sizes) are collected once
+at startup and served from /api/host, so per-sample payloads only carry
+values that change.
+"""
+import platform
+import socket
+from datetime import datetime
+from typing import Any, Dict
+
+import psutil
+
+
+def collect_host_info(service) -> Dict[str, Any]:
+    """
+    Collect static host facts
+
+    Args:
+        service: SystemMetricsService (for its counter reader and partitions)
+
+    Returns:
+        Dictionary with host facts
+    """
+    mem = service.reader.memory()
+    freq = psutil.cpu_freq()
+    boot_time = psutil.boot_time()
+
+    return {
+        'hostname': socket.gethostname(),
+        'os': platform.system(),
+        'kernel': platform.release(),
+        'architecture': platform.machine(),
+        'boot_time': datetime.utcfromtimestamp(boot_time).isoformat(),
+        'cpu': {
+            'physical': psutil.cpu_count(logical=False),
+            'logical': psutil.cpu_count(logical=True),
+            'min_mhz': round(freq.min, 2) if freq else None,
+            'max_mhz': round(freq.max, 2) if freq else None
+        },
+        'memory': {
+            'total_gb': round(mem['total'] / (1024**3), 2),
+            'swap_total_gb': round(mem['swap_total'] / (1024**3), 2)
+        },
+        'partitions': [
+            {
+                'device': entry['device'],
+                'mountpoint': entry['mountpoint'],
+                'fstype': entry['fstype'],
+                'total_gb': round(entry['usage']['total'] / (1024**3), 2)
+            }
+            for entry in service.partitions.partitions()
+        ],
+        'timestamp': datetime.utcnow().isoformat()
+    }
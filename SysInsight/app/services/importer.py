@@ -0,0 +1,189 @@
+"""
+Bulk loading of history exports (see app.services.export)
+
+Rows are parsed lazily and written in large transactions without touching
+the rollups; rows may come in any order. Once everything is loaded, the
+rollup buckets over the loaded range of each series are rebuilt from what
+is stored, so they are exact even if the same export was loaded twice.
+"""
+import csv
+import gzip
+import json
+import time
+from functools import partial
+from typing import Any, Dict, IO, Iterator, Optional, Tuple
+
+from app.services.export import RAW_COLUMNS, ROLLUP_COLUMNS
+
+FORMAT_EXTENSIONS = {'.csv': 'csv', '.ndjson': 'ndjson', '.jsonl': 'ndjson', '.json': 'ndjson'}
+GZIP_MAGIC = b'\x1f\x8b'
+
+
+def open_export(path: str) -> IO[str]:
+    """Open an export as text, decompressing gzip files"""
+    with open(path, 'rb') as f:
+        compressed = f.read(2) == GZIP_MAGIC
+    if compressed:
+        return gzip.open(path, 'rt', encoding='utf-8', newline='')
+    return open(path, 'r', encoding='utf-8', newline='')
+
+
+def detect_format(path: str) -> str:
+    """
+    Guess an export's format from its name
+
+    Args:
+        path: e.g. 'export.csv.gz'
+
+    Returns:
+        'ndjson' or 'csv'
+    """
+    name = path[:-3] if path.endswith('.gz') else path
+    for extension, fmt in FORMAT_EXTENSIONS.items():
+        if name.endswith(extension):
+            return fmt
+    raise ValueError(f'Cannot tell the format of {path}; pass --format')
+
+
+def parse_export(stream: IO[str], fmt: str) -> Tuple[Tuple[str, ...], Iterator[Tuple]]:
+    """
+    Read an export's columns and a lazy row iterator
+
+    Args:
+        stream: Text stream from open_export()
+        fmt: 'ndjson' or 'csv'
+
+    Returns:
+        (columns after series and ts, iterator of (ts, series, *columns)
+        tuples, or None for each row that cannot be parsed)
+    """
+    if fmt == 'csv':
+        reader = csv.reader(stream)
+        header = next(reader, None) or []
+        columns = tuple(header[2:])
+
+        def rows():
+            raw = columns == RAW_COLUMNS
+            for record in reader:
+                try:
+                    if raw:
+                        yield int(record[1]), record[0], float(record[2])
+                    else:
+                        series, ts, low, high, avg, count, last = record
+                        yield (int(ts), series, float(low), float(high), float(avg),
+                               int(count), float(last))
+                except (ValueError, IndexError):
+                    yield None
+    elif fmt == 'ndjson':
+        first = stream.readline()
+        record = json.loads(first) if first.strip() else {}
+        columns = tuple(k for k in record if k not in ('series', 'ts'))
+
+        def rows():
+            raw = columns == RAW_COLUMNS
+            lines = iter(stream)
+            line = first
+            while line:
+                try:
+                    record = json.loads(line)
+                    ts, series = int(record['ts']), record['series']
+                    if not isinstance(series, str):
+                        raise TypeError('series must be a string')
+                    # Converted as the CSV rows are: null or text values are unreadable
+                    if raw:
+                        yield ts, series, float(record['value'])
+                    else:
+                        yield (ts, series, float(record['min']), float(record['max']),
+                               float(record['avg']), int(record['count']), float(record['last']))
+                except (ValueError, KeyError, TypeError):
+                    if line.strip():
+                        yield None
+                line = next(lines, '')
+    else:
+        raise ValueError("format must be 'ndjson' or 'csv'")
+
+    if columns not in (RAW_COLUMNS, ROLLUP_COLUMNS):
+        raise ValueError(f'Unrecognised export columns: {", ".join(columns) or "none"}')
+    return columns, rows()
+
+
+class HistoryImporter:
+    """Loads parsed exports into a store and rebuilds rollups at the end"""
+
+    def __init__(self, store, batch_size: int = 100000):
+        self.store = store
+        self.batch_size = batch_size
+        # tier name -> series -> (first, last) epoch seconds loaded
+        self.ranges: Dict[str, Dict[str, Tuple[int, int]]] = {}
+        self.rows = 0
+        self.skipped = 0
+        self.elapsed = 0.0
+
+    def load(self, columns: Tuple[str, ...], rows: Iterator[Optional[Tuple]],
+             tier: Optional[str] = None) -> int:
+        """
+        Write parsed rows in batches
+
+        Args:
+            columns: Columns from parse_export()
+            rows: Rows from parse_export()
+            tier: '1m' or '1h' for rollup exports (raw exports need none)
+
+        Returns:
+            Number of rows written
+        """
+        if columns == RAW_COLUMNS:
+            if tier not in (None, 'raw'):
+                raise ValueError('This export holds raw samples, not rollup buckets')
+            tier = 'raw'
+            write = partial(self.store.write_batch, rollups=False)
+        else:
+            if tier not in ('1m', '1h'):
+                raise ValueError('Rollup exports need their tier (1m or 1h)')
+            self.store.tier(tier)
+            write = partial(self.store.write_buckets, tier)
+
+        ranges = self.ranges.setdefault(tier, {})
+        began = time.perf_counter()
+        written = 0
+        batch = []
+        for row in rows:
+            if row is None:
+                self.skipped += 1
+                continue
+            batch.append(row)
+            ts, name = row[0], row[1]
+            span = ranges.get(name)
+            if span is None:
+                ranges[name] = (ts, ts)
+            elif ts < span[0] or ts > span[1]:
+                ranges[name] = (min(ts, span[0]), max(ts, span[1]))
+            if len(batch) >= self.batch_size:
+                written += write(batch)
+                batch = []
+        if batch:
+            written += write(batch)
+        self.rows += written
+        self.elapsed += time.perf_counter() - began
+        return written
+
+    def finish(self) -> Dict[str, Any]:
+        """
+        Rebuild rollups over everything loaded, compact and apply retention
+
+        Returns:
+            Dictionary with rows, skipped, buckets rebuilt, seconds and rows/s
+        """
+        began = time.perf_counter()
+        buckets = sum(self.store.rebuild_rollups(ranges, source=tier)
+                      for tier, ranges in self.ranges.items())
+        self.store.compact()
+        self.store.drop_expired()
+        self.elapsed += time.perf_counter() - began
+        return {
+            'rows': self.rows,
+            'skipped': self.skipped,
+            'buckets': buckets,
+            'seconds': round(self.elapsed, 2),
+            'rows_per_s': round(self.rows / self.elapsed) if self.elapsed else 0
+        }
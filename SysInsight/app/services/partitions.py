@@ -0,0 +1,191 @@
+"""
+Cached partition list and disk usage
+
+The partition list is only rebuilt when the mount table changes (the kernel
+flags /proc/self/mountinfo with POLLPRI on every mount/umount), and each
+mount's statvfs() is refreshed on its own DISK_USAGE_INTERVAL schedule.
+"""
+import fnmatch
+import os
+import select
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import psutil
+
+MOUNTINFO = '/proc/self/mountinfo'
+
+
+class MountWatcher:
+    """Reports whether the mount table changed since the last check"""
+
+    def __init__(self, path: str = MOUNTINFO, fallback_interval: float = 30):
+        self.fallback_interval = fallback_interval
+        self._poller = None
+        self._fd = None
+        self._last_check = time.monotonic()
+        try:
+            self._fd = os.open(path, os.O_RDONLY)
+            self._poller = select.poll()
+            self._poller.register(self._fd, select.POLLPRI | select.POLLERR)
+        except (OSError, AttributeError):
+            # Not Linux (no mountinfo or no poll): rebuild on a timer instead
+            self.close()
+
+    def changed(self) -> bool:
+        """
+        Check for mount table changes without blocking
+
+        Returns:
+            True if mounts were added or removed since the last call
+        """
+        if self._poller is not None:
+            return bool(self._poller.poll(0))
+
+        now = time.monotonic()
+        if now - self._last_check >= self.fallback_interval:
+            self._last_check = now
+            return True
+        return False
+
+    def close(self):
+        """Release the mountinfo descriptor"""
+        if self._fd is not None:
+            os.close(self._fd)
+        self._fd = None
+        self._poller = None
+
+
+def _matches(value: str, patterns: Iterable[str]) -> bool:
+    return any(fnmatch.fnmatchcase(value, pattern) for pattern in patterns)
+
+
+def statvfs_usage(mountpoint: str) -> Dict[str, float]:
+    """
+    Read filesystem usage with the same semantics as psutil.disk_usage
+
+    Args:
+        mountpoint: Mounted path
+
+    Returns:
+        Dictionary with total/used/free bytes and percent
+    """
+    st = os.statvfs(mountpoint)
+    total = st.f_blocks * st.f_frsize
+    free = st.f_bavail * st.f_frsize
+    used = (st.f_blocks - st.f_bfree) * st.f_frsize
+    # Percent of space available to unprivileged users, like df
+    usable = used + free
+    return {
+        'total': total,
+        'used': used,
+        'free': free,
+        'percent': used / usable * 100 if usable else 0.0
+    }
+
+
+class PartitionCache:
+    """Filtered partition list with per-mount usage refresh schedules"""
+
+    def __init__(self, usage_interval: float = 30,
+                 include_fstypes: Iterable[str] = (),
+                 exclude_fstypes: Iterable[str] = (),
+                 include_mountpoints: Iterable[str] = (),
+                 exclude_mountpoints: Iterable[str] = (),
+                 watcher: Optional[MountWatcher] = None,
+                 list_partitions: Optional[Callable[[], List[Any]]] = None):
+        self.usage_interval = usage_interval
+        self.include_fstypes = [f for f in include_fstypes if f]
+        self.exclude_fstypes = [f for f in exclude_fstypes if f]
+        self.include_mountpoints = [m for m in include_mountpoints if m]
+        self.exclude_mountpoints = [m for m in exclude_mountpoints if m]
+        self.watcher = watcher or MountWatcher(fallback_interval=usage_interval)
+        self.list_partitions = list_partitions or (lambda: psutil.disk_partitions(all=False))
+        # mountpoint -> {'device', 'mountpoint', 'fstype', 'usage', 'next_refresh'}
+        self._entries = None
+
+    @classmethod
+    def from_config(cls, config) -> 'PartitionCache':
+        """
+        Build a cache from the DISK_* settings
+
+        Args:
+            config: Flask config object (or any mapping)
+
+        Returns:
+            PartitionCache instance
+        """
+        return cls(
+            usage_interval=config.get('DISK_USAGE_INTERVAL', 30),
+            include_fstypes=config.get('DISK_INCLUDE_FSTYPES', ()),
+            exclude_fstypes=config.get('DISK_EXCLUDE_FSTYPES', ()),
+            include_mountpoints=config.get('DISK_INCLUDE_MOUNTPOINTS', ()),
+            exclude_mountpoints=config.get('DISK_EXCLUDE_MOUNTPOINTS', ())
+        )
+
+    def wanted(self, fstype: str, mountpoint: str) -> bool:
+        """
+        Apply the include/exclude filters
+
+        Args:
+            fstype: Filesystem type
+            mountpoint: Mounted path
+
+        Returns:
+            True if the mount should be reported
+        """
+        if self.include_fstypes and fstype not in self.include_fstypes:
+            return False
+        if fstype in self.exclude_fstypes:
+            return False
+        if self.include_mountpoints and not _matches(mountpoint, self.include_mountpoints):
+            return False
+        return not _matches(mountpoint, self.exclude_mountpoints)
+
+    def _rebuild(self):
+        old = self._entries or {}
+        entries = {}
+        for partition in self.list_partitions():
+            if partition.mountpoint in entries or \
+                    not self.wanted(partition.fstype, partition.mountpoint):
+                continue
+            # Keep usage of mounts that survived so they stay on schedule
+            entries[partition.mountpoint] = old.get(partition.mountpoint) or {
+                'device': partition.device,
+                'mountpoint': partition.mountpoint,
+                'fstype': partition.fstype,
+                'usage': None,
+                'next_refresh': 0.0
+            }
+        self._entries = entries
+
+    def partitions(self) -> List[Dict[str, Any]]:
+        """
+        Get usage for every cached partition
+
+        Rebuilds the list only if the mount table changed and only calls
+        statvfs() for mounts whose refresh is due.
+
+        Returns:
+            List of partition entries with a 'usage' dictionary
+        """
+        if self._entries is None or self.watcher.changed():
+            self._rebuild()
+
+        now = time.monotonic()
+        result = []
+        for entry in self._entries.values():
+            if now >= entry['next_refresh']:
+                try:
+                    entry['usage'] = statvfs_usage(entry['mountpoint'])
+                except OSError:
+                    # Permission denied or mount vanished; retry when due again
+                    entry['usage'] = None
+                entry['next_refresh'] = now + self.usage_interval
+            if entry['usage'] is not None:
+                result.append(entry)
+        return result
+
+    def close(self):
+        """Release the mount watcher"""
+        self.watcher.close()
@@ -0,0 +1,90 @@
+"""
+Pressure Stall Information (PSI)
+
+/proc/pressure/{cpu,memory,io} report the share of time tasks were stalled
+waiting for a resource ('some': at least one task, 'full': all non-idle
+tasks at once). Unlike utilisation this shows contention: a box at 70% CPU
+can still have runnable tasks queueing. The kernel's avg10/avg60/avg300 are
+passed through, and the cumulative 'total' (microseconds) is turned into a
+stall percentage over the collection interval.
+"""
+import os
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from app.services.cgroup import read_file
+from app.utils.rates import RateTracker
+
+PRESSURE_ROOT = '/proc/pressure'
+RESOURCES = ('cpu', 'memory', 'io')
+
+
+def parse_pressure(data: Optional[str]) -> Dict[str, Dict[str, float]]:
+    """
+    Parse a PSI file
+
+    Each line is "some|full avg10=0.12 avg60=0.05 avg300=0.01 total=12345"
+
+    Args:
+        data: File contents
+
+    Returns:
+        Dictionary of line kind ('some', 'full') to its fields; 'total' is
+        an integer in microseconds
+    """
+    lines = {}
+    for line in (data or '').splitlines():
+        kind, *fields = line.split()
+        values = {}
+        for field in fields:
+            key, _, value = field.partition('=')
+            values[key] = int(value) if key == 'total' else float(value)
+        lines[kind] = values
+    return lines
+
+
+class PressureMetrics:
+    """Collects PSI averages and stall rates for cpu, memory and io"""
+
+    def __init__(self, root: str = PRESSURE_ROOT):
+        self.root = root
+        self._rates = RateTracker()
+
+    @staticmethod
+    def available(root: str = PRESSURE_ROOT) -> bool:
+        """Whether the kernel exposes PSI (CONFIG_PSI, not disabled at boot)"""
+        return read_file(os.path.join(root, 'cpu')) is not None
+
+    def collect(self, now: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Read every PSI file
+
+        Args:
+            now: Monotonic time of the reading (defaults to now)
+
+        Returns:
+            Dictionary of resource to {'some': ..., 'full': ...} with avg10,
+            avg60, avg300, total_ms and stall_percent
+        """
+        now = time.monotonic() if now is None else now
+        data = {}
+        for resource in RESOURCES:
+            lines = parse_pressure(read_file(os.path.join(self.root, resource)))
+            if not lines:
+                continue
+            section = {}
+            for kind, values in lines.items():
+                total = values.get('total', 0)
+                rates = self._rates.rates(f'{resource}.{kind}', (total,), now)
+                section[kind] = {
+                    'avg10': values.get('avg10', 0.0),
+                    'avg60': values.get('avg60', 0.0),
+                    'avg300': values.get('avg300', 0.0),
+                    'total_ms': total // 1000,
+                    # usec stalled per second of wall time, as a percentage
+                    'stall_percent': round(min(rates[0] / 1e4, 100.0), 2) if rates else 0.0
+                }
+            data[resource] = section
+        data['timestamp'] = datetime.utcnow().isoformat()
+        return data
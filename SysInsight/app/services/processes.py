@@ -0,0 +1,251 @@
+"""
+Top-N process table
+
+Keeps per-PID state between samples so CPU% and I/O rates are cheap deltas,
+and only builds result rows for the processes that make a top-N list.
+
+On Linux each process costs one read of /proc/<pid>/stat plus one of
+/proc/<pid>/io (skipped for PIDs that already refused it); static facts
+(name, user) are looked up once per PID. Elsewhere psutil.process_iter()
+with attrs batches the reads in oneshot() and reuses its cached Process
+objects, so only new PIDs pay for a full lookup.
+"""
+import heapq
+import os
+import sys
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import psutil
+
+try:
+    import pwd
+except ImportError:  # Windows
+    pwd = None
+
+DYNAMIC_ATTRS = ['cpu_times', 'memory_info', 'io_counters', 'status']
+SORT_KEYS = {
+    'cpu': lambda s: s.cpu_percent,
+    'memory': lambda s: s.rss,
+    'io': lambda s: s.read_rate + s.write_rate,
+}
+PROC_STATUS = {
+    b'R': psutil.STATUS_RUNNING, b'S': psutil.STATUS_SLEEPING,
+    b'D': psutil.STATUS_DISK_SLEEP, b'Z': psutil.STATUS_ZOMBIE,
+    b'T': psutil.STATUS_STOPPED, b't': psutil.STATUS_TRACING_STOP,
+    b'X': psutil.STATUS_DEAD, b'I': psutil.STATUS_IDLE,
+}
+
+# (pid, identity, name, status, cpu seconds, rss bytes, (read, write) or None)
+RawProcess = Tuple[int, Any, Optional[str], str, Optional[float], int, Optional[Tuple[int, int]]]
+
+
+class ProcessState:
+    """Per-PID data carried between samples"""
+
+    __slots__ = (
+        'pid', 'ident', 'proc', 'name', 'username', 'status', 'io_denied',
+        'cpu_total', 'io_total', 'sampled_at',
+        'cpu_percent', 'rss', 'read_rate', 'write_rate'
+    )
+
+    def __init__(self, pid: int, ident: Any, name: Optional[str]):
+        self.pid = pid
+        self.ident = ident
+        self.proc = None
+        self.name = name
+        self.username = None
+        self.status = None
+        self.io_denied = False
+        self.cpu_total = None
+        self.io_total = None
+        self.sampled_at = None
+        self.cpu_percent = self.rss = self.read_rate = self.write_rate = 0.0
+
+    def update(self, status: str, cpu_total: Optional[float], rss: int,
+               io_total: Optional[Tuple[int, int]], now: float):
+        """Record a reading and derive rates from the previous one"""
+        self.status = status
+        self.rss = rss
+        self.cpu_percent = self.read_rate = self.write_rate = 0.0
+        if self.sampled_at is not None and now > self.sampled_at:
+            elapsed = now - self.sampled_at
+            if cpu_total is not None and self.cpu_total is not None:
+                self.cpu_percent = max(cpu_total - self.cpu_total, 0.0) / elapsed * 100
+            if io_total is not None and self.io_total is not None:
+                self.read_rate = max(io_total[0] - self.io_total[0], 0) / elapsed
+                self.write_rate = max(io_total[1] - self.io_total[1], 0) / elapsed
+        self.cpu_total = cpu_total
+        self.io_total = io_total
+        self.sampled_at = now
+
+
+class ProcessTable:
+    """Samples all processes and reports the top N by CPU, memory and I/O"""
+
+    def __init__(self, top_n: int = 10, use_proc: bool = True):
+        self.top_n = top_n
+        self.use_proc = use_proc and sys.platform.startswith('linux') and \
+            os.path.exists('/proc/self/stat')
+        self._states: Dict[int, ProcessState] = {}
+        self._mem_total = psutil.virtual_memory().total
+        self._usernames: Dict[int, Optional[str]] = {}
+        if self.use_proc:
+            self._tick = float(os.sysconf('SC_CLK_TCK'))
+            self._page_size = os.sysconf('SC_PAGE_SIZE')
+
+    def _scan_proc(self) -> Iterator[RawProcess]:
+        tick = self._tick
+        page_size = self._page_size
+        states = self._states
+        for entry in os.listdir('/proc'):
+            if not entry.isdigit():
+                continue
+            try:
+                fd = os.open(f'/proc/{entry}/stat', os.O_RDONLY)
+                try:
+                    data = os.read(fd, 1024)
+                finally:
+                    os.close(fd)
+            except OSError:
+                continue  # exited
+
+            pid = int(entry)
+            # comm may contain spaces and parentheses: split after the last ')'
+            comm_end = data.rfind(b')')
+            fields = data[comm_end + 2:].split(None, 22)
+            starttime = fields[19]
+            state = states.get(pid)
+
+            io_total = None
+            if state is None or state.ident != starttime or not state.io_denied:
+                try:
+                    fd = os.open(f'/proc/{entry}/io', os.O_RDONLY)
+                    try:
+                        # rchar wchar syscr syscw read_bytes write_bytes ...
+                        tokens = os.read(fd, 512).split()
+                    finally:
+                        os.close(fd)
+                    io_total = (int(tokens[9]), int(tokens[11]))
+                except (OSError, IndexError):
+                    io_total = False  # not readable (other user's process)
+
+            yield (
+                pid, starttime,
+                data[data.find(b'(') + 1:comm_end].decode(errors='replace'),
+                PROC_STATUS.get(fields[0], '?'),
+                (int(fields[11]) + int(fields[12])) / tick,
+                int(fields[21]) * page_size,
+                io_total
+            )
+
+    def _scan_psutil(self) -> Iterator[RawProcess]:
+        for proc in psutil.process_iter(attrs=DYNAMIC_ATTRS, ad_value=None):
+            info = proc.info
+            cpu_times = info['cpu_times']
+            mem = info['memory_info']
+            io = info['io_counters']
+            state = self._states.get(proc.pid)
+            if state is None or state.ident != proc:
+                # New PID (or reused by a new process): name fetched once
+                try:
+                    name = proc.name()
+                except psutil.Error:
+                    name = None
+            else:
+                name = state.name
+            yield (
+                proc.pid, proc, name, info['status'],
+                cpu_times.user + cpu_times.system if cpu_times else None,
+                mem.rss if mem else 0,
+                (io.read_bytes, io.write_bytes) if io else None
+            )
+
+    def _username(self, state: ProcessState) -> Optional[str]:
+        if state.username is None:
+            try:
+                if state.proc is not None:
+                    state.username = state.proc.username()
+                elif pwd is not None:
+                    uid = os.stat(f'/proc/{state.pid}').st_uid
+                    if uid not in self._usernames:
+                        try:
+                            self._usernames[uid] = pwd.getpwuid(uid).pw_name
+                        except KeyError:
+                            # uid with no passwd entry (common in containers)
+                            self._usernames[uid] = str(uid)
+                    state.username = self._usernames[uid]
+            except (OSError, psutil.Error, KeyError):
+                pass
+        return state.username
+
+    def _row(self, state: ProcessState) -> Dict[str, Any]:
+        return {
+            'pid': state.pid,
+            'name': state.name,
+            'username': self._username(state),
+            'status': state.status,
+            'cpu_percent': round(state.cpu_percent, 2),
+            'rss_mb': round(state.rss / (1024**2), 2),
+            'memory_percent': round(state.rss / self._mem_total * 100, 2),
+            'read_kb_s': round(state.read_rate / 1024, 2),
+            'write_kb_s': round(state.write_rate / 1024, 2)
+        }
+
+    def sample(self) -> Dict[str, Any]:
+        """
+        Sample every process once
+
+        Returns:
+            Dictionary with process counts and top-N lists per sort key
+        """
+        states = self._states
+        fresh = {}
+        now = time.monotonic()
+        scan = self._scan_proc() if self.use_proc else self._scan_psutil()
+
+        for pid, ident, name, status, cpu_total, rss, io_total in scan:
+            state = states.get(pid)
+            if state is None or state.ident != ident:
+                # New PID (or reused by a new process)
+                state = ProcessState(pid, ident, name)
+                if not self.use_proc:
+                    state.proc = ident
+            if io_total is False:
+                state.io_denied = True
+                io_total = None
+            state.update(status, cpu_total, rss, io_total, now)
+            fresh[pid] = state
+
+        # Exited processes drop out here
+        self._states = fresh
+        alive = fresh.values()
+
+        return {
+            'count': len(fresh),
+            'running': sum(1 for s in alive if s.status == psutil.STATUS_RUNNING),
+            'top': {
+                key: [self._row(s) for s in heapq.nlargest(self.top_n, alive, key=sort_key)]
+                for key, sort_key in SORT_KEYS.items()
+            }
+        }
+
+
+def select_top(processes: Dict[str, Any], sort: str, limit: Optional[int]) -> List[Dict[str, Any]]:
+    """
+    Pick a top-N list from a process sample
+
+    Args:
+        processes: Result of ProcessTable.sample()
+        sort: One of SORT_KEYS
+        limit: Maximum rows (None for all collected)
+
+    Returns:
+        List of process rows
+    """
+    if sort not in SORT_KEYS:
+        raise ValueError(f"sort must be one of: {', '.join(SORT_KEYS)}")
+    if limit is not None and limit < 0:
+        raise ValueError('limit must not be negative')
+    rows = processes['top'][sort]
+    return rows[:limit] if limit is not None else rows
@@ -0,0 +1,197 @@
+"""
+In-memory ring buffers holding the last RECENT_HISTORY_HOURS of every series
+
+Each series is a pair of flat arrays (uint32 epoch seconds, float64 values),
+12 bytes per sample, allocated once at full size and overwritten
+oldest-first. Range reads return memoryview slices of the arrays when the
+range does not straddle the wrap point, so recent-history requests are
+answered without copying; a view read while the sampler wraps over its
+oldest end may pick up the newest samples there.
+
+A series whose newest sample is older than the buffer (a container or
+interface that went away) has its ring dropped, so churn does not grow it.
+"""
+import bisect
+import math
+import sys
+import threading
+import time
+from array import array
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+
+# Integer epoch seconds fit in 32 bits until 2106
+TS_TYPECODE = 'I'
+VALUE_TYPECODE = 'd'
+SAMPLE_BYTES = array(TS_TYPECODE).itemsize + array(VALUE_TYPECODE).itemsize
+
+
+class SeriesRing:
+    """Fixed-capacity, time-ordered ring of (timestamp, value) samples"""
+
+    __slots__ = ('capacity', 'timestamps', 'values', 'head', 'size')
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        # Allocated up front and never resized, so memoryviews handed to
+        # readers stay valid while the sampler keeps appending
+        self.timestamps = array(TS_TYPECODE, bytes(capacity * array(TS_TYPECODE).itemsize))
+        self.values = array(VALUE_TYPECODE, bytes(capacity * array(VALUE_TYPECODE).itemsize))
+        # Next slot to write; the oldest sample once the ring is full
+        self.head = 0
+        self.size = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    @property
+    def newest(self) -> Optional[int]:
+        """Timestamp of the latest sample"""
+        if not self.size:
+            return None
+        return self.timestamps[self.head - 1]
+
+    @property
+    def oldest(self) -> Optional[int]:
+        """Timestamp of the earliest sample still held"""
+        if not self.size:
+            return None
+        return self.timestamps[self.head if self.size == self.capacity else 0]
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the sample arrays"""
+        return sys.getsizeof(self.timestamps) + sys.getsizeof(self.values)
+
+    def append(self, ts: int, value: float):
+        """
+        Add a sample, overwriting the oldest when full
+
+        Samples must arrive in time order: one with the same timestamp as
+        the newest replaces it and an older one is dropped.
+        """
+        newest = self.newest
+        if newest is not None and ts <= newest:
+            if ts == newest:
+                self.values[self.head - 1] = value
+            return
+        self.timestamps[self.head] = ts
+        self.values[self.head] = value
+        self.head = (self.head + 1) % self.capacity
+        if self.size < self.capacity:
+            self.size += 1
+
+    def _segments(self) -> Iterable[Tuple[int, int]]:
+        # Physical index ranges in time order
+        if self.size < self.capacity:
+            yield 0, self.size
+            return
+        if self.head:
+            yield self.head, self.capacity
+        yield 0, self.head or self.capacity
+
+    def window(self, start: int, end: int) -> Tuple[Sequence[int], Sequence[float]]:
+        """
+        Samples between two timestamps
+
+        Args:
+            start: Epoch seconds, inclusive
+            end: Epoch seconds, inclusive
+
+        Returns:
+            (timestamps, values): memoryviews into the ring when the range
+            is contiguous in memory, otherwise new arrays
+        """
+        ts = self.timestamps
+        parts = []
+        for low, high in self._segments():
+            first = bisect.bisect_left(ts, start, low, high)
+            last = bisect.bisect_right(ts, end, low, high)
+            if first < last:
+                parts.append((first, last))
+        if len(parts) == 1:
+            first, last = parts[0]
+            return memoryview(ts)[first:last], memoryview(self.values)[first:last]
+
+        timestamps = array(TS_TYPECODE)
+        values = array(VALUE_TYPECODE)
+        for first, last in parts:
+            timestamps.extend(ts[first:last])
+            values.extend(self.values[first:last])
+        return timestamps, values
+
+
+class RecentHistory:
+    """A SeriesRing per series, sized to cover a number of hours"""
+
+    def __init__(self, hours: float, interval: float):
+        """
+        Args:
+            hours: How far back to keep samples
+            interval: Expected seconds between samples of a series
+        """
+        self.hours = hours
+        self.capacity = max(1, math.ceil(hours * 3600 / interval))
+        self._rings: Dict[str, SeriesRing] = {}
+        # Guards creating and dropping rings; appends come from the single
+        # sampler thread
+        self._lock = threading.Lock()
+
+    def extend(self, rows: Iterable[Tuple[int, str, float]], now: Optional[float] = None):
+        """
+        Add samples and drop the rings of series that stopped reporting
+
+        Args:
+            rows: (epoch seconds, series name, value) tuples
+            now: Epoch seconds (defaults to now)
+        """
+        rings = self._rings
+        for ts, series, value in rows:
+            ring = rings.get(series)
+            if ring is None:
+                with self._lock:
+                    ring = rings.setdefault(series, SeriesRing(self.capacity))
+            ring.append(ts, value)
+
+        cutoff = (time.time() if now is None else now) - self.hours * 3600
+        stale = [name for name, ring in rings.items() if ring.newest < cutoff]
+        if stale:
+            with self._lock:
+                for name in stale:
+                    del rings[name]
+
+    def covers(self, series: str, start: int) -> bool:
+        """Whether the buffer holds a series back to start"""
+        ring = self._rings.get(series)
+        return ring is not None and len(ring) > 0 and start >= ring.oldest
+
+    def window(self, series: str, start: int,
+               end: int) -> Tuple[Sequence[int], Sequence[float]]:
+        """
+        Samples of one series between two timestamps (see SeriesRing.window)
+        """
+        ring = self._rings.get(series)
+        if ring is None:
+            return (), ()
+        return ring.window(start, end)
+
+    def memory_usage(self) -> Dict[str, object]:
+        """
+        Memory held by the buffers
+
+        Returns:
+            Dictionary with per-series samples and bytes and the total
+        """
+        with self._lock:
+            rings = sorted(self._rings.items())
+        series = {
+            name: {'samples': len(ring), 'bytes': ring.nbytes}
+            for name, ring in rings
+        }
+        return {
+            'hours': self.hours,
+            'capacity': self.capacity,
+            'series_count': len(series),
+            'bytes_per_sample': SAMPLE_BYTES,
+            'total_bytes': sum(s['bytes'] for s in series.values()),
+            'series': series
+        }
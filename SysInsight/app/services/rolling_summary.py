@@ -0,0 +1,174 @@
+"""
+Rolling-window statistics of every series
+
+For each series and each window (1, 5 and 15 minutes by default) the
+sampler keeps the window's samples in a deque, the candidates for its
+minimum and maximum in two monotonic deques, and running sums of t, x, t^2,
+t*x and x^2. Adding a sample and expiring old ones is amortised O(1), and
+min/max/mean/stddev/slope are read straight off the deque fronts and sums.
+
+The sums are taken relative to an origin sample, so that epoch seconds and
+large counters do not cancel out in the variance and the regression. Once
+the origin has left the window the sums are recomputed from the samples
+against a new origin, which also clears any rounding drift from subtracting
+expired samples; that happens once per window length, so it stays O(1) per
+sample amortised.
+
+After each update the whole summary is serialised to JSON once, so serving
+/api/metrics/summary costs nothing per request.
+"""
+import json
+import time
+from collections import deque
+from typing import Any, Dict, Iterable, Optional, Sequence, Tuple
+
+DEFAULT_WINDOWS = (60, 300, 900)
+
+
+def window_label(seconds: int) -> str:
+    """'1m' for 60 seconds, '90s' for 90"""
+    return f'{seconds // 60}m' if seconds % 60 == 0 else f'{seconds}s'
+
+
+class RollingWindow:
+    """Statistics of one series over the last `seconds` seconds"""
+
+    __slots__ = ('seconds', 'samples', 'mins', 'maxs', 't0', 'x0',
+                 'n', 'st', 'sx', 'stt', 'stx', 'sxx')
+
+    def __init__(self, seconds: int):
+        self.seconds = seconds
+        self.samples = deque()
+        # (ts, value) with values ascending (mins) or descending (maxs): the
+        # front is the extreme, later entries are the next candidates
+        self.mins = deque()
+        self.maxs = deque()
+        self._reset(0, 0.0)
+
+    def _reset(self, t0: int, x0: float):
+        self.t0 = t0
+        self.x0 = x0
+        self.n = 0
+        self.st = self.sx = self.stt = self.stx = self.sxx = 0.0
+
+    def _accumulate(self, ts: int, value: float, sign: int):
+        t = ts - self.t0
+        x = value - self.x0
+        self.n += sign
+        self.st += sign * t
+        self.sx += sign * x
+        self.stt += sign * t * t
+        self.stx += sign * t * x
+        self.sxx += sign * x * x
+
+    def add(self, ts: int, value: float):
+        """Append a sample (timestamps must not go backwards)"""
+        if not self.samples:
+            self._reset(ts, value)
+        self.samples.append((ts, value))
+        mins, maxs = self.mins, self.maxs
+        while mins and mins[-1][1] >= value:
+            mins.pop()
+        mins.append((ts, value))
+        while maxs and maxs[-1][1] <= value:
+            maxs.pop()
+        maxs.append((ts, value))
+        self._accumulate(ts, value, 1)
+
+    def expire(self, now: float):
+        """Drop samples older than the window"""
+        cutoff = now - self.seconds
+        samples = self.samples
+        while samples and samples[0][0] <= cutoff:
+            ts, value = samples.popleft()
+            self._accumulate(ts, value, -1)
+        while self.mins and self.mins[0][0] <= cutoff:
+            self.mins.popleft()
+        while self.maxs and self.maxs[0][0] <= cutoff:
+            self.maxs.popleft()
+
+        if not samples:
+            self._reset(0, 0.0)
+        elif samples[0][0] - self.t0 > self.seconds:
+            # Origin has left the window: re-base on the oldest sample
+            self._reset(*samples[0])
+            for ts, value in samples:
+                self._accumulate(ts, value, 1)
+
+    def stats(self) -> Optional[Dict[str, Any]]:
+        """
+        Current statistics
+
+        Returns:
+            count, min, max, mean, stddev (population) and slope (least
+            squares, units per second; None below two distinct timestamps),
+            or None when the window is empty
+        """
+        n = self.n
+        if not n:
+            return None
+        mean = self.sx / n
+        variance = max(0.0, self.sxx / n - mean * mean)
+        spread = n * self.stt - self.st * self.st
+        slope = (n * self.stx - self.st * self.sx) / spread if spread > 0 else None
+        return {
+            'count': n,
+            'min': round(self.mins[0][1], 3),
+            'max': round(self.maxs[0][1], 3),
+            'mean': round(self.x0 + mean, 3),
+            'stddev': round(variance ** 0.5, 3),
+            'slope': round(slope, 6) if slope is not None else None
+        }
+
+
+class RollingSummary:
+    """Rolling windows of every series, served as pre-encoded JSON"""
+
+    def __init__(self, windows: Sequence[int] = DEFAULT_WINDOWS):
+        """
+        Args:
+            windows: Window lengths in seconds
+        """
+        self.windows = tuple(sorted(windows))
+        self.labels = tuple(window_label(seconds) for seconds in self.windows)
+        self._series: Dict[str, Tuple[RollingWindow, ...]] = {}
+        self.body = self._encode(time.time())
+
+    def update(self, rows: Iterable[Tuple[int, str, float]], now: Optional[float] = None):
+        """
+        Add samples, expire old ones and re-encode the summary
+
+        Args:
+            rows: (epoch seconds, series, value) rows, as history records them
+            now: Epoch seconds (defaults to now)
+        """
+        now = time.time() if now is None else now
+        series = self._series
+        for ts, name, value in rows:
+            windows = series.get(name)
+            if windows is None:
+                windows = series[name] = tuple(RollingWindow(s) for s in self.windows)
+            for window in windows:
+                if not window.samples or ts >= window.samples[-1][0]:
+                    window.add(ts, value)
+        for name in list(series):
+            windows = series[name]
+            for window in windows:
+                window.expire(now)
+            # The longest window empties last
+            if not windows[-1].samples:
+                del series[name]
+        self.body = self._encode(now)
+
+    def _encode(self, now: float) -> bytes:
+        return json.dumps({
+            'timestamp': round(now, 3),
+            'windows': dict(zip(self.labels, self.windows)),
+            'series': {
+                name: dict(zip(self.labels, (window.stats() for window in windows)))
+                for name, windows in self._series.items()
+            }
+        }, separators=(',', ':')).encode()
+
+    def __len__(self) -> int:
+        return len(self._series)
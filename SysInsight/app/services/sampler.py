@@ -0,0 +1,217 @@
+"""
+Background metrics sampler
+
+Collects system metrics on a daemon thread every METRICS_INTERVAL seconds and
+keeps the latest snapshot in memory so API requests never wait on psutil.
+Between ticks it takes sub-interval readings every METRICS_SUBSAMPLE_MS so
+each interval also reports min/max/avg/p95.
+
+When METRICS_SHARED_PATH is set, a single collector process (see
+app.services.collector) samples for all gunicorn workers and publishes into
+a shared-memory segment; the sampler in each worker only reads from it, plus
+a follower thread that copies each published snapshot into the worker's
+in-memory history buffer and rolling statistics.
+"""
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from app.services.history import metrics_history
+from app.services.shared_snapshot import SharedSnapshotReader
+from app.services.system_metrics import system_metrics
+
+logger = logging.getLogger(__name__)
+
+
+class MetricsSampler:
+    """Periodically collects metrics and serves the most recent snapshot"""
+
+    def __init__(self, collect: Optional[Callable[[], Dict[str, Any]]] = None,
+                 interval: float = 5, writer=None,
+                 subsample: Optional[Callable[[], None]] = None,
+                 subsample_interval: float = 0):
+        self.collect = collect or system_metrics.collect_due
+        self.interval = interval
+        # Seconds between sub-interval readings (0 disables them)
+        self.subsample = subsample or system_metrics.subsample
+        self.subsample_interval = subsample_interval
+        self.writer = writer
+        self.reader = None
+        # (metrics, monotonic time of collection), replaced atomically
+        self._latest = None
+        self._sample_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._follower = None
+
+    def init_app(self, app):
+        """
+        Configure the sampler from a Flask app and start it if enabled
+
+        Args:
+            app: Flask application instance
+        """
+        # Tick as often as the most frequent collector
+        self.interval = system_metrics.scheduler.tick_interval
+        self.subsample_interval = app.config['METRICS_SUBSAMPLE_MS'] / 1000
+        if app.config['METRICS_SHARED_PATH']:
+            self.reader = SharedSnapshotReader(app.config['METRICS_SHARED_PATH'])
+            if metrics_history.buffered:
+                self.follow(app.config['METRICS_SHARED_PATH'])
+        elif app.config['ENABLE_BACKGROUND_SAMPLER']:
+            self.start()
+
+    @property
+    def running(self) -> bool:
+        """Whether the background thread is alive"""
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Start the background sampling thread"""
+        if self.running:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self.run, name='metrics-sampler', daemon=True
+        )
+        self._thread.start()
+
+    def follow(self, path: str):
+        """
+        Record snapshots published by the collector into this process's
+        history buffer on a background thread
+
+        Args:
+            path: Shared segment path
+        """
+        if self._follower is not None and self._follower.is_alive():
+            return
+        self._stop_event.clear()
+        self._follower = threading.Thread(
+            target=self._follow, args=(SharedSnapshotReader(path),),
+            name='history-follower', daemon=True
+        )
+        self._follower.start()
+
+    def _follow(self, reader: SharedSnapshotReader):
+        # Own reader: the request threads share self.reader
+        while not self._stop_event.wait(self.interval):
+            try:
+                shared = reader.read()
+                if shared is not None:
+                    # Sections already recorded are skipped by collection time
+                    metrics_history.record(shared[0])
+            except Exception as e:
+                logger.error(f"Following shared snapshots failed: {e}")
+        reader.close()
+
+    def stop(self, timeout: Optional[float] = None):
+        """Stop the background sampling and follower threads"""
+        self._stop_event.set()
+        for thread in (self._thread, self._follower):
+            if thread is not None:
+                thread.join(timeout)
+        self._thread = None
+        self._follower = None
+
+    def run(self):
+        """Sample every interval until stop() is called"""
+        while not self._stop_event.is_set():
+            next_tick = time.monotonic() + self.interval
+            self.sample_once()
+            if self.subsample_interval > 0:
+                self._subsample_until(next_tick)
+            self._stop_event.wait(max(0.0, next_tick - time.monotonic()))
+
+    def _subsample_until(self, deadline: float):
+        # Stop before the next tick is due so ticks do not drift
+        while not self._stop_event.wait(self.subsample_interval):
+            if time.monotonic() + self.subsample_interval > deadline:
+                return
+            try:
+                self.subsample()
+            except Exception as e:
+                logger.error(f"Sub-interval sampling failed: {e}")
+                return
+
+    def sample_once(self):
+        """Collect one snapshot and publish it"""
+        with self._sample_lock:
+            try:
+                data = self.collect()
+            except Exception as e:
+                logger.error(f"Metrics sampling failed: {e}")
+                return
+            sampled_at = time.monotonic()
+            self._latest = (data, sampled_at)
+            # Queued for the history writer thread; never blocks on disk
+            metrics_history.record(data)
+
+            # Still under the lock: the shared segment has a single writer
+            if self.writer is not None:
+                try:
+                    self.writer.publish(data, sampled_at)
+                except Exception as e:
+                    logger.error(f"Publishing shared snapshot failed: {e}")
+
+    def _current(self):
+        if self.reader is not None:
+            shared = self.reader.read()
+            # Use the collector's sample unless it is missing or stale
+            # (collector not started yet or dead)
+            if shared is not None and \
+                    time.monotonic() - shared[1] < 3 * self.interval:
+                return shared
+
+        latest = self._latest
+        if latest is None or (not self.running and
+                              time.monotonic() - latest[1] >= self.interval):
+            # No background thread (tests, debug reloader): sample on demand
+            self.sample_once()
+            latest = self._latest
+        return latest
+
+    def latest(self, section: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Get the latest snapshot
+
+        Args:
+            section: Optional top-level key (cpu, memory, disk, ...)
+
+        Returns:
+            Shallow copy of the snapshot (or section) with a sample_age field
+            in seconds; for a section the age is that section's own
+        """
+        latest = self._current()
+        if latest is None:
+            raise RuntimeError('No metrics sample available')
+
+        data, sampled_at = latest
+        now = time.monotonic()
+        sections = data.get('sections', {})
+
+        if section:
+            result = dict(data[section])
+            if section in sections:
+                sampled_at = sections[section]['collected_at']
+            result['sample_age'] = round(now - sampled_at, 3)
+            return result
+
+        result = dict(data)
+        result['sample_age'] = round(now - sampled_at, 3)
+        if sections:
+            # Replace monotonic collection times with ages
+            result['sections'] = {
+                name: {
+                    'age': round(now - meta['collected_at'], 3),
+                    'interval': meta['interval'],
+                    'cost': meta['cost']
+                }
+                for name, meta in sections.items()
+            }
+        return result
+
+
+# Create sampler instance
+metrics_sampler = MetricsSampler()
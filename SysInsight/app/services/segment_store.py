@@ -0,0 +1,302 @@
+"""
+Append-only segment files for history, read through mmap
+
+An alternative to the SQLite store (STORAGE_BACKEND=segments). Each UTC day
+is a directory under SEGMENT_PATH holding one segment file per series
+(named by the URL-quoted series name), and each file is a run of fixed-width
+records (u32 epoch seconds, f64 value) appended by the single writer.
+
+Readers in any process map the files read-only and never lock: a record is
+only counted once the file size covers it, and files only grow. Each reader
+keeps a sparse index per segment, the min and max timestamp of every block
+of BLOCK_RECORDS records, so a range read binary-searches the blocks and
+only unpacks the few it needs; completed blocks never change, so the index
+is extended, not rebuilt, as the file grows. Late samples may be appended
+out of order; the index stays exact because it bounds each block by both
+ends.
+
+Retention unlinks whole days. There are no rollup tiers: every query,
+percentiles included, reads raw samples.
+"""
+import bisect
+import mmap
+import os
+import shutil
+import struct
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import quote, unquote
+
+from app.services.sketch import DDSketch
+from app.services.sqlite_store import DAY, RAW, Bucket, Tier, partition_name, partition_day
+
+RECORD = struct.Struct('<Id')
+BLOCK_RECORDS = 256
+SUFFIX = '.seg'
+
+
+class Segment:
+    """A reader's view of one segment file"""
+
+    __slots__ = ('path', 'mm', 'count', 'block_min', 'block_max', 'run_max', 'suffix_min')
+
+    def __init__(self, path: str):
+        self.path = path
+        self.mm = None
+        self.count = 0
+        # Per completed block
+        self.block_min: List[int] = []
+        self.block_max: List[int] = []
+        # Running max of block_max (ascending) and min of block_min over each
+        # block and all after it (ascending), for bisecting both range ends
+        self.run_max: List[int] = []
+        self.suffix_min: List[int] = []
+
+    def refresh(self) -> bool:
+        """
+        Map records appended since the last call
+
+        Returns:
+            False if the file is gone or empty
+        """
+        try:
+            size = os.stat(self.path).st_size
+        except FileNotFoundError:
+            self.close()
+            return False
+        count = size // RECORD.size
+        if not count:
+            return False
+        if self.mm is None or count * RECORD.size > len(self.mm):
+            self.close()
+            with open(self.path, 'rb') as f:
+                self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            # Size at mapping time; anything appended later waits for a remap
+            count = len(self.mm) // RECORD.size
+        self.count = count
+
+        blocks = count // BLOCK_RECORDS
+        if blocks > len(self.block_min):
+            for block in range(len(self.block_min), blocks):
+                timestamps = [ts for ts, _ in self._records(
+                    block * BLOCK_RECORDS, (block + 1) * BLOCK_RECORDS)]
+                low, high = min(timestamps), max(timestamps)
+                self.block_min.append(low)
+                self.block_max.append(high)
+                self.run_max.append(max(high, self.run_max[-1]) if self.run_max else high)
+            suffix = []
+            low = None
+            for value in reversed(self.block_min):
+                low = value if low is None or value < low else low
+                suffix.append(low)
+            self.suffix_min = suffix[::-1]
+        return True
+
+    def _records(self, first: int, last: int) -> List[Tuple[int, float]]:
+        with memoryview(self.mm) as view:
+            return list(RECORD.iter_unpack(view[first * RECORD.size:last * RECORD.size]))
+
+    def read(self, start: int, end: int) -> List[Tuple[int, float]]:
+        """
+        Records between two timestamps, in file order
+
+        Args:
+            start: Epoch seconds, inclusive
+            end: Epoch seconds, inclusive
+        """
+        if not self.refresh():
+            return []
+        blocks = len(self.block_min)
+        # Blocks [first, last) can hold matches; the incomplete tail always may
+        first = bisect.bisect_left(self.run_max, start)
+        last = bisect.bisect_right(self.suffix_min, end)
+        if last < blocks:
+            ranges = [(first * BLOCK_RECORDS, last * BLOCK_RECORDS),
+                      (blocks * BLOCK_RECORDS, self.count)]
+        else:
+            ranges = [(first * BLOCK_RECORDS, self.count)]
+        return [
+            record
+            for low, high in ranges if low < high
+            for record in self._records(low, high)
+            if start <= record[0] <= end
+        ]
+
+    def close(self):
+        """Unmap the file"""
+        if self.mm is not None:
+            self.mm.close()
+            self.mm = None
+
+
+class SegmentStore:
+    """Per-day, per-series append-only segment files"""
+
+    def __init__(self, path: str, retention_days: int = 7):
+        """
+        Args:
+            path: Directory holding the day directories
+            retention_days: Days of samples kept
+        """
+        self.path = path
+        self.tiers = (RAW._replace(retention_days=retention_days),)
+        os.makedirs(path, exist_ok=True)
+        self._local = threading.local()
+
+    def tier(self, name: str) -> Tier:
+        """Look up a tier by name (only 'raw')"""
+        for tier in self.tiers:
+            if tier.name == name:
+                return tier
+        raise ValueError(f"tier must be one of: {', '.join(t.name for t in self.tiers)}")
+
+    def _day_dir(self, day: str) -> str:
+        return os.path.join(self.path, day)
+
+    def _segment_path(self, day: str, name: str) -> str:
+        return os.path.join(self.path, day, quote(name, safe='') + SUFFIX)
+
+    def _append(self, path: str, data: bytes):
+        # Opened per batch: keeping a descriptor per series would run into
+        # RLIMIT_NOFILE on hosts with many disks, interfaces or containers
+        try:
+            fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        except FileNotFoundError:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, data)
+        finally:
+            os.close(fd)
+
+    def write_batch(self, rows: Iterable[Tuple[int, str, float]], rollups: bool = True) -> int:
+        """
+        Append samples to their day's segments (writer only)
+
+        Args:
+            rows: (epoch seconds, series name, value) tuples, in any order
+            rollups: Ignored (there are no rollups)
+
+        Returns:
+            Number of rows written
+        """
+        by_segment = defaultdict(list)
+        for ts, name, value in rows:
+            by_segment[(partition_name(ts, '', DAY), name)].append((ts, value))
+
+        count = 0
+        for (day, name), points in by_segment.items():
+            # Stable: of two samples at the same second the later stays last
+            points.sort(key=lambda point: point[0])
+            self._append(self._segment_path(day, name),
+                         b''.join(RECORD.pack(ts, value) for ts, value in points))
+            count += len(points)
+        return count
+
+    def write_buckets(self, tier_name: str, rows) -> int:
+        """Rollup buckets have nowhere to go in this backend"""
+        raise ValueError('The segments backend stores raw samples only')
+
+    def rebuild_rollups(self, ranges: Dict[str, Tuple[int, int]], source: str = 'raw') -> int:
+        """Nothing to rebuild: there are no rollups"""
+        return 0
+
+    def compact(self, now: Optional[float] = None) -> int:
+        """Nothing to compact: segments are written in their final form"""
+        return 0
+
+    def _days(self) -> List[str]:
+        try:
+            return sorted(d for d in os.listdir(self.path) if d.isdigit())
+        except FileNotFoundError:
+            return []
+
+    def drop_expired(self, now: Optional[float] = None) -> List[str]:
+        """
+        Unlink days older than the retention (writer only)
+
+        Args:
+            now: Epoch seconds (defaults to now)
+
+        Returns:
+            Names of the dropped days
+        """
+        now = time.time() if now is None else now
+        cutoff = now - self.tiers[0].retention_days * DAY
+        dropped = []
+        for day in self._days():
+            if partition_day(day) + DAY > cutoff:
+                continue
+            # Readers that still map a file keep their pages until they unmap
+            shutil.rmtree(self._day_dir(day), ignore_errors=True)
+            dropped.append(day)
+        return dropped
+
+    def select_tier(self, start: int, resolution: float, now: Optional[float] = None) -> Tier:
+        """Every query reads raw samples"""
+        return self.tiers[0]
+
+    def series_names(self) -> List[str]:
+        """Names of every stored series"""
+        names = set()
+        for day in self._days():
+            names.update(unquote(f[:-len(SUFFIX)])
+                         for f in os.listdir(self._day_dir(day)) if f.endswith(SUFFIX))
+        return sorted(names)
+
+    def _segments(self) -> Dict[str, Segment]:
+        # Each thread keeps its own maps and indexes
+        segments = getattr(self._local, 'segments', None)
+        if segments is None:
+            segments = self._local.segments = {}
+        return segments
+
+    def _unmap_expired(self, segments: Dict[str, Segment]):
+        # Unmap days dropped by the writer so their disk space is freed
+        cutoff = partition_name(int(time.time()) - self.tiers[0].retention_days * DAY, '', DAY)
+        for path in [p for p in segments if os.path.basename(os.path.dirname(p)) < cutoff]:
+            segments.pop(path).close()
+
+    def query(self, name: str, start: int, end: int) -> List[Tuple[int, float]]:
+        """
+        Read one series over a time range
+
+        Args:
+            name: Series name
+            start: Epoch seconds, inclusive
+            end: Epoch seconds, inclusive
+
+        Returns:
+            (epoch seconds, value) tuples in time order; of two samples at
+            the same second, the later written wins
+        """
+        segments = self._segments()
+        self._unmap_expired(segments)
+        points = []
+        for day_start in range(start - start % DAY, end + 1, DAY):
+            path = self._segment_path(partition_name(day_start, '', DAY), name)
+            segment = segments.get(path)
+            if segment is None:
+                if not os.path.exists(path):
+                    continue
+                segment = segments[path] = Segment(path)
+            points.extend(segment.read(start, end))
+        # Usually already in order: late samples are the exception
+        return sorted(dict(points).items())
+
+    def query_tier(self, name: str, start: int, end: int, tier: Tier) -> List[Bucket]:
+        """Read one series as one-sample buckets (see SqliteStore.query_tier)"""
+        return [Bucket(ts, v, v, v, 1, v) for ts, v in self.query(name, start, end)]
+
+    def sketch(self, name: str, start: int, end: int) -> DDSketch:
+        """Quantile sketch of one series, built from its raw samples"""
+        sketch = DDSketch()
+        sketch.update(value for _, value in self.query(name, start, end))
+        return sketch
+
+    def close(self):
+        """Unmap this thread's segments"""
+        for segment in self._segments().values():
+            segment.close()
@@ -0,0 +1,144 @@
+"""
+Shared-memory metrics snapshot
+
+A single collector process publishes snapshots into an mmap'd file (normally
+under /dev/shm) that every gunicorn worker maps read-only. Writes are guarded
+by a seqlock: the version counter is odd while a write is in progress, so
+readers retry instead of taking a lock.
+
+Layout: version (u64) | sampled_at (f64, CLOCK_MONOTONIC) | length (u32) |
+padding | JSON payload
+"""
+import json
+import mmap
+import os
+import struct
+from typing import Any, Dict, Optional, Tuple
+
+HEADER = struct.Struct('<QdI')
+PAYLOAD_OFFSET = 32
+DEFAULT_SIZE = 1024 * 1024
+READ_RETRIES = 100
+
+
+class SharedSnapshotWriter:
+    """Publishes snapshots into a shared segment (single writer only)"""
+
+    def __init__(self, path: str, size: int = DEFAULT_SIZE):
+        self.path = path
+        self.size = size
+        # Reuse an existing segment so readers that already mapped it keep
+        # seeing updates after a collector restart
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            if os.fstat(fd).st_size < size:
+                os.ftruncate(fd, size)
+            self._mm = mmap.mmap(fd, size, access=mmap.ACCESS_WRITE)
+        finally:
+            os.close(fd)
+
+        version = HEADER.unpack_from(self._mm, 0)[0]
+        self._version = version + (version & 1)
+
+    @property
+    def capacity(self) -> int:
+        """Maximum payload size in bytes"""
+        return self.size - PAYLOAD_OFFSET
+
+    def publish(self, data: Dict[str, Any], sampled_at: float):
+        """
+        Write a snapshot
+
+        Args:
+            data: JSON-serialisable metrics snapshot
+            sampled_at: time.monotonic() of collection
+        """
+        payload = json.dumps(data, separators=(',', ':')).encode()
+        if len(payload) > self.capacity:
+            raise ValueError(
+                f'Snapshot of {len(payload)} bytes exceeds shared segment '
+                f'capacity of {self.capacity} bytes'
+            )
+
+        mm = self._mm
+        self._version += 1  # odd: write in progress
+        struct.pack_into('<Q', mm, 0, self._version)
+        # Everything but the version is written while it is still odd, so
+        # the final store is a single aligned 8-byte write
+        struct.pack_into('<dI', mm, 8, sampled_at, len(payload))
+        mm[PAYLOAD_OFFSET:PAYLOAD_OFFSET + len(payload)] = payload
+        self._version += 1  # even: consistent
+        struct.pack_into('<Q', mm, 0, self._version)
+
+    def close(self):
+        """Unmap the segment (the file is left for readers)"""
+        self._mm.close()
+
+
+class SharedSnapshotReader:
+    """Reads snapshots published by SharedSnapshotWriter"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._mm = None
+        self._cached_version = None
+        self._cached = None
+
+    def _map(self) -> bool:
+        if self._mm is not None:
+            return True
+        try:
+            fd = os.open(self.path, os.O_RDONLY)
+        except FileNotFoundError:
+            return False
+        try:
+            size = os.fstat(fd).st_size
+            if size <= PAYLOAD_OFFSET:
+                return False
+            self._mm = mmap.mmap(fd, size, access=mmap.ACCESS_READ)
+        finally:
+            os.close(fd)
+        return True
+
+    def read(self) -> Optional[Tuple[Dict[str, Any], float]]:
+        """
+        Read the latest consistent snapshot
+
+        Returns:
+            (metrics, sampled_at) or None if nothing has been published yet
+        """
+        if not self._map():
+            return None
+
+        mm = self._mm
+        for _ in range(READ_RETRIES):
+            version, sampled_at, length = HEADER.unpack_from(mm, 0)
+            if version == 0:
+                return None
+            if version & 1:
+                continue
+            if version == self._cached_version:
+                return self._cached
+
+            payload = mm[PAYLOAD_OFFSET:PAYLOAD_OFFSET + length]
+            if struct.unpack_from('<Q', mm, 0)[0] != version:
+                continue
+
+            try:
+                data = json.loads(payload)
+            except ValueError:
+                # Torn despite the version check (e.g. a writer from an older
+                # release); try again, then fall back to the last good one
+                continue
+            self._cached = (data, sampled_at)
+            self._cached_version = version
+            return self._cached
+
+        # Writer kept racing us; fall back to the last good snapshot
+        return self._cached
+
+    def close(self):
+        """Unmap the segment"""
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
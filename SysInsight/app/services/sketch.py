@@ -0,0 +1,181 @@
+"""
+Mergeable quantile sketches for rollup buckets
+
+A DDSketch (Masson, Rim & Lee, VLDB 2019): values are counted in
+logarithmic bins, bin k holding (GAMMA^(k-1), GAMMA^k] with
+GAMMA = (1 + ALPHA) / (1 - ALPHA), and each bin is read back as the value
+within ALPHA of both its edges. Any quantile is therefore returned within a
+relative error of ALPHA (1%) of a sample at that rank. Merging two sketches
+adds their bin counts, which is exact: a 1h bucket merged from sixty 1m
+buckets, or a week merged from hours, keeps the same ALPHA bound as a
+sketch fed the samples directly.
+
+Negative values get their own bins and values within MIN_VALUE of zero are
+counted apart. Each sign keeps at most MAX_BINS bins; past that, the bins
+closest to zero are folded together, which only affects the low quantiles
+of a series spanning more than GAMMA^MAX_BINS (~27000x).
+
+Encoded, a sketch is HEADER plus 6 bytes per non-empty bin, so a bucket
+costs 8 + 6 * min(samples, distinct bins) bytes and never more than 6 KB:
+at most 80 bytes for a 1m bucket of 5 s samples, and 0.1-2 KB for a 1h
+bucket depending on how widely the series varies within the hour
+(python -m benchmarks.bench_sketch).
+"""
+import math
+import struct
+from typing import Dict, Iterable, Optional
+
+ALPHA = 0.01
+GAMMA = (1 + ALPHA) / (1 - ALPHA)
+MIN_VALUE = 1e-9
+MAX_BINS = 512
+
+# zero count (u32), positive bins (u16), negative bins (u16); then the keys
+# (i16) and counts (u32) of the positive bins, then of the negative ones
+HEADER = struct.Struct('<IHH')
+
+_LOG_GAMMA = math.log(GAMMA)
+_MAX_KEY = 0x7FFF
+
+
+def _key(magnitude: float) -> int:
+    key = math.ceil(math.log(magnitude) / _LOG_GAMMA)
+    return max(-_MAX_KEY, min(_MAX_KEY, key))
+
+
+def _bin_value(key: int) -> float:
+    return 2 * GAMMA ** key / (GAMMA + 1)
+
+
+def _collapse(bins: Dict[int, int]):
+    # Fold the bins closest to zero into the lowest one kept
+    keys = sorted(bins)
+    excess = len(keys) - MAX_BINS
+    bins[keys[excess]] += sum(bins.pop(key) for key in keys[:excess])
+
+
+class DDSketch:
+    """Relative-error quantile sketch; see the module docstring"""
+
+    __slots__ = ('positive', 'negative', 'zero')
+
+    def __init__(self):
+        self.positive: Dict[int, int] = {}
+        self.negative: Dict[int, int] = {}
+        self.zero = 0
+
+    @property
+    def count(self) -> int:
+        """Number of values added"""
+        return self.zero + sum(self.positive.values()) + sum(self.negative.values())
+
+    def add(self, value: float, count: int = 1):
+        """Count a value"""
+        if value > MIN_VALUE:
+            bins, key = self.positive, _key(value)
+        elif value < -MIN_VALUE:
+            bins, key = self.negative, _key(-value)
+        else:
+            self.zero += count
+            return
+        if key in bins:
+            bins[key] += count
+            return
+        bins[key] = count
+        if len(bins) > MAX_BINS:
+            _collapse(bins)
+
+    def update(self, values: Iterable[float]):
+        """Count each of several values"""
+        for value in values:
+            self.add(value)
+
+    def merge(self, other: 'DDSketch') -> 'DDSketch':
+        """
+        Add another sketch's counts to this one
+
+        Returns:
+            This sketch
+        """
+        self.zero += other.zero
+        for bins, others in ((self.positive, other.positive), (self.negative, other.negative)):
+            for key, count in others.items():
+                bins[key] = bins.get(key, 0) + count
+            if len(bins) > MAX_BINS:
+                _collapse(bins)
+        return self
+
+    def copy(self) -> 'DDSketch':
+        """An independent copy"""
+        return DDSketch().merge(self)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Estimate a quantile
+
+        Args:
+            q: Between 0 and 1
+
+        Returns:
+            A value within ALPHA (relative) of the sample at rank q * (n - 1),
+            or None if the sketch is empty
+        """
+        if not 0 <= q <= 1:
+            raise ValueError('quantile must be between 0 and 1')
+        count = self.count
+        if not count:
+            return None
+        rank = q * (count - 1)
+        seen = 0
+        # Most negative first: the highest negative keys
+        for key in sorted(self.negative, reverse=True):
+            seen += self.negative[key]
+            if seen > rank:
+                return -_bin_value(key)
+        seen += self.zero
+        if seen > rank:
+            return 0.0
+        for key in sorted(self.positive):
+            seen += self.positive[key]
+            if seen > rank:
+                return _bin_value(key)
+        return None
+
+    def to_bytes(self) -> bytes:
+        """Encode as HEADER plus 6 bytes per bin"""
+        positive, negative = self.positive, self.negative
+        keys = [*positive, *negative]
+        return (HEADER.pack(self.zero, len(positive), len(negative))
+                + struct.pack(f'<{len(keys)}h', *keys)
+                + struct.pack(f'<{len(keys)}I', *positive.values(), *negative.values()))
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'DDSketch':
+        """Decode what to_bytes() produced"""
+        sketch = cls()
+        zero, positive, negative = HEADER.unpack_from(data)
+        bins = positive + negative
+        keys = struct.unpack_from(f'<{bins}h', data, HEADER.size)
+        counts = struct.unpack_from(f'<{bins}I', data, HEADER.size + 2 * bins)
+        sketch.zero = zero
+        sketch.positive = dict(zip(keys[:positive], counts[:positive]))
+        sketch.negative = dict(zip(keys[positive:], counts[positive:]))
+        return sketch
+
+
+def merge_encoded(first: Optional[bytes], second: Optional[bytes]) -> Optional[bytes]:
+    """
+    Merge two encoded sketches (registered as an SQL function)
+
+    Args:
+        first: Encoded sketch or None
+        second: Encoded sketch or None
+
+    Returns:
+        The encoded merge; either argument when the other is None
+    """
+    if first is None:
+        return second
+    if second is None:
+        return first
+    return DDSketch.from_bytes(first).merge(DDSketch.from_bytes(second)).to_bytes()
@@ -0,0 +1,717 @@
+"""
+SQLite time-series store
+
+Raw samples are (series id, integer epoch seconds, value) rows; 1-minute
+and 1-hour rollups keep min/max/sum/count/last per bucket. Every tier is
+split into WITHOUT ROWID tables by time span (a day for raw and 1m, 30 days
+for 1h), so a row costs a few bytes beyond its values and retention is a
+DROP TABLE rather than a DELETE scan; each tier has its own retention.
+
+With chunk_samples set, raw samples are compacted once a series has that
+many: they move into per-day chunks_ tables as Gorilla-compressed blocks
+(see app.services.gorilla), a few bytes per sample instead of a row each.
+Rows not yet compacted, including late ones, are merged in on read.
+
+Rollups are updated incrementally: each batch is aggregated in memory and
+merged into its buckets with an UPSERT, so nothing is rescanned and late or
+out-of-order samples land in the right bucket. Each bucket also carries a
+quantile sketch (see app.services.sketch), merged by an SQL function, so
+percentiles over any window come from a few buckets rather than the samples.
+
+The database runs in WAL mode with synchronous=NORMAL: a batch commit
+appends to the log without an fsync, readers never block the writer, and
+only checkpoints sync. Only one connection writes (see
+history.HistoryWriter); readers get their own per-thread connections.
+"""
+import os
+import sqlite3
+import threading
+import time
+from collections import defaultdict, namedtuple
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.services.gorilla import decode_chunk, encode_chunk
+from app.services.sketch import DDSketch, merge_encoded
+
+DAY = 86400
+
+# resolution: bucket width in seconds (0 for raw samples)
+Tier = namedtuple('Tier', 'name resolution prefix span retention_days')
+# One rollup bucket (raw samples read as single-sample buckets)
+Bucket = namedtuple('Bucket', 'ts min max avg count last')
+
+RAW = Tier('raw', 0, 'samples_', DAY, 7)
+ROLLUP_1M = Tier('1m', 60, 'rollup_1m_', DAY, 30)
+ROLLUP_1H = Tier('1h', 3600, 'rollup_1h_', 30 * DAY, 365)
+# Compressed raw samples, one row per block keyed by its first timestamp;
+# kept as long as raw samples
+CHUNKS = Tier('chunks', 0, 'chunks_', DAY, 7)
+PARTITION_PREFIX = RAW.prefix
+
+
+def partition_name(ts: int, prefix: str = PARTITION_PREFIX, span: int = DAY) -> str:
+    """
+    Table holding a timestamp's samples
+
+    Args:
+        ts: Epoch seconds
+        prefix: Tier table prefix
+        span: Seconds covered by one table
+
+    Returns:
+        Table name, e.g. 'samples_20240131' (named after its first UTC day)
+    """
+    return prefix + _partition_label(ts - ts % span)
+
+
+@lru_cache(maxsize=1024)
+def _partition_label(start: int) -> str:
+    # Called per row while batching: formatting dates dominates otherwise
+    return datetime.fromtimestamp(start, timezone.utc).strftime('%Y%m%d')
+
+
+def partition_day(name: str) -> int:
+    """Epoch seconds of the start of a partition"""
+    day = datetime.strptime(name.rsplit('_', 1)[-1], '%Y%m%d')
+    return int(day.replace(tzinfo=timezone.utc).timestamp())
+
+
+class SqliteStore:
+    """Partitioned sample store with 1m/1h rollups"""
+
+    def __init__(self, path: str, retention_days: int = 7,
+                 rollup_retention_days: Optional[Dict[str, int]] = None,
+                 chunk_samples: int = 0):
+        """
+        Args:
+            path: Database file
+            retention_days: Days of raw samples kept
+            rollup_retention_days: Days kept per rollup tier ('1m', '1h')
+            chunk_samples: Samples per compressed block (0 stores rows only)
+        """
+        self.path = path
+        retention = dict(rollup_retention_days or {})
+        self.tiers = (
+            RAW._replace(retention_days=retention_days),
+            ROLLUP_1M._replace(retention_days=retention.get('1m', ROLLUP_1M.retention_days)),
+            ROLLUP_1H._replace(retention_days=retention.get('1h', ROLLUP_1H.retention_days)),
+        )
+        self.chunks = CHUNKS._replace(retention_days=retention_days)
+        self.chunk_samples = chunk_samples
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        self._conn = self._connect()
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS series ('
+            'id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE)'
+        )
+        self._conn.commit()
+        self._series: Dict[str, int] = dict(
+            self._conn.execute('SELECT name, id FROM series')
+        )
+        self._partitions = set(self._list_partitions(self._conn))
+        self._add_sketch_columns()
+        self._local = threading.local()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.create_function('sketch_merge', 2, merge_encoded, deterministic=True)
+        return conn
+
+    def _add_sketch_columns(self):
+        # Rollup tables from before sketches: their buckets keep a NULL sketch
+        for tier in self.tiers[1:]:
+            for partition in self._list_partitions(self._conn, tier):
+                columns = [row[1] for row in self._conn.execute(f'PRAGMA table_info({partition})')]
+                if 'sketch' in columns:
+                    continue
+                try:
+                    self._conn.execute(f'ALTER TABLE {partition} ADD COLUMN sketch BLOB')
+                except sqlite3.OperationalError:
+                    pass  # another process added it first
+        self._conn.commit()
+
+    def _list_partitions(self, conn: sqlite3.Connection, tier: Optional[Tier] = None) -> List[str]:
+        prefixes = [tier.prefix] if tier else [t.prefix for t in (*self.tiers, self.chunks)]
+        names = []
+        for prefix in prefixes:
+            rows = conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE ?",
+                (prefix + '%',)
+            )
+            names.extend(name for (name,) in rows)
+        return sorted(names)
+
+    def _reader(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    def tier(self, name: str) -> Tier:
+        """Look up a tier by name ('raw', '1m', '1h')"""
+        for tier in self.tiers:
+            if tier.name == name:
+                return tier
+        raise ValueError(f"tier must be one of: {', '.join(t.name for t in self.tiers)}")
+
+    def series_id(self, name: str) -> int:
+        """
+        Id of a series, created on first use (writer only)
+
+        Args:
+            name: Series name, e.g. 'cpu.percent'
+
+        Returns:
+            Integer series id
+        """
+        series_id = self._series.get(name)
+        if series_id is None:
+            cursor = self._conn.execute('INSERT INTO series (name) VALUES (?)', (name,))
+            series_id = self._series[name] = cursor.lastrowid
+        return series_id
+
+    def _ensure_partition(self, tier: Tier, name: str):
+        if name in self._partitions:
+            return
+        if tier is self.tiers[0]:
+            columns = 'value REAL NOT NULL'
+        elif tier is self.chunks:
+            # ts is the block's first timestamp
+            columns = 'end_ts INTEGER NOT NULL, count INTEGER NOT NULL, data BLOB NOT NULL'
+        else:
+            columns = ('min REAL NOT NULL, max REAL NOT NULL, sum REAL NOT NULL, '
+                       'count INTEGER NOT NULL, last REAL NOT NULL, last_ts INTEGER NOT NULL, '
+                       'sketch BLOB')
+        self._conn.execute(
+            f'CREATE TABLE IF NOT EXISTS {name} ('
+            f'series_id INTEGER NOT NULL, ts INTEGER NOT NULL, {columns}, '
+            'PRIMARY KEY (series_id, ts)) WITHOUT ROWID'
+        )
+        self._partitions.add(name)
+
+    @staticmethod
+    def _aggregate_samples(samples, resolution: int):
+        # (series id, bucket) -> [min, max, sum, count, last, last_ts, sketch]
+        buckets = {}
+        for series_id, ts, value in samples:
+            key = (series_id, ts - ts % resolution)
+            bucket = buckets.get(key)
+            if bucket is None:
+                bucket = buckets[key] = [value, value, 0.0, 0, value, ts, DDSketch()]
+            elif value < bucket[0]:
+                bucket[0] = value
+            elif value > bucket[1]:
+                bucket[1] = value
+            bucket[2] += value
+            bucket[3] += 1
+            if ts >= bucket[5]:
+                bucket[4] = value
+                bucket[5] = ts
+            bucket[6].add(value)
+        return buckets
+
+    @staticmethod
+    def _aggregate(partials, resolution: int):
+        # Coarser buckets from finer ones (a None sketch is unknown)
+        buckets = {}
+        for (series_id, ts), (low, high, total, count, last, last_ts, sketch) in partials:
+            key = (series_id, ts - ts % resolution)
+            bucket = buckets.get(key)
+            if bucket is None:
+                buckets[key] = [low, high, total, count, last, last_ts,
+                                sketch.copy() if sketch is not None else None]
+                continue
+            if low < bucket[0]:
+                bucket[0] = low
+            if high > bucket[1]:
+                bucket[1] = high
+            bucket[2] += total
+            bucket[3] += count
+            if last_ts >= bucket[5]:
+                bucket[4] = last
+                bucket[5] = last_ts
+            if sketch is not None:
+                if bucket[6] is None:
+                    bucket[6] = sketch.copy()
+                else:
+                    bucket[6].merge(sketch)
+        return buckets
+
+    def _merge_rollup(self, tier: Tier, buckets):
+        by_partition = defaultdict(list)
+        for (series_id, ts), (*values, sketch) in buckets.items():
+            by_partition[partition_name(ts, tier.prefix, tier.span)].append(
+                (series_id, ts, *values, sketch.to_bytes() if sketch is not None else None)
+            )
+        for partition, rows in by_partition.items():
+            self._ensure_partition(tier, partition)
+            self._conn.executemany(
+                f'INSERT INTO {partition} '
+                '(series_id, ts, min, max, sum, count, last, last_ts, sketch) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) '
+                'ON CONFLICT (series_id, ts) DO UPDATE SET '
+                'min = min(min, excluded.min), max = max(max, excluded.max), '
+                'sum = sum + excluded.sum, count = count + excluded.count, '
+                'last = CASE WHEN excluded.last_ts >= last_ts THEN excluded.last ELSE last END, '
+                'last_ts = max(last_ts, excluded.last_ts), '
+                'sketch = sketch_merge(sketch, excluded.sketch)',
+                rows
+            )
+
+    def write_batch(self, rows: Iterable[Tuple[int, str, float]], rollups: bool = True) -> int:
+        """
+        Insert samples and update their rollups in one transaction (writer only)
+
+        A raw sample for a series and second that already exists, stored as
+        a row or in a block, is replaced. The rollups of that series over the
+        batch's range are then rebuilt rather than merged, so the old value
+        is not counted twice.
+
+        Args:
+            rows: (epoch seconds, series name, value) tuples, in any order
+            rollups: Update the rollups too (bulk loads skip this and call
+                rebuild_rollups() once at the end)
+
+        Returns:
+            Number of samples written (a later row for the same series and
+            second replaces an earlier one in the batch)
+        """
+        raw = self.tiers[0]
+        by_partition = defaultdict(dict)
+        for ts, name, value in rows:
+            by_partition[partition_name(ts, raw.prefix, raw.span)][(self.series_id(name), ts)] = value
+        replaced = self._replaced(by_partition) if rollups else {}
+
+        count = 0
+        with self._conn:
+            for partition, values in by_partition.items():
+                self._ensure_partition(raw, partition)
+                # Same SQL text each time, so sqlite3 reuses the prepared statement
+                self._conn.executemany(
+                    f'INSERT OR REPLACE INTO {partition} (series_id, ts, value) VALUES (?, ?, ?)',
+                    [(series_id, ts, value) for (series_id, ts), value in values.items()]
+                )
+                count += len(values)
+            if not rollups:
+                return count
+
+            # raw -> 1m -> 1h, each tier aggregated from the one below
+            samples = (
+                (series_id, ts, value)
+                for values in by_partition.values()
+                for (series_id, ts), value in values.items()
+                if series_id not in replaced
+            )
+            self._roll_up(self.tiers[1:], samples)
+
+        if replaced:
+            names = {series_id: name for name, series_id in self._series.items()}
+            self.rebuild_rollups({names[series_id]: span for series_id, span in replaced.items()})
+        return count
+
+    def _replaced(self, by_partition) -> Dict[int, Tuple[int, int]]:
+        # Series id -> (first, last) batch timestamps, for the series whose
+        # batch rows overwrite a stored sample
+        replaced = {}
+        for partition, values in by_partition.items():
+            spans = {}
+            for series_id, ts in values:
+                first, last = spans.get(series_id, (ts, ts))
+                spans[series_id] = (min(first, ts), max(last, ts))
+            chunks = partition_name(partition_day(partition), self.chunks.prefix, self.chunks.span)
+            for series_id, (first, last) in spans.items():
+                stored = []
+                if partition in self._partitions:
+                    stored.extend(ts for (ts,) in self._conn.execute(
+                        f'SELECT ts FROM {partition} WHERE series_id = ? AND ts BETWEEN ? AND ?',
+                        (series_id, first, last)
+                    ))
+                if chunks in self._partitions:
+                    # Usually none: new samples come after the last block
+                    for (data,) in self._conn.execute(
+                        f'SELECT data FROM {chunks} WHERE series_id = ? AND ts <= ? AND end_ts >= ?',
+                        (series_id, last, first)
+                    ):
+                        stored.extend(decode_chunk(data)[0])
+                if any((series_id, ts) in values for ts in stored):
+                    low, high = replaced.get(series_id, (first, last))
+                    replaced[series_id] = (min(low, first), max(high, last))
+        return replaced
+
+    def _roll_up(self, tiers, samples=None, partials=None) -> int:
+        # Aggregate raw samples, or else finer buckets, into each tier in turn
+        written = 0
+        for tier in tiers:
+            if samples is not None:
+                buckets = self._aggregate_samples(samples, tier.resolution)
+                samples = None
+            else:
+                buckets = self._aggregate(partials, tier.resolution)
+            self._merge_rollup(tier, buckets)
+            written += len(buckets)
+            partials = buckets.items()
+        return written
+
+    def write_buckets(self, tier_name: str,
+                      rows: Iterable[Tuple[int, str, float, float, float, int, float]]) -> int:
+        """
+        Insert rollup buckets, replacing any already stored (writer only)
+
+        Args:
+            tier_name: '1m' or '1h'
+            rows: (bucket epoch seconds, series name, min, max, avg, count,
+                last) tuples
+
+        Returns:
+            Number of buckets written
+        """
+        tier = self.tier(tier_name)
+        if not tier.resolution:
+            raise ValueError('Raw samples are written with write_batch()')
+        by_partition = defaultdict(list)
+        for ts, name, low, high, avg, count, last in rows:
+            ts -= ts % tier.resolution
+            by_partition[partition_name(ts, tier.prefix, tier.span)].append(
+                # The time of the last sample is not exported: use the bucket end
+                (self.series_id(name), ts, low, high, avg * count, count, last,
+                 ts + tier.resolution - 1)
+            )
+        with self._conn:
+            for partition, values in by_partition.items():
+                self._ensure_partition(tier, partition)
+                self._conn.executemany(
+                    f'INSERT OR REPLACE INTO {partition} '
+                    '(series_id, ts, min, max, sum, count, last, last_ts) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                    values
+                )
+        return sum(len(values) for values in by_partition.values())
+
+    def _partials(self, tier: Tier, name: str, series_id: int, start: int, end: int):
+        # A rollup tier's buckets as the partials _aggregate() takes
+        partials = []
+        for partition, _ in self._ranges(self._conn, name, tier, start, end):
+            partials.extend(
+                ((series_id, ts), (*values, DDSketch.from_bytes(sketch) if sketch else None))
+                for ts, *values, sketch in self._conn.execute(
+                    f'SELECT ts, min, max, sum, count, last, last_ts, sketch FROM {partition} '
+                    'WHERE series_id = ? AND ts BETWEEN ? AND ?', (series_id, start, end)
+                )
+            )
+        return partials
+
+    def rebuild_rollups(self, ranges: Dict[str, Tuple[int, int]], source: str = 'raw') -> int:
+        """
+        Recompute the tiers above source from it (writer only)
+
+        Every bucket overlapping a range is deleted and rebuilt from what
+        source holds, so it ends up exact whatever order the data arrived
+        in and however often it was loaded. Works a day per series at a time.
+
+        Args:
+            ranges: Series name -> (first, last) epoch seconds loaded
+            source: Tier the data was loaded into
+
+        Returns:
+            Number of buckets written
+        """
+        position = self.tiers.index(self.tier(source))
+        above = self.tiers[position + 1:]
+        if not above:
+            return 0
+        widest = above[-1].resolution
+        written = 0
+        for name, (first, last) in ranges.items():
+            series_id = self._series.get(name)
+            if series_id is None:
+                continue
+            # Whole buckets of the coarsest tier, which contain all the others
+            first -= first % widest
+            last += widest - 1 - last % widest
+            for day in range(first - first % DAY, last + 1, DAY):
+                start, end = max(first, day), min(last, day + DAY - 1)
+                if position:
+                    samples = None
+                    partials = self._partials(self.tiers[position], name, series_id, start, end)
+                else:
+                    samples = [(series_id, ts, v) for ts, v in self.query(name, start, end)]
+                    partials = None
+                with self._conn:
+                    for tier in above:
+                        partition = partition_name(start, tier.prefix, tier.span)
+                        if partition in self._partitions:
+                            self._conn.execute(
+                                f'DELETE FROM {partition} WHERE series_id = ? AND ts BETWEEN ? AND ?',
+                                (series_id, start, end)
+                            )
+                    written += self._roll_up(above, samples, partials)
+        return written
+
+    def _seal(self, series_id: int, points: List[Tuple[int, float]]):
+        # Encode points (time order) as blocks, merging any blocks they overlap
+        chunks = partition_name(points[0][0], self.chunks.prefix, self.chunks.span)
+        self._ensure_partition(self.chunks, chunks)
+        overlapping = self._conn.execute(
+            f'SELECT ts, data FROM {chunks} WHERE series_id = ? AND ts <= ? AND end_ts >= ?',
+            (series_id, points[-1][0], points[0][0])
+        ).fetchall()
+        if overlapping:
+            # Late samples: decode the blocks they fall into and re-encode
+            merged = {}
+            for _, data in overlapping:
+                merged.update(zip(*decode_chunk(data)))
+            merged.update(points)
+            self._conn.executemany(
+                f'DELETE FROM {chunks} WHERE series_id = ? AND ts = ?',
+                [(series_id, ts) for ts, _ in overlapping]
+            )
+            points = sorted(merged.items())
+
+        size = self.chunk_samples
+        blocks = []
+        for i in range(0, len(points), size):
+            block = points[i:i + size]
+            timestamps, values = zip(*block)
+            blocks.append((series_id, timestamps[0], timestamps[-1], len(block),
+                           encode_chunk(timestamps, values)))
+        self._conn.executemany(
+            f'INSERT INTO {chunks} (series_id, ts, end_ts, count, data) VALUES (?, ?, ?, ?, ?)',
+            blocks
+        )
+
+    def compact(self, now: Optional[float] = None) -> int:
+        """
+        Move raw samples into compressed blocks (writer only)
+
+        Each series' oldest chunk_samples-sized runs of rows are sealed; once
+        a day is over, its remaining rows are sealed too.
+
+        Args:
+            now: Epoch seconds (defaults to now)
+
+        Returns:
+            Number of samples compacted
+        """
+        if not self.chunk_samples:
+            return 0
+        now = time.time() if now is None else now
+        raw = self.tiers[0]
+        size = self.chunk_samples
+        compacted = 0
+        with self._conn:
+            for partition in sorted(p for p in self._partitions if p.startswith(raw.prefix)):
+                day_over = now >= partition_day(partition) + raw.span
+                pending = self._conn.execute(
+                    f'SELECT series_id, COUNT(*) FROM {partition} GROUP BY series_id'
+                ).fetchall()
+                for series_id, count in pending:
+                    take = count if day_over else count - count % size
+                    if not take:
+                        continue
+                    points = self._conn.execute(
+                        f'SELECT ts, value FROM {partition} WHERE series_id = ? '
+                        'ORDER BY ts LIMIT ?', (series_id, take)
+                    ).fetchall()
+                    self._seal(series_id, points)
+                    self._conn.execute(
+                        f'DELETE FROM {partition} WHERE series_id = ? AND ts <= ?',
+                        (series_id, points[-1][0])
+                    )
+                    compacted += take
+        return compacted
+
+    def drop_expired(self, now: Optional[float] = None) -> List[str]:
+        """
+        Drop partitions older than their tier's retention (writer only)
+
+        Args:
+            now: Epoch seconds (defaults to now)
+
+        Returns:
+            Names of the dropped partitions
+        """
+        now = time.time() if now is None else now
+        dropped = []
+        for tier in (*self.tiers, self.chunks):
+            cutoff = now - tier.retention_days * DAY
+            for name in sorted(p for p in self._partitions if p.startswith(tier.prefix)):
+                # Keep a partition while any of it is inside the retention window
+                if partition_day(name) + tier.span > cutoff:
+                    continue
+                self._conn.execute(f'DROP TABLE IF EXISTS {name}')
+                self._partitions.discard(name)
+                dropped.append(name)
+        self._conn.commit()
+        return dropped
+
+    def select_tier(self, start: int, resolution: float, now: Optional[float] = None) -> Tier:
+        """
+        Pick the tier to answer a query from
+
+        Args:
+            start: Epoch seconds the query starts at
+            resolution: Coarsest acceptable spacing between points, seconds
+            now: Epoch seconds (defaults to now)
+
+        Returns:
+            The coarsest tier no coarser than the resolution that still
+            holds data back to start; failing that, the finest tier that does
+        """
+        now = time.time() if now is None else now
+        covering = [t for t in self.tiers if start >= now - t.retention_days * DAY]
+        if not covering:
+            return self.tiers[-1]
+        fine_enough = [t for t in covering if t.resolution <= resolution]
+        return fine_enough[-1] if fine_enough else covering[0]
+
+    def series_names(self) -> List[str]:
+        """Names of every stored series"""
+        return sorted(name for (name,) in self._reader().execute('SELECT name FROM series'))
+
+    def _ranges(self, conn: sqlite3.Connection, name: str, tier: Tier, start: int, end: int):
+        row = conn.execute('SELECT id FROM series WHERE name = ?', (name,)).fetchone()
+        if row is None:
+            return
+        # Partitions created by another process show up in sqlite_master
+        existing = set(self._list_partitions(conn, tier))
+        first = start - start % tier.span
+        for partition_start in range(first, end + 1, tier.span):
+            partition = partition_name(partition_start, tier.prefix, tier.span)
+            if partition in existing:
+                yield partition, row[0]
+
+    def query(self, name: str, start: int, end: int) -> List[Tuple[int, float]]:
+        """
+        Read one raw series over a time range
+
+        Args:
+            name: Series name
+            start: Epoch seconds, inclusive
+            end: Epoch seconds, inclusive
+
+        Returns:
+            (epoch seconds, value) tuples in time order
+        """
+        conn = self._reader()
+        # One read transaction, so a compaction in between cannot move rows
+        # from the raw tables into blocks already read
+        conn.execute('BEGIN')
+        try:
+            points = []
+            for partition, series_id in self._ranges(conn, name, self.chunks, start, end):
+                for (data,) in conn.execute(
+                    f'SELECT data FROM {partition} '
+                    'WHERE series_id = ? AND ts <= ? AND end_ts >= ? ORDER BY ts',
+                    (series_id, end, start)
+                ):
+                    points.extend(
+                        point for point in zip(*decode_chunk(data))
+                        if start <= point[0] <= end
+                    )
+            sealed_until = points[-1][0] if points else None
+
+            rows = []
+            for partition, series_id in self._ranges(conn, name, self.tiers[0], start, end):
+                rows.extend(conn.execute(
+                    f'SELECT ts, value FROM {partition} '
+                    'WHERE series_id = ? AND ts BETWEEN ? AND ? ORDER BY ts',
+                    (series_id, start, end)
+                ))
+        finally:
+            conn.commit()
+
+        if rows and sealed_until is not None and rows[0][0] <= sealed_until:
+            # Late rows not compacted yet: they replace the sealed sample
+            merged = dict(points)
+            merged.update(rows)
+            return sorted(merged.items())
+        return points + rows
+
+    def query_tier(self, name: str, start: int, end: int, tier: Tier) -> List[Bucket]:
+        """
+        Read one series from a tier
+
+        Args:
+            name: Series name
+            start: Epoch seconds, inclusive
+            end: Epoch seconds, inclusive
+            tier: Tier to read (raw samples come back as one-sample buckets)
+
+        Returns:
+            Buckets in time order
+        """
+        if tier.resolution == 0:
+            return [Bucket(ts, v, v, v, 1, v) for ts, v in self.query(name, start, end)]
+
+        conn = self._reader()
+        buckets = []
+        # Include the bucket that start falls in
+        first = start - start % tier.resolution
+        for partition, series_id in self._ranges(conn, name, tier, first, end):
+            buckets.extend(
+                Bucket(ts, low, high, total / count, count, last)
+                for ts, low, high, total, count, last in conn.execute(
+                    f'SELECT ts, min, max, sum, count, last FROM {partition} '
+                    'WHERE series_id = ? AND ts BETWEEN ? AND ? ORDER BY ts',
+                    (series_id, first, end)
+                )
+            )
+        return buckets
+
+    def sketch(self, name: str, start: int, end: int) -> Optional[DDSketch]:
+        """
+        Quantile sketch of one series over a time range
+
+        Merges the 1h buckets inside the range, then 1m buckets for the
+        partial hours at either end and raw samples for the partial minutes,
+        so a week costs ~170 buckets rather than 120k samples. Ends older
+        than a tier's retention are left out.
+
+        Args:
+            name: Series name
+            start: Epoch seconds, inclusive
+            end: Epoch seconds, inclusive
+
+        Returns:
+            The merged sketch, or None if some bucket in the range lacks a
+            complete one (written before sketches existed, or imported from
+            a rollup export)
+        """
+        conn = self._reader()
+        merged = DDSketch()
+        pieces = [(start, end)]
+        for tier in reversed(self.tiers[1:]):
+            remaining = []
+            for low, high in pieces:
+                # Whole buckets of this tier inside [low, high]
+                first = low + -low % tier.resolution
+                last = (high + 1) - (high + 1) % tier.resolution
+                if first >= last:
+                    remaining.append((low, high))
+                    continue
+                for partition, series_id in self._ranges(conn, name, tier, first, last - 1):
+                    for count, data in conn.execute(
+                        f'SELECT count, sketch FROM {partition} '
+                        'WHERE series_id = ? AND ts BETWEEN ? AND ?',
+                        (series_id, first, last - 1)
+                    ):
+                        sketch = DDSketch.from_bytes(data) if data is not None else None
+                        if sketch is None or sketch.count != count:
+                            return None
+                        merged.merge(sketch)
+                remaining.extend(piece for piece in ((low, first - 1), (last, high))
+                                 if piece[0] <= piece[1])
+            pieces = remaining
+        for low, high in pieces:
+            merged.update(value for _, value in self.query(name, low, high))
+        return merged
+
+    def close(self):
+        """Close the writer connection"""
+        self._conn.close()
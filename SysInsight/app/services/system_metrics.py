@@ -1,125 +1,970 @@
 """
 System metrics collection service using psutil
+
+On Linux the hot counters (/proc/stat, /proc/meminfo, /proc/diskstats) are
+read through ProcReader, which keeps the files open and re-reads them with
+os.pread; PsutilReader provides the same interface everywhere else.
 """
+import os
+import re
+import sys
+import threading
+import time
 import psutil
+from collections import namedtuple
 from datetime import datetime
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional, Tuple
+
+from app.services.collectors import (
+    CollectorRegistry, CollectorScheduler, COST_HIGH, COST_LOW, parse_intervals
+)
+from app.services.cgroup import CgroupMetrics, own_cgroup_path
+from app.services.containers import ContainerTable
+from app.services.pressure import RESOURCES as PRESSURE_RESOURCES, PressureMetrics
+from app.services.host_info import collect_host_info
+from app.services.partitions import PartitionCache
+from app.services.processes import ProcessTable
+from app.utils.rates import RateTracker
+from app.utils.stats import WindowStats
+
+# Field names match psutil's so either reader can feed the service
+CpuTimes = namedtuple(
+    'CpuTimes', 'user nice system idle iowait irq softirq steal'
+)
+DiskCounters = namedtuple(
+    'DiskCounters',
+    'read_count write_count read_bytes write_bytes read_time write_time busy_time'
+)
+NetCounters = namedtuple(
+    'NetCounters',
+    'bytes_sent bytes_recv packets_sent packets_recv errin errout dropin dropout'
+)
+
+KernelCounters = namedtuple(
+    'KernelCounters',
+    'ctx_switches interrupts page_faults major_faults swap_in swap_out pages_scanned'
+)
+# Instantaneous kernel state read alongside KernelCounters
+KernelGauges = namedtuple(
+    'KernelGauges', 'load1 load5 load15 procs_running procs_blocked'
+)
+
+SECTOR_SIZE = 512
+
+# Kernel TCP states (include/net/tcp_states.h), named as psutil does
+TCP_STATES = {
+    b'01': 'ESTABLISHED', b'02': 'SYN_SENT', b'03': 'SYN_RECV',
+    b'04': 'FIN_WAIT1', b'05': 'FIN_WAIT2', b'06': 'TIME_WAIT',
+    b'07': 'CLOSE', b'08': 'CLOSE_WAIT', b'09': 'LAST_ACK',
+    b'0A': 'LISTEN', b'0B': 'CLOSING', b'0C': 'SYN_RECV'
+}
+# "  sl  local_address rem_address   st ..." -> st column
+TCP_STATE_RE = re.compile(rb'^\s*\d+: \S+ \S+ ([0-9A-F]{2}) ', re.MULTILINE)
+# /proc/stat activity lines ("intr" is followed by one column per IRQ).
+# None of the wanted lines is first in its file, so a leading newline is
+# used instead of ^ with re.MULTILINE, which is ~4x slower to scan
+KERNEL_STAT_RE = re.compile(rb'\n(intr|ctxt|procs_running|procs_blocked) (\d+)')
+# /proc/vmstat faults, swap I/O and reclaim scans: kswapd + direct reclaim
+# (+ khugepaged), per zone on older kernels. pgscan_anon/file count the same
+# pages by type and are left out.
+VMSTAT_RE = re.compile(
+    rb'\n(pgfault|pgmajfault|pswpin|pswpout|pgscan_(?:kswapd|direct|khugepaged)\w*) (\d+)'
+)
+
+
+class PsutilReader:
+    """Portable counter reader backed by psutil"""
+
+    name = 'psutil'
+
+    def __init__(self):
+        # device name -> is a whole disk (not a partition); psutil reports
+        # partitions too, which /sys/block lists no entry for. Elsewhere than
+        # Linux there is no /sys/block and psutil lists whole disks only
+        self._whole_disk = {}
+        self._sysfs = os.path.isdir('/sys/block')
+
+    @staticmethod
+    def _cpu_times(times) -> CpuTimes:
+        return CpuTimes(*(getattr(times, field, 0.0) for field in CpuTimes._fields))
+
+    def cpu_times(self) -> Tuple[CpuTimes, List[CpuTimes]]:
+        """
+        Read cumulative CPU times
+
+        Returns:
+            (total, per-cpu list) in seconds
+        """
+        return (
+            self._cpu_times(psutil.cpu_times()),
+            [self._cpu_times(t) for t in psutil.cpu_times(percpu=True)]
+        )
+
+    def memory(self) -> Dict[str, int]:
+        """
+        Read memory and swap usage
+
+        Returns:
+            Dictionary of byte counts and percentages
+        """
+        mem = psutil.virtual_memory()
+        swap = psutil.swap_memory()
+        return {
+            'total': mem.total,
+            'available': mem.available,
+            'used': mem.used,
+            'percent': mem.percent,
+            'swap_total': swap.total,
+            'swap_used': swap.used,
+            'swap_percent': swap.percent
+        }
+
+    def disk_io(self) -> Dict[str, DiskCounters]:
+        """
+        Read cumulative per-device disk counters
+
+        Returns:
+            Dictionary of whole-disk device name to DiskCounters
+        """
+        counters = psutil.disk_io_counters(perdisk=True) or {}
+        return {
+            name: DiskCounters(*(getattr(c, field, 0) for field in DiskCounters._fields))
+            for name, c in counters.items() if self._is_whole_disk(name)
+        }
+
+    def _is_whole_disk(self, name: str) -> bool:
+        if not self._sysfs:
+            return True
+        whole = self._whole_disk.get(name)
+        if whole is None:
+            whole = os.path.exists('/sys/block/' + name.replace('/', '!'))
+            self._whole_disk[name] = whole
+        return whole
+
+    def net_io(self) -> Dict[str, NetCounters]:
+        """
+        Read cumulative per-interface network counters
+
+        Returns:
+            Dictionary of interface name to NetCounters
+        """
+        counters = psutil.net_io_counters(pernic=True) or {}
+        return {
+            name: NetCounters(*(getattr(c, field, 0) for field in NetCounters._fields))
+            for name, c in counters.items()
+        }
+
+    def tcp_states(self) -> Dict[str, int]:
+        """
+        Count TCP sockets by state
+
+        Returns:
+            Dictionary of state name to socket count
+        """
+        counts = {}
+        for conn in psutil.net_connections(kind='tcp'):
+            counts[conn.status] = counts.get(conn.status, 0) + 1
+        return counts
+
+    def kernel_activity(self) -> Tuple[KernelGauges, KernelCounters]:
+        """
+        Read load and cumulative kernel activity counters
+
+        psutil has no page-fault or page-scan counters, nor run-queue
+        counts; those read as 0 and None here.
+
+        Returns:
+            (gauges, counters); swap_in/swap_out are in bytes
+        """
+        load1, load5, load15 = psutil.getloadavg()
+        stats = psutil.cpu_stats()
+        swap = psutil.swap_memory()
+        return (
+            KernelGauges(load1, load5, load15, None, None),
+            KernelCounters(stats.ctx_switches, stats.interrupts, 0, 0,
+                           swap.sin, swap.sout, 0)
+        )
+
+    def close(self):
+        """Nothing to release"""
+
+
+class ProcReader:
+    """
+    Linux counter reader using pre-opened /proc files
+
+    Each read is a single pread() at offset 0 on a descriptor opened once;
+    lines are parsed as bytes without decoding, splits are bounded to the
+    columns used and only the fields the service needs are converted.
+    """
+
+    name = 'proc'
+    PATHS = (
+        '/proc/stat', '/proc/meminfo', '/proc/diskstats', '/proc/net/dev',
+        '/proc/loadavg', '/proc/vmstat'
+    )
+    # Missing when IPv6 (or networking) is disabled
+    OPTIONAL_PATHS = ('/proc/net/tcp', '/proc/net/tcp6')
+
+    def __init__(self):
+        self._fds = {}
+        self._bufsize = {}
+        for path in self.PATHS + self.OPTIONAL_PATHS:
+            try:
+                self._fds[path] = os.open(path, os.O_RDONLY)
+            except OSError:
+                if path in self.PATHS:
+                    raise
+                continue
+            self._bufsize[path] = 16384
+        self._tick = float(os.sysconf('SC_CLK_TCK'))
+        self._page_size = os.sysconf('SC_PAGE_SIZE')
+        # device name -> is a whole disk (not a partition)
+        self._whole_disk = {}
+
+    @staticmethod
+    def available() -> bool:
+        """Whether the fast path can be used on this host"""
+        return sys.platform.startswith('linux') and all(
+            os.access(path, os.R_OK) for path in ProcReader.PATHS
+        )
+
+    def _read(self, path: str) -> bytes:
+        fd = self._fds[path]
+        size = self._bufsize[path]
+        while True:
+            data = os.pread(fd, size, 0)
+            if len(data) < size:
+                return data
+            # File outgrew the buffer (many CPUs/devices): grow and retry
+            size *= 2
+            self._bufsize[path] = size
+
+    def cpu_times(self) -> Tuple[CpuTimes, List[CpuTimes]]:
+        """
+        Read cumulative CPU times from /proc/stat
+
+        Returns:
+            (total, per-cpu list) in seconds
+        """
+        tick = self._tick
+        total = None
+        per_cpu = []
+        for line in self._read('/proc/stat').split(b'\n'):
+            if not line.startswith(b'cpu'):
+                # cpu lines come first
+                break
+            fields = line.split(None, 9)
+            times = CpuTimes(
+                int(fields[1]) / tick, int(fields[2]) / tick,
+                int(fields[3]) / tick, int(fields[4]) / tick,
+                int(fields[5]) / tick, int(fields[6]) / tick,
+                int(fields[7]) / tick, int(fields[8]) / tick
+            )
+            if total is None:
+                total = times
+            else:
+                per_cpu.append(times)
+        return total, per_cpu
+
+    _MEMINFO_KEYS = (
+        b'MemTotal', b'MemFree', b'MemAvailable', b'Buffers', b'Cached',
+        b'SReclaimable', b'SwapTotal', b'SwapFree'
+    )
+
+    def memory(self) -> Dict[str, int]:
+        """
+        Read memory and swap usage from /proc/meminfo
+
+        Returns:
+            Dictionary of byte counts and percentages (psutil semantics)
+        """
+        wanted = self._MEMINFO_KEYS
+        values = {}
+        for line in self._read('/proc/meminfo').split(b'\n'):
+            name, _, rest = line.partition(b':')
+            if name in wanted:
+                values[name] = int(rest.split(None, 1)[0]) * 1024
+                if len(values) == len(wanted):
+                    break
+
+        total = values.get(b'MemTotal', 0)
+        free = values.get(b'MemFree', 0)
+        cached = values.get(b'Cached', 0) + values.get(b'SReclaimable', 0)
+        available = values.get(b'MemAvailable', free + cached)
+        used = total - free - cached - values.get(b'Buffers', 0)
+        if used < 0:
+            used = total - free
+        swap_total = values.get(b'SwapTotal', 0)
+        swap_used = swap_total - values.get(b'SwapFree', 0)
+
+        return {
+            'total': total,
+            'available': available,
+            'used': used,
+            'percent': (total - available) / total * 100 if total else 0.0,
+            'swap_total': swap_total,
+            'swap_used': swap_used,
+            'swap_percent': swap_used / swap_total * 100 if swap_total else 0.0
+        }
+
+    def _is_whole_disk(self, name: bytes) -> bool:
+        whole = self._whole_disk.get(name)
+        if whole is None:
+            whole = os.path.exists(b'/sys/block/' + name.replace(b'/', b'!'))
+            self._whole_disk[name] = whole
+        return whole
+
+    def disk_io(self) -> Dict[str, DiskCounters]:
+        """
+        Read cumulative per-device counters from /proc/diskstats
+
+        Returns:
+            Dictionary of whole-disk device name to DiskCounters
+        """
+        devices = {}
+        for line in self._read('/proc/diskstats').split(b'\n'):
+            fields = line.split(None, 14)
+            if len(fields) < 14 or not self._is_whole_disk(fields[2]):
+                continue
+            devices[fields[2].decode()] = DiskCounters(
+                int(fields[3]), int(fields[7]),
+                int(fields[5]) * SECTOR_SIZE, int(fields[9]) * SECTOR_SIZE,
+                int(fields[6]), int(fields[10]), int(fields[12])
+            )
+        return devices
+
+    def net_io(self) -> Dict[str, NetCounters]:
+        """
+        Read cumulative per-interface counters from /proc/net/dev
+
+        Returns:
+            Dictionary of interface name to NetCounters
+        """
+        interfaces = {}
+        # Two header lines, then "  name: rx_bytes rx_packets rx_errs rx_drop
+        # fifo frame compressed multicast tx_bytes tx_packets tx_errs tx_drop ..."
+        for line in self._read('/proc/net/dev').split(b'\n')[2:]:
+            name, _, rest = line.partition(b':')
+            fields = rest.split(None, 12)
+            if len(fields) < 12:
+                continue
+            interfaces[name.strip().decode()] = NetCounters(
+                int(fields[8]), int(fields[0]), int(fields[9]), int(fields[1]),
+                int(fields[2]), int(fields[10]), int(fields[3]), int(fields[11])
+            )
+        return interfaces
+
+    def tcp_states(self) -> Dict[str, int]:
+        """
+        Count TCP sockets by state from /proc/net/tcp and /proc/net/tcp6
+
+        Only the state column is extracted (by one regex pass in C), so this
+        stays cheap with thousands of sockets.
+
+        Returns:
+            Dictionary of state name to socket count
+        """
+        counts = {}
+        for path in self.OPTIONAL_PATHS:
+            if path not in self._fds:
+                continue
+            for state in TCP_STATE_RE.findall(self._read(path)):
+                counts[state] = counts.get(state, 0) + 1
+
+        named = {}
+        for state, count in counts.items():
+            name = TCP_STATES.get(state, 'NONE')
+            named[name] = named.get(name, 0) + count
+        return named
+
+    def kernel_activity(self) -> Tuple[KernelGauges, KernelCounters]:
+        """
+        Read /proc/loadavg, /proc/stat and /proc/vmstat in one pass each
+
+        Like tcp_states(), the wanted lines are picked out by a regex scan
+        rather than splitting every line (vmstat has ~180 of them).
+
+        Returns:
+            (gauges, counters); swap_in/swap_out are in bytes
+        """
+        load = self._read('/proc/loadavg').split(None, 3)
+        stat = dict(KERNEL_STAT_RE.findall(self._read('/proc/stat')))
+
+        vmstat = {b'pgfault': 0, b'pgmajfault': 0, b'pswpin': 0, b'pswpout': 0}
+        scanned = 0
+        for name, value in VMSTAT_RE.findall(self._read('/proc/vmstat')):
+            if name.startswith(b'pgscan_'):
+                if name != b'pgscan_direct_throttle':
+                    scanned += int(value)
+            else:
+                vmstat[name] = int(value)
+
+        running = stat.get(b'procs_running')
+        blocked = stat.get(b'procs_blocked')
+        return (
+            KernelGauges(
+                float(load[0]), float(load[1]), float(load[2]),
+                int(running) if running is not None else None,
+                int(blocked) if blocked is not None else None
+            ),
+            KernelCounters(
+                int(stat.get(b'ctxt', 0)), int(stat.get(b'intr', 0)),
+                vmstat[b'pgfault'], vmstat[b'pgmajfault'],
+                vmstat[b'pswpin'] * self._page_size,
+                vmstat[b'pswpout'] * self._page_size,
+                scanned
+            )
+        )
+
+    def close(self):
+        """Close the pre-opened files"""
+        for fd in self._fds.values():
+            os.close(fd)
+        self._fds = {}
+
+
+def create_reader(use_proc: bool = True):
+    """
+    Pick the fastest counter reader for this platform
+
+    Args:
+        use_proc: Allow the /proc fast path
+
+    Returns:
+        ProcReader on Linux, PsutilReader otherwise
+    """
+    if use_proc and ProcReader.available():
+        try:
+            return ProcReader()
+        except OSError:
+            pass
+    return PsutilReader()
+
+
+def cpu_utilisation(prev: CpuTimes, cur: CpuTimes) -> Optional[Dict[str, float]]:
+    """
+    Compute utilisation between two cumulative CPU time readings
+
+    Args:
+        prev: Earlier reading
+        cur: Later reading
+
+    Returns:
+        Dictionary with 'percent' (busy time, excluding idle and iowait) and
+        the percentage of each CpuTimes field, or None if no time elapsed
+    """
+    deltas = [max(c - p, 0.0) for c, p in zip(cur, prev)]
+    elapsed = sum(deltas)
+    if elapsed <= 0:
+        return None
+
+    result = {
+        field: delta / elapsed * 100
+        for field, delta in zip(CpuTimes._fields, deltas)
+    }
+    result['percent'] = 100.0 - result['idle'] - result['iowait']
+    return result
+
+
+def disk_io_rates(deltas: DiskCounters, elapsed: float) -> Dict[str, float]:
+    """
+    Compute throughput, IOPS, latency and utilisation for one device
+
+    Args:
+        deltas: Change in each DiskCounters field between two samples
+        elapsed: Seconds between the samples
+
+    Returns:
+        Dictionary of per-second rates, average await (ms) and busy percent
+    """
+    ops = deltas.read_count + deltas.write_count
+    return {
+        'read_mb_s': deltas.read_bytes / elapsed / (1024**2),
+        'write_mb_s': deltas.write_bytes / elapsed / (1024**2),
+        'read_iops': deltas.read_count / elapsed,
+        'write_iops': deltas.write_count / elapsed,
+        # time counters are in milliseconds
+        'await_ms': (deltas.read_time + deltas.write_time) / ops if ops else 0.0,
+        'util_percent': min(deltas.busy_time / (elapsed * 1000) * 100, 100.0)
+    }
+
+
+IDLE_DISK_RATES = {
+    'read_mb_s': 0.0, 'write_mb_s': 0.0, 'read_iops': 0.0,
+    'write_iops': 0.0, 'await_ms': 0.0, 'util_percent': 0.0
+}
+
+
+class SubSampler:
+    """
+    Reads the cheap counters between collections (every
+    METRICS_SUBSAMPLE_MS) and keeps min/max/avg/p95 of each metric over the
+    reporting interval, so bursts shorter than the interval still show up.
+    Each metric is a WindowStats, so memory does not grow with the rate.
+    """
+
+    METRICS = (
+        'cpu.percent', 'memory.percent', 'disk.util_percent',
+        'network.recv_mb_s', 'network.sent_mb_s'
+    )
+
+    def __init__(self, reader):
+        self.reader = reader
+        self._lock = threading.Lock()
+        self._windows = {name: WindowStats() for name in self.METRICS}
+        # (cpu times, {device: busy ms}, bytes sent, bytes received, monotonic)
+        self._last = None
+
+    def sample(self, now: Optional[float] = None):
+        """
+        Take one fine-grained reading
+
+        Args:
+            now: Monotonic time of the reading (defaults to now)
+        """
+        now = time.monotonic() if now is None else now
+        cpu, _ = self.reader.cpu_times()
+        memory_percent = self.reader.memory()['percent']
+        busy = {name: c.busy_time for name, c in self.reader.disk_io().items()}
+        sent = recv = 0
+        for name, c in self.reader.net_io().items():
+            if name != 'lo':
+                sent += c.bytes_sent
+                recv += c.bytes_recv
+
+        with self._lock:
+            windows = self._windows
+            windows['memory.percent'].add(memory_percent)
+            if self._last is not None:
+                prev_cpu, prev_busy, prev_sent, prev_recv, prev_time = self._last
+                elapsed = now - prev_time
+                usage = cpu_utilisation(prev_cpu, cpu)
+                if usage is not None:
+                    windows['cpu.percent'].add(usage['percent'])
+                if elapsed > 0:
+                    busiest = max(
+                        (busy[n] - prev_busy[n] for n in busy if n in prev_busy),
+                        default=0
+                    )
+                    windows['disk.util_percent'].add(
+                        min(max(busiest, 0) / (elapsed * 1000) * 100, 100.0)
+                    )
+                    if sent >= prev_sent and recv >= prev_recv:
+                        windows['network.sent_mb_s'].add((sent - prev_sent) / elapsed / (1024**2))
+                        windows['network.recv_mb_s'].add((recv - prev_recv) / elapsed / (1024**2))
+            self._last = (cpu, busy, sent, recv, now)
+
+    def take(self, section: str) -> Dict[str, Optional[Dict[str, float]]]:
+        """
+        Summarise a section's windows and start new ones
+
+        Args:
+            section: cpu, memory, disk or network
+
+        Returns:
+            Dictionary of metric name to its window summary (None when no
+            sub-interval readings were taken, e.g. with sub-sampling off)
+        """
+        result = {}
+        with self._lock:
+            for name, window in self._windows.items():
+                prefix, _, metric = name.partition('.')
+                if prefix == section:
+                    result[metric] = window.summary()
+                    window.reset()
+        return result
+
 
 class SystemMetricsService:
     """Service for collecting system metrics"""
 
-    @staticmethod
-    def get_cpu_metrics() -> Dict[str, Any]:
+    def __init__(self, use_proc: bool = True):
+        self.reader = create_reader(use_proc)
+        self.partitions = PartitionCache()
+        self.processes = ProcessTable(use_proc=use_proc)
+        self._cpu_lock = threading.Lock()
+        self._reset_baselines()
+
+        self._host_info = None
+        self.subsampler = SubSampler(self.reader)
+
+        self.registry = CollectorRegistry()
+        self.registry.register('cpu', self.get_cpu_metrics, COST_LOW)
+        self.registry.register('memory', self.get_memory_metrics, COST_LOW)
+        self.registry.register('disk', self.get_disk_metrics, COST_LOW)
+        self.registry.register('network', self.get_network_metrics, COST_LOW)
+        self.registry.register('kernel', self.get_kernel_metrics, COST_LOW)
+        self.registry.register('processes', self.get_process_metrics, COST_HIGH)
+
+        # Container view, when running under cgroup v2
+        self.cgroup = None
+        cgroup_path = own_cgroup_path()
+        if cgroup_path:
+            self.cgroup = CgroupMetrics(
+                cgroup_path, host_memory=self.reader.memory()['total']
+            )
+            self.registry.register('cgroup', self.get_cgroup_metrics, COST_LOW)
+
+        # Stall information, on kernels with PSI
+        self.pressure = None
+        if PressureMetrics.available():
+            self.pressure = PressureMetrics()
+            self.registry.register('pressure', self.get_pressure_metrics, COST_LOW)
+
+        # Per-container table, when the host's cgroup v2 tree is visible
+        self.containers = None
+        if ContainerTable.available():
+            self.containers = ContainerTable(host_memory=self.reader.memory()['total'])
+            self.registry.register('containers', self.get_container_metrics, COST_LOW)
+        self.scheduler = CollectorScheduler(self.registry)
+
+    def _reset_baselines(self):
+        # Previous cumulative reading and the utilisation derived from it;
+        # each get_cpu_metrics() call reports the delta since the last one
+        self._last_cpu_times = self.reader.cpu_times()
+        self._last_cpu = None
+        self._disk_rates = RateTracker()
+        for name, counters in self.reader.disk_io().items():
+            self._disk_rates.deltas(name, counters)
+        self._net_rates = RateTracker()
+        for name, counters in self.reader.net_io().items():
+            self._net_rates.deltas(name, counters)
+        self._kernel_rates = RateTracker()
+        self._kernel_rates.deltas('kernel', self.reader.kernel_activity()[1])
+
+    def configure(self, config):
+        """
+        Apply configuration
+
+        Args:
+            config: Flask config object (or any mapping)
+        """
+        if config.get('ENABLE_PROC_FASTPATH', True) != (self.reader.name == 'proc'):
+            self.reader.close()
+            self.reader = create_reader(config.get('ENABLE_PROC_FASTPATH', True))
+            self._reset_baselines()
+            self.subsampler = SubSampler(self.reader)
+
+        self.partitions.close()
+        self.partitions = PartitionCache.from_config(config)
+        self.processes = ProcessTable(
+            config.get('PROCESS_TOP_N', 10), config.get('ENABLE_PROC_FASTPATH', True)
+        )
+        if self.containers is not None:
+            self.containers = ContainerTable.from_config(
+                config, host_memory=self.reader.memory()['total']
+            )
+
+        self.scheduler.low_interval = config.get('METRICS_INTERVAL', 5)
+        self.scheduler.high_interval = config.get('METRICS_SLOW_INTERVAL', 30)
+        self.scheduler.overrides = parse_intervals(config.get('COLLECTOR_INTERVALS', ()))
+
+        # Static facts are gathered once, at startup
+        self._host_info = collect_host_info(self)
+
+    def subsample(self):
+        """Take one sub-interval reading (called by the sampler between ticks)"""
+        self.subsampler.sample()
+
+    def get_host_info(self) -> Dict[str, Any]:
+        """
+        Get static host facts (collected once)
+
+        Returns:
+            Dictionary with host facts
+        """
+        if self._host_info is None:
+            self._host_info = collect_host_info(self)
+        return self._host_info
+
+    def _cpu_delta(self) -> Tuple[Dict[str, float], List[Dict[str, float]]]:
+        with self._cpu_lock:
+            total, per_cpu = self.reader.cpu_times()
+            prev_total, prev_per_cpu = self._last_cpu_times
+
+            usage = cpu_utilisation(prev_total, total)
+            if usage is None:
+                # Called again within one clock tick: repeat the last result,
+                # or fall back to the average since boot
+                if self._last_cpu is not None:
+                    return self._last_cpu
+                prev_total = CpuTimes(*([0.0] * len(CpuTimes._fields)))
+                prev_per_cpu = [prev_total] * len(per_cpu)
+                usage = cpu_utilisation(prev_total, total)
+
+            if len(prev_per_cpu) != len(per_cpu):
+                # CPU hotplug: start per-core deltas from scratch
+                prev_per_cpu = [CpuTimes(*([0.0] * len(CpuTimes._fields)))] * len(per_cpu)
+            per_core = [cpu_utilisation(p, c) for p, c in zip(prev_per_cpu, per_cpu)]
+
+            self._last_cpu_times = (total, per_cpu)
+            self._last_cpu = (usage, per_core)
+            return self._last_cpu
+
+    def get_cpu_metrics(self) -> Dict[str, Any]:
         """
         Collect CPU usage metrics
 
+        Utilisation is computed from the change in cumulative CPU times since
+        the previous call, so nothing sleeps.
+
         Returns:
             Dictionary with CPU metrics
         """
         try:
+            usage, per_core = self._cpu_delta()
+            freq = psutil.cpu_freq()
             return {
-                'percent': round(psutil.cpu_percent(interval=1), 2),
-                'per_core': [round(x, 2) for x in psutil.cpu_percent(interval=1, percpu=True)],
-                'cores': {
-                    'physical': psutil.cpu_count(logical=False),
-                    'logical': psutil.cpu_count(logical=True)
-                },
-                'frequency': {
-                    'current': round(psutil.cpu_freq().current, 2) if psutil.cpu_freq() else None,
-                    'min': round(psutil.cpu_freq().min, 2) if psutil.cpu_freq() else None,
-                    'max': round(psutil.cpu_freq().max, 2) if psutil.cpu_freq() else None
+                'percent': round(usage['percent'], 2),
+                'per_core': [round(core['percent'], 2) if core else 0.0 for core in per_core],
+                'breakdown': {
+                    field: round(usage[field], 2) for field in CpuTimes._fields
                 },
+                'frequency_mhz': round(freq.current, 2) if freq else None,
+                'window': self.subsampler.take('cpu'),
                 'timestamp': datetime.utcnow().isoformat()
             }
         except Exception as e:
             return {'error': str(e), 'timestamp': datetime.utcnow().isoformat()}
 
-    @staticmethod
-    def get_memory_metrics() -> Dict[str, Any]:
+    def get_memory_metrics(self) -> Dict[str, Any]:
         """
         Collect memory usage metrics
 
+        Totals are static and served by get_host_info().
+
         Returns:
             Dictionary with memory metrics
         """
         try:
-            mem = psutil.virtual_memory()
-            swap = psutil.swap_memory()
+            mem = self.reader.memory()
 
             return {
                 'virtual': {
-                    'total_gb': round(mem.total / (1024**3), 2),
-                    'available_gb': round(mem.available / (1024**3), 2),
-                    'used_gb': round(mem.used / (1024**3), 2),
-                    'percent': round(mem.percent, 2)
+                    'available_gb': round(mem['available'] / (1024**3), 2),
+                    'used_gb': round(mem['used'] / (1024**3), 2),
+                    'percent': round(mem['percent'], 2)
                 },
                 'swap': {
-                    'total_gb': round(swap.total / (1024**3), 2),
-                    'used_gb': round(swap.used / (1024**3), 2),
-                    'percent': round(swap.percent, 2)
+                    'used_gb': round(mem['swap_used'] / (1024**3), 2),
+                    'percent': round(mem['swap_percent'], 2)
                 },
+                'window': self.subsampler.take('memory'),
                 'timestamp': datetime.utcnow().isoformat()
             }
         except Exception as e:
             return {'error': str(e), 'timestamp': datetime.utcnow().isoformat()}
 
-    @staticmethod
-    def get_disk_metrics() -> Dict[str, Any]:
+    def get_disk_metrics(self) -> Dict[str, Any]:
         """
         Collect disk usage metrics
 
+        I/O figures are rates over the interval since the previous call;
+        partition sizes, devices and fstypes are in get_host_info().
+
         Returns:
             Dictionary with disk metrics
         """
         try:
-            partitions = []
-
-            for partition in psutil.disk_partitions(all=False):
-                try:
-                    usage = psutil.disk_usage(partition.mountpoint)
-                    partitions.append({
-                        'device': partition.device,
-                        'mountpoint': partition.mountpoint,
-                        'fstype': partition.fstype,
-                        'total_gb': round(usage.total / (1024**3), 2),
-                        'used_gb': round(usage.used / (1024**3), 2),
-                        'free_gb': round(usage.free / (1024**3), 2),
-                        'percent': round(usage.percent, 2)
-                    })
-                except PermissionError:
+            partitions = [
+                {
+                    'mountpoint': entry['mountpoint'],
+                    'used_gb': round(entry['usage']['used'] / (1024**3), 2),
+                    'free_gb': round(entry['usage']['free'] / (1024**3), 2),
+                    'percent': round(entry['usage']['percent'], 2)
+                }
+                for entry in self.partitions.partitions()
+            ]
+
+            # Disk I/O rates per device
+            counters = self.reader.disk_io()
+            devices = []
+            for name, current in counters.items():
+                result = self._disk_rates.deltas(name, current)
+                if current.read_count + current.write_count == 0:
+                    # Never used (spare loop/ram devices)
                     continue
+                rates = disk_io_rates(DiskCounters(*result[0]), result[1]) \
+                    if result else IDLE_DISK_RATES
+                device = {'device': name}
+                device.update((key, round(value, 2)) for key, value in rates.items())
+                devices.append(device)
+            self._disk_rates.forget_missing(counters)
 
-            # Disk I/O statistics
-            io_counters = psutil.disk_io_counters()
             io_stats = {
-                'read_count': io_counters.read_count,
-                'write_count': io_counters.write_count,
-                'read_mb': round(io_counters.read_bytes / (1024**2), 2),
-                'write_mb': round(io_counters.write_bytes / (1024**2), 2)
-            } if io_counters else None
+                'read_mb_s': round(sum(d['read_mb_s'] for d in devices), 2),
+                'write_mb_s': round(sum(d['write_mb_s'] for d in devices), 2),
+                'read_iops': round(sum(d['read_iops'] for d in devices), 2),
+                'write_iops': round(sum(d['write_iops'] for d in devices), 2),
+                'util_percent': max((d['util_percent'] for d in devices), default=0.0)
+            } if devices else None
 
             return {
                 'partitions': partitions,
                 'io_stats': io_stats,
+                'devices': devices,
+                'window': self.subsampler.take('disk'),
                 'timestamp': datetime.utcnow().isoformat()
             }
         except Exception as e:
             return {'error': str(e), 'timestamp': datetime.utcnow().isoformat()}
 
-    @staticmethod
-    def get_all_metrics() -> Dict[str, Any]:
+    def get_network_metrics(self) -> Dict[str, Any]:
+        """
+        Collect network interface rates and TCP connection states
+
+        Rates are per second over the interval since the previous call.
+
+        Returns:
+            Dictionary with network metrics
+        """
+        try:
+            counters = self.reader.net_io()
+            interfaces = []
+            for name, current in counters.items():
+                rates = self._net_rates.rates(name, current) or \
+                    (0.0,) * len(NetCounters._fields)
+                interface = {'name': name}
+                interface.update(
+                    (f'{field}_s', round(rate, 2))
+                    for field, rate in zip(NetCounters._fields, rates)
+                )
+                interfaces.append(interface)
+            self._net_rates.forget_missing(counters)
+
+            tcp = self.reader.tcp_states()
+            tcp['total'] = sum(tcp.values())
+
+            return {
+                'interfaces': interfaces,
+                'totals': {
+                    f'{field}_s': round(sum(
+                        i[f'{field}_s'] for i in interfaces if i['name'] != 'lo'
+                    ), 2)
+                    for field in NetCounters._fields
+                },
+                'tcp': tcp,
+                'window': self.subsampler.take('network'),
+                'timestamp': datetime.utcnow().isoformat()
+            }
+        except Exception as e:
+            return {'error': str(e), 'timestamp': datetime.utcnow().isoformat()}
+
+    def get_kernel_metrics(self) -> Dict[str, Any]:
+        """
+        Collect load, scheduler and paging activity
+
+        Swap-in/out and major-fault rates tell real memory pressure apart
+        from page cache growth, which the memory percentages cannot.
+
+        Returns:
+            Dictionary with load averages, run queue and per-second rates
+        """
+        try:
+            gauges, counters = self.reader.kernel_activity()
+            rates = self._kernel_rates.rates('kernel', counters)
+            rates = KernelCounters(*rates) if rates else KernelCounters(*([0.0] * 7))
+            cores = self.get_host_info()['cpu']['logical'] or 1
+            return {
+                'load': {
+                    '1m': round(gauges.load1, 2),
+                    '5m': round(gauges.load5, 2),
+                    '15m': round(gauges.load15, 2),
+                    'per_core_1m': round(gauges.load1 / cores, 2)
+                },
+                'procs_running': gauges.procs_running,
+                'procs_blocked': gauges.procs_blocked,
+                'context_switches_s': round(rates.ctx_switches, 1),
+                'interrupts_s': round(rates.interrupts, 1),
+                'page_faults_s': round(rates.page_faults, 1),
+                'major_faults_s': round(rates.major_faults, 1),
+                'swap_in_kb_s': round(rates.swap_in / 1024, 2),
+                'swap_out_kb_s': round(rates.swap_out / 1024, 2),
+                'pages_scanned_s': round(rates.pages_scanned, 1),
+                'timestamp': datetime.utcnow().isoformat()
+            }
+        except Exception as e:
+            return {'error': str(e), 'timestamp': datetime.utcnow().isoformat()}
+
+    def get_process_metrics(self) -> Dict[str, Any]:
+        """
+        Collect the top processes by CPU, memory and I/O
+
+        Returns:
+            Dictionary with process counts and top-N lists
+        """
+        try:
+            data = self.processes.sample()
+            data['timestamp'] = datetime.utcnow().isoformat()
+            return data
+        except Exception as e:
+            return {'error': str(e), 'timestamp': datetime.utcnow().isoformat()}
+
+    def get_cgroup_metrics(self) -> Dict[str, Any]:
+        """
+        Collect usage of this process's cgroup against its limits
+
+        Returns:
+            Dictionary with cgroup cpu, memory and io metrics
+        """
+        try:
+            if self.cgroup is None:
+                raise RuntimeError('cgroup v2 is not available')
+            return self.cgroup.collect()
+        except Exception as e:
+            return {'error': str(e), 'timestamp': datetime.utcnow().isoformat()}
+
+    def get_pressure_metrics(self) -> Dict[str, Any]:
         """
-        Collect all system metrics
+        Collect pressure stall information for cpu, memory and io
+
+        Returns:
+            Dictionary with some/full stall averages and rates per resource
+        """
+        try:
+            if self.pressure is None:
+                raise RuntimeError('PSI is not available')
+            return self.pressure.collect()
+        except Exception as e:
+            return {'error': str(e), 'timestamp': datetime.utcnow().isoformat()}
+
+    def get_container_metrics(self) -> Dict[str, Any]:
+        """
+        Collect CPU, memory and IO usage of every container cgroup
+
+        Returns:
+            Dictionary with the container count and one row per container
+        """
+        try:
+            if self.containers is None:
+                raise RuntimeError('cgroup v2 is not available')
+            data = self.containers.sample()
+            data['timestamp'] = datetime.utcnow().isoformat()
+            return data
+        except Exception as e:
+            return {'error': str(e), 'timestamp': datetime.utcnow().isoformat()}
+
+    def get_all_metrics(self) -> Dict[str, Any]:
+        """
+        Collect all system metrics now, regardless of schedules
 
         Returns:
             Dictionary with all metrics
         """
-        return {
-            'cpu': SystemMetricsService.get_cpu_metrics(),
-            'memory': SystemMetricsService.get_memory_metrics(),
-            'disk': SystemMetricsService.get_disk_metrics(),
-            'timestamp': datetime.utcnow().isoformat()
-        }
+        data = {collector.name: collector.collect() for collector in self.registry}
+        data['timestamp'] = datetime.utcnow().isoformat()
+        return data
+
+    def collect_due(self) -> Dict[str, Any]:
+        """
+        Run the collectors that are due and merge the latest results
+
+        Returns:
+            Dictionary with the latest section of every collector and a
+            'sections' map of per-section collection times and intervals
+        """
+        return self.scheduler.collect_due()
 
     @staticmethod
     def evaluate_thresholds(metrics: Dict[str, Any], config) -> Dict[str, str]:
@@ -135,9 +980,26 @@ class SystemMetricsService:
         """
         alerts = {}
 
-        # CPU evaluation
-        if 'cpu' in metrics and 'percent' in metrics['cpu']:
+        # With ALERT_SCOPE=cgroup, CPU and memory are judged against the
+        # container's own limits instead of the whole host
+        cgroup = metrics.get('cgroup')
+        use_cgroup = config.get('ALERT_SCOPE', 'host') == 'cgroup' and \
+            bool(cgroup) and 'error' not in cgroup
+
+        cpu_percent = None
+        if use_cgroup:
+            cpu_percent = cgroup['cpu']['percent']
+        elif 'cpu' in metrics and 'percent' in metrics['cpu']:
             cpu_percent = metrics['cpu']['percent']
+
+        mem_percent = None
+        if use_cgroup and cgroup['memory']['percent'] is not None:
+            mem_percent = cgroup['memory']['percent']
+        elif 'memory' in metrics and 'virtual' in metrics['memory']:
+            mem_percent = metrics['memory']['virtual']['percent']
+
+        # CPU evaluation
+        if cpu_percent is not None:
             if cpu_percent >= config['CPU_CRITICAL_THRESHOLD']:
                 alerts['cpu'] = 'critical'
             elif cpu_percent >= config['CPU_WARNING_THRESHOLD']:
@@ -146,8 +1008,7 @@ class SystemMetricsService:
                 alerts['cpu'] = 'normal'
 
         # Memory evaluation
-        if 'memory' in metrics and 'virtual' in metrics['memory']:
-            mem_percent = metrics['memory']['virtual']['percent']
+        if mem_percent is not None:
             if mem_percent >= config['MEMORY_CRITICAL_THRESHOLD']:
                 alerts['memory'] = 'critical'
             elif mem_percent >= config['MEMORY_WARNING_THRESHOLD']:
@@ -168,6 +1029,24 @@ class SystemMetricsService:
             else:
                 alerts['disk'] = 'normal'
 
+        # Pressure evaluation ('some' avg10: share of the last 10s in which
+        # at least one task stalled on the resource)
+        pressure = metrics.get('pressure')
+        if pressure and 'error' not in pressure:
+            for resource in PRESSURE_RESOURCES:
+                prefix = f'PSI_{resource.upper()}'
+                critical = config.get(f'{prefix}_CRITICAL_THRESHOLD')
+                warning = config.get(f'{prefix}_WARNING_THRESHOLD')
+                if resource not in pressure or critical is None or warning is None:
+                    continue
+                stalled = pressure[resource]['some']['avg10']
+                if stalled >= critical:
+                    alerts[f'{resource}_pressure'] = 'critical'
+                elif stalled >= warning:
+                    alerts[f'{resource}_pressure'] = 'warning'
+                else:
+                    alerts[f'{resource}_pressure'] = 'normal'
+
         return alerts
 
 # Create service instance
@@ -7,28 +7,33 @@ class MetricsBuffer {
         this.maxSize = maxSize;
         this.timestamps = [];
         this.values = [];
+        this.peaks = [];
     }
 
-    add(timestamp, value) {
+    add(timestamp, value, peak = null) {
         this.timestamps.push(timestamp);
         this.values.push(value);
+        this.peaks.push(peak);
 
         if (this.timestamps.length > this.maxSize) {
             this.timestamps.shift();
             this.values.shift();
+            this.peaks.shift();
         }
     }
 
     getData() {
         return {
             labels: [...this.timestamps],
-            data: [...this.values]
+            data: [...this.values],
+            peaks: [...this.peaks]
         };
     }
 
     clear() {
         this.timestamps = [];
         this.values = [];
+        this.peaks = [];
     }
 }
 
@@ -57,6 +62,17 @@ class ChartManager {
                     tension: 0.4,
                     fill: true,
                     pointRadius: 0
+                }, {
+                    // Highest sub-interval reading, so short spikes stay visible
+                    label: 'Peak',
+                    data: [],
+                    borderColor: color + '80',
+                    borderWidth: 1,
+                    borderDash: [4, 4],
+                    tension: 0.4,
+                    fill: false,
+                    pointRadius: 0,
+                    spanGaps: true
                 }]
             },
             options: {
@@ -111,17 +127,18 @@ class ChartManager {
         return this.charts[canvasId];
     }
 
-    updateChart(canvasId, timestamp, value) {
+    updateChart(canvasId, timestamp, value, peak = null) {
         const buffer = this.buffers[canvasId];
         const chart = this.charts[canvasId];
 
         if (!buffer || !chart) return;
 
-        buffer.add(new Date(timestamp), value);
+        buffer.add(new Date(timestamp), value, peak);
         const data = buffer.getData();
 
         chart.data.labels = data.labels;
         chart.data.datasets[0].data = data.data;
+        chart.data.datasets[1].data = data.peaks;
         chart.update('none');
     }
 
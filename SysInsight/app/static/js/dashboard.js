@@ -9,13 +9,17 @@ class SystemMonitor {
         this.chartManager = new ChartManager();
         this.pollingTimer = null;
         this.isConnected = false;
+        this.host = null;
     }
 
     init() {
         // Create charts
         this.chartManager.createLineChart('cpu-chart', 'CPU %', '#2563eb');
         this.chartManager.createLineChart('memory-chart', 'Memory %', '#8b5cf6');
-        this.chartManager.createLineChart('disk-chart', 'Disk %', '#f59e0b');
+        this.chartManager.createLineChart('disk-chart', 'Disk I/O util %', '#f59e0b');
+
+        // Static host facts are fetched once
+        this.fetchHostInfo();
 
         // Start polling
         this.startPolling();
@@ -30,6 +34,29 @@ class SystemMonitor {
         });
     }
 
+    async fetchHostInfo() {
+        try {
+            const response = await fetch(`${this.apiBaseUrl}/host`);
+            if (!response.ok) {
+                throw new Error(`HTTP ${response.status}`);
+            }
+            this.host = await response.json();
+
+            document.getElementById('cpu-cores').textContent =
+                `${this.host.cpu.physical}/${this.host.cpu.logical}`;
+            document.getElementById('memory-total').textContent =
+                this.host.memory.total_gb.toFixed(1);
+        } catch (error) {
+            console.error('Failed to fetch host info:', error);
+        }
+    }
+
+    partitionTotal(mountpoint) {
+        if (!this.host) return null;
+        const partition = this.host.partitions.find(p => p.mountpoint === mountpoint);
+        return partition ? partition.total_gb : null;
+    }
+
     async fetchMetrics() {
         try {
             const response = await fetch(`${this.apiBaseUrl}/metrics/all`, {
@@ -87,14 +114,9 @@ class SystemMonitor {
         valueEl.textContent = percent.toFixed(1);
         valueEl.className = this.getValueClass(percent, 70, 85);
 
-        // Update cores info
-        if (cpuData.cores) {
-            document.getElementById('cpu-cores').textContent =
-                `${cpuData.cores.physical}/${cpuData.cores.logical}`;
-        }
-
         // Update chart
-        this.chartManager.updateChart('cpu-chart', timestamp, percent);
+        this.chartManager.updateChart('cpu-chart', timestamp, percent,
+            this.windowPeak(cpuData, 'percent'));
 
         // Update timestamp
         this.updateTimestamp('cpu-updated');
@@ -111,11 +133,10 @@ class SystemMonitor {
         // Update stats
         document.getElementById('memory-used').textContent =
             memData.virtual.used_gb.toFixed(1);
-        document.getElementById('memory-total').textContent =
-            memData.virtual.total_gb.toFixed(1);
 
         // Update chart
-        this.chartManager.updateChart('memory-chart', timestamp, percent);
+        this.chartManager.updateChart('memory-chart', timestamp, percent,
+            this.windowPeak(memData, 'percent'));
 
         // Update timestamp
         this.updateTimestamp('memory-updated');
@@ -139,18 +160,38 @@ class SystemMonitor {
         valueEl.className = this.getValueClass(percent, 80, 90);
 
         // Update stats
-        const statsHtml = diskData.partitions.map(p =>
-            `<span>${p.mountpoint}: <strong>${p.used_gb.toFixed(1)}/${p.total_gb.toFixed(1)} GB</strong></span>`
-        ).join('');
+        const statsHtml = diskData.partitions.map(p => {
+            const total = this.partitionTotal(p.mountpoint);
+            const size = total !== null
+                ? `${p.used_gb.toFixed(1)}/${total.toFixed(1)} GB`
+                : `${p.used_gb.toFixed(1)} GB`;
+            return `<span>${p.mountpoint}: <strong>${size}</strong></span>`;
+        }).join('');
         document.getElementById('disk-stats').innerHTML = statsHtml;
 
-        // Update chart
-        this.chartManager.updateChart('disk-chart', timestamp, percent);
+        // Chart I/O utilisation of the busiest device
+        if (diskData.io_stats) {
+            const io = diskData.io_stats;
+            document.getElementById('disk-io').innerHTML =
+                `<span>Read: <strong>${io.read_mb_s.toFixed(1)} MB/s</strong></span>` +
+                `<span>Write: <strong>${io.write_mb_s.toFixed(1)} MB/s</strong></span>` +
+                `<span>IOPS: <strong>${(io.read_iops + io.write_iops).toFixed(0)}</strong></span>` +
+                `<span>Util: <strong>${io.util_percent.toFixed(1)}%</strong></span>`;
+
+            this.chartManager.updateChart('disk-chart', timestamp, io.util_percent,
+                this.windowPeak(diskData, 'util_percent'));
+        }
 
         // Update timestamp
         this.updateTimestamp('disk-updated');
     }
 
+    windowPeak(sectionData, metric) {
+        // Max of the sub-interval readings, or null when sub-sampling is off
+        const summary = sectionData.window && sectionData.window[metric];
+        return summary ? summary.max : null;
+    }
+
     getValueClass(value, warningThreshold, criticalThreshold) {
         if (value >= criticalThreshold) return 'value-large critical';
         if (value >= warningThreshold) return 'value-large warning';
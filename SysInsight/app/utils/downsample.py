@@ -0,0 +1,60 @@
+"""
+Reducing a series to a point budget for charting
+"""
+from typing import List, Sequence
+
+
+def lttb(xs: Sequence[float], ys: Sequence[float], threshold: int) -> List[int]:
+    """
+    Pick the points that best preserve a line's shape
+    (Steinarsson's Largest-Triangle-Three-Buckets)
+
+    The first and last points are always kept. The rest are split into
+    threshold - 2 equal buckets and from each the point forming the largest
+    triangle with the point kept before it and the average of the next
+    bucket is kept, so spikes survive where plain averaging would flatten
+    them.
+
+    Args:
+        xs: Point x values (timestamps), ascending
+        ys: Point y values
+        threshold: Number of points to keep
+
+    Returns:
+        Indices of the kept points, ascending
+    """
+    n = len(xs)
+    if threshold >= n or n <= 2:
+        return list(range(n))
+    if threshold < 3:
+        return [0, n - 1][:max(threshold, 0)]
+
+    every = (n - 2) / (threshold - 2)
+    kept = [0]
+    a = 0
+    for i in range(threshold - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+
+        # Average of the next bucket (the last point for the final bucket)
+        next_start = end
+        next_end = min(int((i + 2) * every) + 1, n)
+        if next_start >= n - 1:
+            next_start, next_end = n - 1, n
+        count = next_end - next_start
+        avg_x = sum(xs[next_start:next_end]) / count
+        avg_y = sum(ys[next_start:next_end]) / count
+
+        ax, ay = xs[a], ys[a]
+        best = start
+        best_area = -1.0
+        for j in range(start, end):
+            # Twice the triangle area; the factor does not change the max
+            area = abs((ax - avg_x) * (ys[j] - ay) - (ax - xs[j]) * (avg_y - ay))
+            if area > best_area:
+                best_area = area
+                best = j
+        kept.append(best)
+        a = best
+    kept.append(n - 1)
+    return kept
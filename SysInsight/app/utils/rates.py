@@ -0,0 +1,82 @@
+"""
+Helpers for turning cumulative counters into rates
+"""
+import time
+from typing import Any, Dict, Hashable, Iterable, Optional, Sequence, Tuple
+
+
+class RateTracker:
+    """
+    Remembers the previous reading of each counter set so callers can get
+    deltas and per-second rates between consecutive samples
+    """
+
+    def __init__(self):
+        # key -> (values, monotonic time)
+        self._last: Dict[Hashable, Tuple[Sequence[float], float]] = {}
+
+    def deltas(self, key: Hashable, values: Sequence[float],
+               now: Optional[float] = None) -> Optional[Tuple[Tuple[float, ...], float]]:
+        """
+        Record a reading and return the change since the previous one
+
+        Args:
+            key: Counter set identity (device name, interface, ...)
+            values: Cumulative counter values
+            now: Monotonic timestamp of the reading (defaults to now)
+
+        Returns:
+            (deltas, elapsed seconds), or None for the first reading, when no
+            time has passed or when a counter went backwards (reset/wrap)
+        """
+        now = time.monotonic() if now is None else now
+        previous = self._last.get(key)
+        self._last[key] = (values, now)
+        if previous is None:
+            return None
+
+        prev_values, prev_time = previous
+        elapsed = now - prev_time
+        if elapsed <= 0 or len(prev_values) != len(values):
+            return None
+
+        deltas = tuple(cur - prev for cur, prev in zip(values, prev_values))
+        if any(delta < 0 for delta in deltas):
+            return None
+        return deltas, elapsed
+
+    def rates(self, key: Hashable, values: Sequence[float],
+              now: Optional[float] = None) -> Optional[Tuple[float, ...]]:
+        """
+        Record a reading and return per-second rates since the previous one
+
+        Args:
+            key: Counter set identity
+            values: Cumulative counter values
+            now: Monotonic timestamp of the reading
+
+        Returns:
+            Tuple of rates, or None (see deltas())
+        """
+        result = self.deltas(key, values, now)
+        if result is None:
+            return None
+        deltas, elapsed = result
+        return tuple(delta / elapsed for delta in deltas)
+
+    def forget_missing(self, keys: Iterable[Hashable]):
+        """
+        Drop state for keys that no longer exist
+
+        Args:
+            keys: Keys seen in the latest sample
+        """
+        keep = set(keys)
+        for key in [k for k in self._last if k not in keep]:
+            del self._last[key]
+
+    def __len__(self) -> int:
+        return len(self._last)
+
+    def __contains__(self, key: Any) -> bool:
+        return key in self._last
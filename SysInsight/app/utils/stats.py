@@ -0,0 +1,141 @@
+"""
+Constant-memory summaries of a stream of readings
+"""
+import bisect
+from typing import Dict, Optional
+
+
+class P2Quantile:
+    """
+    Streaming quantile estimate (Jain & Chlamtac's P-square algorithm)
+
+    The first EXACT_LIMIT values are kept sorted and give an exact answer,
+    which covers a typical reporting window; past that, five markers seeded
+    from them are adjusted with piecewise-parabolic interpolation, so memory
+    stays bounded however long the stream runs.
+    """
+
+    EXACT_LIMIT = 32
+
+    __slots__ = ('p', 'heights', 'positions', 'desired', 'increments')
+
+    def __init__(self, p: float):
+        self.p = p
+        # Sorted values until EXACT_LIMIT is exceeded, then the 5 markers
+        self.heights = []
+        self.positions = None
+        self.desired = None
+        self.increments = (0.0, p / 2, p, (1 + p) / 2, 1.0)
+
+    def _seed_markers(self):
+        values = self.heights
+        last = len(values) - 1
+        self.desired = [last * i for i in self.increments]
+        self.positions = [round(d) for d in self.desired]
+        self.heights = [values[n] for n in self.positions]
+
+    def add(self, x: float):
+        """Add one observation"""
+        if self.positions is None:
+            bisect.insort(self.heights, x)
+            if len(self.heights) > self.EXACT_LIMIT:
+                self._seed_markers()
+            return
+
+        q = self.heights
+        n = self.positions
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = 0
+            while x >= q[k + 1]:
+                k += 1
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            self.desired[i] += self.increments[i]
+
+        # Move the middle markers towards their desired positions
+        for i in (1, 2, 3):
+            d = self.desired[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                height = q[i] + d / (n[i + 1] - n[i - 1]) * (
+                    (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i]) +
+                    (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+                )
+                if not q[i - 1] < height < q[i + 1]:
+                    # Parabola overshoots a neighbour: fall back to linear
+                    height = q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+                q[i] = height
+                n[i] += d
+
+    def value(self) -> Optional[float]:
+        """
+        Current estimate
+
+        Returns:
+            The quantile, or None before any observation
+        """
+        q = self.heights
+        if not q:
+            return None
+        if self.positions is not None:
+            return q[2]
+        # Exact, by linear interpolation between the closest ranks
+        rank = self.p * (len(q) - 1)
+        low = int(rank)
+        high = min(low + 1, len(q) - 1)
+        return q[low] + (q[high] - q[low]) * (rank - low)
+
+
+class WindowStats:
+    """min/max/avg/p95 of the readings since the last reset"""
+
+    __slots__ = ('count', 'total', 'minimum', 'maximum', 'p95')
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """Start a new window"""
+        self.count = 0
+        self.total = 0.0
+        self.minimum = None
+        self.maximum = None
+        self.p95 = P2Quantile(0.95)
+
+    def add(self, value: float):
+        """Add one reading"""
+        self.count += 1
+        self.total += value
+        if self.minimum is None or value < self.minimum:
+            self.minimum = value
+        if self.maximum is None or value > self.maximum:
+            self.maximum = value
+        self.p95.add(value)
+
+    def summary(self, digits: int = 2) -> Optional[Dict[str, float]]:
+        """
+        Summarise the window
+
+        Args:
+            digits: Decimal places to round to
+
+        Returns:
+            Dictionary with min, max, avg, p95 and samples, or None when
+            the window is empty
+        """
+        if not self.count:
+            return None
+        return {
+            'min': round(self.minimum, digits),
+            'max': round(self.maximum, digits),
+            'avg': round(self.total / self.count, digits),
+            'p95': round(self.p95.value(), digits),
+            'samples': self.count
+        }
@@ -0,0 +1,65 @@
+"""
+Throughput and memory of streaming history exports
+
+Fills a store with a day of 5 s samples, then streams the whole of it in
+each format, reporting rows/s, output size and the peak Python memory
+allocated while exporting (which should not grow with the row count).
+
+Usage:
+    python -m benchmarks.bench_export [series] [hours]
+"""
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from app.services.export import encode_rows
+from app.services.history import MetricsHistory
+from app.services.sqlite_store import SqliteStore
+
+INTERVAL = 5
+
+
+def main():
+    series = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    hours = int(sys.argv[2]) if len(sys.argv) > 2 else 24
+    seconds = hours * 3600
+    end = int(time.time())
+    start = end - seconds
+
+    with tempfile.TemporaryDirectory() as directory:
+        history = MetricsHistory()
+        history.store = SqliteStore(os.path.join(directory, 'metrics.db'))
+        batch = []
+        for ts in range(start, end, INTERVAL):
+            batch.extend((ts, f'bench.series{i}', (ts % 997) / 10) for i in range(series))
+            if len(batch) >= 50000:
+                history.store.write_batch(batch)
+                batch = []
+        history.store.write_batch(batch)
+        rows = series * (seconds // INTERVAL)
+        print(f'{series} series x {hours} h = {rows} rows')
+
+        print(f"{'format':<12}{'rows/s':>12}{'MB out':>10}{'peak MB':>10}")
+        for fmt, compress in (('ndjson', False), ('csv', False), ('csv', True)):
+            for traced in (False, True):
+                # Timed without tracemalloc, which slows allocation down
+                if traced:
+                    tracemalloc.start()
+                columns, exported = history.export(['*'], start, end)
+                began = time.perf_counter()
+                size = sum(len(chunk) for chunk in encode_rows(exported, fmt, columns, compress))
+                elapsed = time.perf_counter() - began
+                if traced:
+                    peak = tracemalloc.get_traced_memory()[1]
+                    tracemalloc.stop()
+                else:
+                    rate = rows / elapsed
+            label = fmt + ('.gz' if compress else '')
+            print(f'{label:<12}{rate:>12,.0f}{size / 1e6:>10.1f}{peak / 1e6:>10.1f}')
+        history.close()
+
+
+if __name__ == '__main__':
+    main()
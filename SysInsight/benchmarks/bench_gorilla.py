@@ -0,0 +1,117 @@
+"""
+Compressed blocks versus plain rows in the SQLite history store
+
+Writes the same synthetic day of 5 s samples into a store that keeps rows
+and one that compacts them into Gorilla blocks, then reports bytes on disk
+per sample, the codec's own size and speed per series shape, and how fast
+a full-range query reads back from each.
+
+Usage:
+    python -m benchmarks.bench_gorilla [series] [hours]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+from app.services.gorilla import decode_chunk, encode_chunk
+from app.services.sqlite_store import SqliteStore
+
+INTERVAL = 5
+CHUNK_SAMPLES = 120
+
+
+def shapes(rng: random.Random):
+    """Value generators resembling the stored series"""
+    level = [50.0]
+
+    def percent():
+        # cpu.percent style: noisy, one decimal
+        return round(rng.uniform(0, 100), 1)
+
+    def drifting():
+        # memory percent style: slow random walk, one decimal
+        level[0] = min(100.0, max(0.0, level[0] + rng.choice((-0.1, 0.0, 0.0, 0.1))))
+        return round(level[0], 1)
+
+    def rate():
+        # network MB/s style: two decimals, mostly idle
+        return round(rng.expovariate(2.0), 2) if rng.random() < 0.3 else 0.0
+
+    def constant():
+        # totals and limits
+        return 16384.0
+
+    return {'percent': percent, 'drifting': drifting, 'rate': rate, 'constant': constant}
+
+
+def bench_codec(rng: random.Random):
+    """Bytes per sample and codec speed for each series shape"""
+    print(f"{'shape':<10}{'bytes/sample':>14}{'encode/s':>14}{'decode/s':>14}")
+    for name, generate in shapes(rng).items():
+        timestamps = [1700000000 + INTERVAL * i + rng.choice((0, 0, 0, 1))
+                      for i in range(CHUNK_SAMPLES)]
+        values = [generate() for _ in range(CHUNK_SAMPLES)]
+        data = encode_chunk(timestamps, values)
+        rounds = 500
+        began = time.perf_counter()
+        for _ in range(rounds):
+            encode_chunk(timestamps, values)
+        encode = rounds * CHUNK_SAMPLES / (time.perf_counter() - began)
+        began = time.perf_counter()
+        for _ in range(rounds):
+            decode_chunk(data)
+        decode = rounds * CHUNK_SAMPLES / (time.perf_counter() - began)
+        print(f'{name:<10}{len(data) / CHUNK_SAMPLES:>14.2f}{encode:>14,.0f}{decode:>14,.0f}')
+
+
+def fill(store: SqliteStore, series: int, seconds: int, rng: random.Random) -> int:
+    generators = list(shapes(rng).values())
+    names = [(f'bench.series{i}', generators[i % len(generators)]) for i in range(series)]
+    start = 19700 * 86400
+    batch = []
+    for second in range(0, seconds, INTERVAL):
+        batch.extend((start + second, name, generate()) for name, generate in names)
+        if len(batch) >= 10000:
+            store.write_batch(batch)
+            batch = []
+    store.write_batch(batch)
+    store.compact(now=start + seconds)
+    return start
+
+
+def bench_store(series: int, hours: int, rng: random.Random):
+    """Disk size and full-range read speed, rows versus blocks"""
+    seconds = hours * 3600
+    samples = series * (seconds // INTERVAL)
+    print(f'\n{series} series x {hours} h at {INTERVAL} s = {samples} samples')
+    print(f"{'format':<10}{'raw bytes/sample':>18}{'query samples/s':>18}")
+    with tempfile.TemporaryDirectory() as directory:
+        for label, chunk_samples in (('rows', 0), ('blocks', CHUNK_SAMPLES)):
+            path = os.path.join(directory, f'{label}.db')
+            store = SqliteStore(path, chunk_samples=chunk_samples)
+            start = fill(store, series, seconds, random.Random(rng.random()))
+            # Size of the raw-sample tables only (rollups are the same in both)
+            raw_bytes = store._conn.execute(
+                "SELECT SUM(pgsize) FROM dbstat WHERE name LIKE 'samples_%' OR name LIKE 'chunks_%'"
+            ).fetchone()[0]
+
+            began = time.perf_counter()
+            read = sum(len(store.query(f'bench.series{i}', start, start + seconds))
+                       for i in range(series))
+            elapsed = time.perf_counter() - began
+            store.close()
+            print(f'{label:<10}{raw_bytes / samples:>18.2f}{read / elapsed:>18,.0f}')
+
+
+def main():
+    series = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    hours = int(sys.argv[2]) if len(sys.argv) > 2 else 24
+    rng = random.Random(0)
+    bench_codec(rng)
+    bench_store(series, hours, rng)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""
+Write and read cost of the history store backends
+
+Simulates 1 s sampling of many series flushed in STORAGE_FLUSH_INTERVAL
+batches and reports the time per batch commit, bytes on disk per sample and
+the time to read back one series' last hour.
+
+Usage:
+    python -m benchmarks.bench_history_store [series] [seconds] [sqlite|segments]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+from app.services.segment_store import SegmentStore
+from app.services.sqlite_store import SqliteStore
+
+
+def disk_usage(path: str) -> int:
+    """Bytes in a file or directory tree"""
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(root, f))
+               for root, _, files in os.walk(path) for f in files)
+
+
+def main():
+    series = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    seconds = int(sys.argv[2]) if len(sys.argv) > 2 else 3600
+    backend = sys.argv[3] if len(sys.argv) > 3 else 'sqlite'
+    flush_interval = 5
+    names = [f'bench.series{i}' for i in range(series)]
+    rng = random.Random(0)
+
+    with tempfile.TemporaryDirectory() as directory:
+        if backend == 'segments':
+            path = os.path.join(directory, 'segments')
+            store = SegmentStore(path)
+        else:
+            path = os.path.join(directory, 'metrics.db')
+            store = SqliteStore(path)
+        start = int(time.time()) - seconds
+        commits = []
+        batch = []
+        for second in range(seconds):
+            ts = start + second
+            batch.extend((ts, name, round(rng.uniform(0, 100), 2)) for name in names)
+            if (second + 1) % flush_interval == 0:
+                began = time.perf_counter()
+                store.write_batch(batch)
+                commits.append(time.perf_counter() - began)
+                batch = []
+        reads = []
+        for name in names[:20]:
+            began = time.perf_counter()
+            store.query(name, start + seconds - 3600, start + seconds)
+            reads.append(time.perf_counter() - began)
+        if backend == 'sqlite':
+            store._conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        store.close()
+        size = disk_usage(path)
+
+    samples = series * seconds
+    commits.sort()
+    print(f'{backend}: {series} series x {seconds} s = {samples} samples, '
+          f'{len(commits)} batches of {series * flush_interval} rows')
+    print(f'commit: median {commits[len(commits) // 2] * 1000:.1f} ms, '
+          f'p99 {commits[int(len(commits) * 0.99)] * 1000:.1f} ms '
+          f'({samples / sum(commits):,.0f} rows/s)')
+    print(f'disk: {size / samples:.1f} bytes/sample')
+    print(f'read last hour of one series: median {sorted(reads)[len(reads) // 2] * 1000:.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
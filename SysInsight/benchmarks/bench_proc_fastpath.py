@@ -0,0 +1,47 @@
+"""
+Per-sample cost of the /proc fast path versus psutil
+
+Usage:
+    python -m benchmarks.bench_proc_fastpath [iterations]
+"""
+import sys
+import timeit
+from app.services.system_metrics import ProcReader, PsutilReader
+
+
+def bench(reader, iterations: int):
+    """
+    Time each counter read
+
+    Args:
+        reader: ProcReader or PsutilReader
+        iterations: Reads per measurement
+
+    Returns:
+        Dictionary of operation name to microseconds per call
+    """
+    results = {}
+    for op in ('cpu_times', 'memory', 'disk_io', 'net_io', 'tcp_states', 'kernel_activity'):
+        func = getattr(reader, op)
+        best = min(timeit.repeat(func, number=iterations, repeat=5))
+        results[op] = best / iterations * 1e6
+    results['sample'] = sum(results.values())
+    return results
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    readers = [PsutilReader()]
+    if ProcReader.available():
+        readers.append(ProcReader())
+    else:
+        print('/proc fast path not available on this platform')
+
+    print(f"{'operation':<16}" + ''.join(f'{r.name:>12}' for r in readers) + '   (us/call)')
+    results = [bench(r, iterations) for r in readers]
+    for op in results[0]:
+        print(f'{op:<16}' + ''.join(f'{res[op]:>12.1f}' for res in results))
+
+
+if __name__ == '__main__':
+    main()
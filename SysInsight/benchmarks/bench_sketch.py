@@ -0,0 +1,88 @@
+"""
+Accuracy, size and speed of per-bucket quantile sketches
+
+Fills a store with a few days of 5 s samples of differently shaped series,
+then compares p50/p95/p99 merged from the rollup sketches over an unaligned
+window against the exact quantiles of the raw samples, and reports the
+stored size of a 1m and a 1h sketch.
+
+Usage:
+    python -m benchmarks.bench_sketch [days]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+from app.services.sqlite_store import SqliteStore
+
+INTERVAL = 5
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+def shapes(rng):
+    """Series name -> sample generator"""
+    return {
+        'cpu.percent': lambda ts: min(100.0, max(0.0, rng.gauss(35, 12))),
+        'disk.latency_ms': lambda ts: rng.lognormvariate(0.5, 1.2),
+        'net.bytes_recv_s': lambda ts: rng.expovariate(1 / 2e5) * (10 if rng.random() < 0.02 else 1),
+        'temperature.delta': lambda ts: rng.gauss(0, 3)
+    }
+
+
+def exact(values, q):
+    ordered = sorted(values)
+    return ordered[int(q * (len(ordered) - 1))]
+
+
+def main():
+    days = float(sys.argv[1]) if len(sys.argv) > 1 else 3
+    rng = random.Random(7)
+    end = int(time.time()) - 600
+    start = end - int(days * 86400)
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = SqliteStore(os.path.join(directory, 'metrics.db'), chunk_samples=120)
+        series = shapes(rng)
+        batch = []
+        for ts in range(start, end, INTERVAL):
+            batch.extend((ts, name, sample(ts)) for name, sample in series.items())
+            if len(batch) >= 50000:
+                store.write_batch(batch)
+                batch = []
+        store.write_batch(batch)
+        store.compact()
+
+        # Unaligned on both ends, so all three tiers are read
+        low, high = start + 1234, end - 987
+        print(f"{'series':<20}{'q':>6}{'exact':>14}{'sketch':>14}{'error %':>9}")
+        worst = 0.0
+        for name in series:
+            began = time.perf_counter()
+            values = [v for _, v in store.query(name, low, high)]
+            raw_ms = (time.perf_counter() - began) * 1000
+            began = time.perf_counter()
+            sketch = store.sketch(name, low, high)
+            sketch_ms = (time.perf_counter() - began) * 1000
+            for q in QUANTILES:
+                truth, estimate = exact(values, q), sketch.quantile(q)
+                error = abs(estimate - truth) / abs(truth) * 100 if truth else 0.0
+                worst = max(worst, error)
+                print(f'{name:<20}{q:>6}{truth:>14.3f}{estimate:>14.3f}{error:>9.3f}')
+            print(f'{"":<20}{len(values)} samples: raw scan {raw_ms:.1f} ms, '
+                  f'sketches {sketch_ms:.1f} ms')
+        print(f'worst relative error: {worst:.3f} %')
+
+        conn = store._reader()
+        for tier in store.tiers[1:]:
+            sizes = []
+            for partition in store._list_partitions(conn, tier):
+                sizes.extend(size for (size,) in conn.execute(
+                    f'SELECT length(sketch) FROM {partition}'))
+            print(f'{tier.name} sketch bytes: mean {sum(sizes) / len(sizes):.0f}, max {max(sizes)}')
+        store.close()
+
+
+if __name__ == '__main__':
+    main()
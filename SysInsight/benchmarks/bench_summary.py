@@ -0,0 +1,56 @@
+"""
+Cost of maintaining the rolling 1/5/15-minute statistics
+
+Feeds a summary one tick of samples per series per interval for an hour of
+simulated time (so every window is full and expiring), and reports the time
+per tick, split into per-sample upkeep and the once-per-tick JSON encoding,
+and the encoded size.
+
+Usage:
+    python -m benchmarks.bench_summary [series] [interval]
+"""
+import random
+import sys
+import time
+
+from app.services.rolling_summary import RollingSummary
+
+DURATION = 3600
+
+
+def main():
+    series = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    interval = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    rng = random.Random(7)
+    names = [f'bench.series{i}' for i in range(series)]
+    start = int(time.time()) - DURATION
+
+    summary = RollingSummary()
+    encode = summary._encode
+    encode_time = 0.0
+
+    def timed_encode(now):
+        nonlocal encode_time
+        began = time.perf_counter()
+        body = encode(now)
+        encode_time += time.perf_counter() - began
+        return body
+
+    summary._encode = timed_encode
+    ticks = DURATION // interval
+    began = time.perf_counter()
+    for tick in range(ticks):
+        ts = start + tick * interval
+        summary.update([(ts, name, rng.uniform(0, 100)) for name in names], now=ts)
+    total = time.perf_counter() - began
+
+    upkeep = total - encode_time
+    print(f'{series} series every {interval} s, {len(summary.windows)} windows')
+    print(f'per tick: {total / ticks * 1000:.2f} ms '
+          f'(upkeep {upkeep / ticks * 1000:.2f} ms = {upkeep / ticks / series * 1e6:.1f} us/sample, '
+          f'encoding {encode_time / ticks * 1000:.2f} ms)')
+    print(f'encoded summary: {len(summary.body) / 1024:.0f} KB')
+
+
+if __name__ == '__main__':
+    main()
@@ -10,7 +10,12 @@ backlog = 2048
 
 # Worker processes
 workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
-worker_class = 'sync'
+# Workers read it to report what their per-process buffers add up to
+os.environ['GUNICORN_WORKERS'] = str(workers)
+# Threaded workers: the worker's main loop keeps heartbeating while a thread
+# streams a long /api/metrics/export, so `timeout` does not cut downloads
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
 worker_connections = 1000
 max_requests = 1000
 max_requests_jitter = 50
@@ -41,3 +46,20 @@ group = None
 limit_request_line = 4094
 limit_request_fields = 100
 limit_request_field_size = 8190
+
+# Shared metrics collector: one sampler process publishes snapshots into
+# shared memory and every worker reads them (see app/services/collector.py)
+os.environ.setdefault('METRICS_SHARED_PATH', '/dev/shm/sysinsight-metrics')
+
+def on_starting(server):
+    """Start the metrics collector alongside the master"""
+    from app.services.collector import start_collector
+    server.metrics_collector = start_collector(os.environ['METRICS_SHARED_PATH'])
+    server.log.info("Metrics collector started (pid %s)", server.metrics_collector.pid)
+
+def on_exit(server):
+    """Stop the metrics collector with the master"""
+    from app.services.collector import stop_collector
+    collector = getattr(server, 'metrics_collector', None)
+    if collector is not None:
+        stop_collector(collector)
@@ -0,0 +1,65 @@
+"""
+Bulk import of history exports
+
+Loads NDJSON/CSV files written by /api/metrics/export (optionally gzipped)
+into the configured history store, then rebuilds the rollups over the
+imported range. Stop the collector first: the store takes a single writer.
+
+Usage:
+    python import_history.py [--config production] [--format csv]
+        [--tier 1m] [--batch-size 100000] FILE [FILE ...]
+"""
+import argparse
+import os
+import sys
+
+from dotenv import find_dotenv, load_dotenv
+
+# Before the app imports: app.config reads the environment when imported.
+# From the working directory (next to run.py), not this file's
+load_dotenv(find_dotenv(usecwd=True))
+
+from app.services.collector import load_config  # noqa: E402
+from app.services.history import open_store  # noqa: E402
+from app.services.importer import (  # noqa: E402
+    HistoryImporter, detect_format, open_export, parse_export
+)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Import exported SysInsight history')
+    parser.add_argument('files', nargs='+', help='Export files (.ndjson, .csv, optionally .gz)')
+    parser.add_argument('--config', default=os.getenv('FLASK_ENV', 'production'),
+                        help='Configuration name (default: FLASK_ENV or production)')
+    parser.add_argument('--format', choices=('ndjson', 'csv'),
+                        help='File format (default: from the file extension)')
+    parser.add_argument('--tier', choices=('1m', '1h'),
+                        help='Tier of rollup exports (raw exports need none)')
+    parser.add_argument('--batch-size', type=int, default=100000,
+                        help='Rows per transaction (default: 100000)')
+    args = parser.parse_args(argv)
+
+    config = load_config(args.config)
+    store = open_store(config)
+    importer = HistoryImporter(store, batch_size=args.batch_size)
+    try:
+        for path in args.files:
+            with open_export(path) as stream:
+                columns, rows = parse_export(stream, args.format or detect_format(path))
+                written = importer.load(columns, rows, args.tier)
+            print(f'{path}: {written} rows')
+        stats = importer.finish()
+    except (OSError, ValueError) as e:
+        print(f'Import failed: {e}', file=sys.stderr)
+        return 1
+    finally:
+        store.close()
+
+    print(f"Imported {stats['rows']} rows ({stats['skipped']} unreadable skipped), "
+          f"rebuilt {stats['buckets']} rollup buckets in {stats['seconds']} s: "
+          f"{stats['rows_per_s']:,} rows/s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
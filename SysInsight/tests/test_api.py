@@ -26,6 +26,7 @@ def test_cpu_metrics_endpoint(client):
     data = json.loads(response.data)
     assert 'percent' in data
     assert 'timestamp' in data
+    assert 'sample_age' in data
 
 def test_memory_metrics_endpoint(client):
     """Test memory metrics endpoint"""
@@ -43,6 +44,15 @@ def test_disk_metrics_endpoint(client):
     assert 'partitions' in data
     assert 'timestamp' in data
 
+def test_network_metrics_endpoint(client):
+    """Test network metrics endpoint"""
+    response = client.get('/api/metrics/network')
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert 'interfaces' in data
+    assert 'tcp' in data
+    assert 'sample_age' in data
+
 def test_all_metrics_endpoint(client):
     """Test all metrics endpoint"""
     response = client.get('/api/metrics/all')
@@ -52,6 +62,37 @@ def test_all_metrics_endpoint(client):
     assert 'memory' in data
     assert 'disk' in data
     assert 'timestamp' in data
+    assert data['sections']['cpu']['age'] >= 0
+    assert data['sections']['processes']['cost'] == 'high'
+
+def test_host_endpoint(client):
+    """Test static host info endpoint"""
+    response = client.get('/api/host')
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert 'cpu' in data
+    assert 'memory' in data
+    assert 'partitions' in data
+
+def test_processes_endpoint(client):
+    """Test top process endpoint"""
+    response = client.get('/api/processes?sort=memory&limit=3')
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert data['sort'] == 'memory'
+    assert len(data['processes']) <= 3
+    assert data['count'] > 0
+
+def test_processes_invalid_sort(client):
+    """Test top process endpoint rejects unknown sort keys"""
+    response = client.get('/api/processes?sort=bogus')
+    assert response.status_code == 400
+
+def test_processes_negative_limit(client):
+    """Test top process endpoint rejects a negative limit"""
+    response = client.get('/api/processes?limit=-1')
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
 
 def test_api_404(client):
     """Test API 404 handling"""
@@ -59,3 +100,111 @@ def test_api_404(client):
     assert response.status_code == 404
     data = json.loads(response.data)
     assert 'error' in data
+
+def test_containers_endpoint(client):
+    """Test container table endpoint"""
+    response = client.get('/api/containers?sort=memory&limit=5')
+    # Hosts without cgroup v2 have no container collector
+    assert response.status_code in (200, 404)
+    data = response.get_json()
+    if response.status_code == 200:
+        assert data['sort'] == 'memory'
+        assert len(data['containers']) <= 5
+    else:
+        assert 'error' in data
+
+def test_containers_negative_limit(client):
+    """Test container table endpoint rejects a negative limit"""
+    response = client.get('/api/containers?limit=-1')
+    assert response.status_code == 400
+    assert 'limit' in response.get_json()['error']
+    assert client.get('/api/containers?sort=bogus').status_code == 400
+
+def test_history_endpoint(client, tmp_path):
+    """Test history range queries are downsampled per series"""
+    import time
+    from app.services.history import metrics_history
+    from app.services.sqlite_store import SqliteStore
+
+    now = int(time.time())
+    metrics_history.store = SqliteStore(str(tmp_path / 'metrics.db'))
+    try:
+        metrics_history.store.write_batch(
+            [(now - 3600 + i, 'cpu.percent', float(i % 60)) for i in range(3600)]
+        )
+        response = client.get(f'/api/metrics/history?series=cpu.percent,missing'
+                              f'&from={now - 3600}&to={now}&points=100')
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data['series']['cpu.percent']['tier'] == 'raw'
+        assert len(data['series']['cpu.percent']['points']) == 100
+        assert data['series']['missing']['points'] == []
+        percentiles = data['series']['cpu.percent']['percentiles']
+        assert set(percentiles) == {'p50', 'p95', 'p99'}
+        assert abs(percentiles['p99'] - 59) <= 0.6
+        assert data['series']['missing']['percentiles']['p50'] is None
+
+        response = client.get('/api/metrics/history?series=cpu.percent&points=1')
+        assert response.status_code == 400
+        response = client.get('/api/metrics/history?series=cpu.percent&percentiles=101')
+        assert response.status_code == 400
+    finally:
+        metrics_history.close()
+
+    response = client.get('/api/metrics/history?series=cpu.percent')
+    assert response.status_code == 503
+    assert client.get('/api/metrics/history/memory').status_code == 503
+
+def test_export_endpoint(client, tmp_path):
+    """Test history exports stream as NDJSON and gzipped CSV"""
+    import csv
+    import gzip
+    import io
+    import time
+    from app.services.history import metrics_history
+    from app.services.sqlite_store import SqliteStore
+
+    now = int(time.time())
+    metrics_history.store = SqliteStore(str(tmp_path / 'metrics.db'))
+    try:
+        metrics_history.store.write_batch(
+            [(now - 100 + i, name, float(i)) for i in range(100)
+             for name in ('cpu.percent', 'cpu.per_core.0', 'memory.virtual.percent')]
+        )
+        response = client.get(f'/api/metrics/export?series=cpu.*&from={now - 50}')
+        assert response.status_code == 200
+        lines = [json.loads(line) for line in response.data.decode().splitlines()]
+        assert len(lines) == 100
+        assert {line['series'] for line in lines} == {'cpu.percent', 'cpu.per_core.0'}
+        assert lines[0]['ts'] == now - 50
+
+        response = client.get('/api/metrics/export?series=memory.virtual.percent'
+                              '&format=csv&gzip=true&tier=1m')
+        assert response.mimetype == 'application/gzip'
+        rows = list(csv.reader(io.StringIO(gzip.decompress(response.data).decode())))
+        assert rows[0] == ['series', 'ts', 'min', 'max', 'avg', 'count', 'last']
+        assert sum(int(row[5]) for row in rows[1:]) == 100
+
+        assert client.get('/api/metrics/export?format=xml').status_code == 400
+    finally:
+        metrics_history.close()
+
+def test_summary_endpoint(client):
+    """Test rolling statistics are served for every recorded series"""
+    from app.services.history import metrics_history
+    from app.services.sampler import metrics_sampler
+
+    metrics_sampler.sample_once()
+    response = client.get('/api/metrics/summary')
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['windows'] == {'1m': 60, '5m': 300, '15m': 900}
+    cpu = data['series']['cpu.percent']['1m']
+    assert cpu['count'] == 1 and cpu['min'] == cpu['max'] == cpu['mean']
+
+    summary = metrics_history.summary
+    metrics_history.summary = None
+    try:
+        assert client.get('/api/metrics/summary').status_code == 503
+    finally:
+        metrics_history.summary = summary
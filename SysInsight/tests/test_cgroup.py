@@ -0,0 +1,108 @@
+"""
+cgroup v2 collector tests
+"""
+from app.services.cgroup import (
+    CgroupMetrics, own_cgroup_path, parse_cpu_max, parse_io_stat
+)
+from app.services.system_metrics import system_metrics
+
+def write_cgroup(path, usage_usec, periods, throttled, rbytes):
+    """Write cgroup v2 interface files"""
+    path.mkdir(parents=True, exist_ok=True)
+    (path / 'cpu.stat').write_text(
+        f'usage_usec {usage_usec}\nuser_usec 0\nsystem_usec 0\n'
+        f'nr_periods {periods}\nnr_throttled {throttled}\n'
+        f'throttled_usec {throttled * 1000}\n'
+    )
+    (path / 'cpu.max').write_text('100000 100000\n')
+    (path / 'memory.current').write_text(str(256 * 1024**2))
+    (path / 'memory.max').write_text(str(512 * 1024**2))
+    (path / 'memory.stat').write_text(f'anon {200 * 1024**2}\nfile {50 * 1024**2}\n')
+    (path / 'io.stat').write_text(
+        f'8:0 rbytes={rbytes} wbytes=0 rios={rbytes // 1024**2 * 10} wios=0 dbytes=0 dios=0\n'
+        f'8:16 rbytes={rbytes} wbytes=0 rios={rbytes // 1024**2 * 10} wios=0 dbytes=0 dios=0\n'
+    )
+
+def test_cgroup_usage_against_limits(tmp_path):
+    """Test CPU, throttling, memory and IO relative to cgroup limits"""
+    cgroup = tmp_path / 'docker' / 'abc'
+    write_cgroup(cgroup, usage_usec=0, periods=0, throttled=0, rbytes=0)
+    metrics = CgroupMetrics(str(cgroup), host_cpus=8)
+    metrics.collect(now=10.0)
+
+    write_cgroup(cgroup, usage_usec=1_500_000, periods=20, throttled=5,
+                 rbytes=1024**2)
+    data = metrics.collect(now=12.0)
+
+    assert data['cpu']['limit_cores'] == 1.0
+    assert data['cpu']['usage_cores'] == 0.75
+    assert data['cpu']['percent'] == 75.0
+    assert data['cpu']['throttled_percent'] == 25.0
+    assert data['cpu']['throttled_ms_s'] == 2.5
+    assert data['memory']['percent'] == 50.0
+    assert data['memory']['max_mb'] == 512.0
+    assert data['memory']['anon_mb'] == 200.0
+    assert data['io']['read_mb_s'] == 1.0
+    assert data['io']['read_iops'] == 10.0
+
+def test_unlimited_cgroup_uses_host_capacity(tmp_path):
+    """Test 'max' limits fall back to host CPUs and memory"""
+    cgroup = tmp_path / 'unlimited'
+    write_cgroup(cgroup, usage_usec=0, periods=0, throttled=0, rbytes=0)
+    (cgroup / 'cpu.max').write_text('max 100000\n')
+    (cgroup / 'memory.max').write_text('max\n')
+    metrics = CgroupMetrics(str(cgroup), host_cpus=4, host_memory=1024**3)
+    metrics.collect(now=0.0)
+    write_cgroup(cgroup, usage_usec=2_000_000, periods=0, throttled=0, rbytes=0)
+    (cgroup / 'cpu.max').write_text('max 100000\n')
+    (cgroup / 'memory.max').write_text('max\n')
+    data = metrics.collect(now=1.0)
+
+    assert data['cpu']['limit_cores'] is None
+    assert data['cpu']['percent'] == 50.0
+    assert data['memory']['max_mb'] is None
+    assert data['memory']['percent'] == 25.0
+
+def test_own_cgroup_path(tmp_path):
+    """Test locating the unified-hierarchy cgroup of this process"""
+    (tmp_path / 'cgroup.controllers').write_text('cpu io memory\n')
+    (tmp_path / 'system.slice' / 'app.scope').mkdir(parents=True)
+    proc_cgroup = tmp_path / 'proc_cgroup'
+    proc_cgroup.write_text('0::/system.slice/app.scope\n')
+    assert own_cgroup_path(str(tmp_path), str(proc_cgroup)) == \
+        str(tmp_path / 'system.slice' / 'app.scope')
+
+    proc_cgroup.write_text('0::/\n')
+    assert own_cgroup_path(str(tmp_path), str(proc_cgroup)) == str(tmp_path)
+
+    (tmp_path / 'cgroup.controllers').unlink()
+    assert own_cgroup_path(str(tmp_path), str(proc_cgroup)) is None
+
+def test_parsers():
+    """Test cpu.max and io.stat parsing"""
+    assert parse_cpu_max('50000 100000\n') == 0.5
+    assert parse_cpu_max('max 100000\n') is None
+    assert parse_io_stat('8:0 rbytes=1 wbytes=2 rios=3 wios=4\n') == (1, 2, 3, 4)
+
+def test_alert_scope_cgroup():
+    """Test alerts can be evaluated against the cgroup instead of the host"""
+    metrics = {
+        'cpu': {'percent': 20},
+        'memory': {'virtual': {'percent': 30}},
+        'cgroup': {'cpu': {'percent': 95}, 'memory': {'percent': 80}}
+    }
+    config = {
+        'CPU_WARNING_THRESHOLD': 70,
+        'CPU_CRITICAL_THRESHOLD': 85,
+        'MEMORY_WARNING_THRESHOLD': 75,
+        'MEMORY_CRITICAL_THRESHOLD': 90,
+        'DISK_WARNING_THRESHOLD': 80,
+        'DISK_CRITICAL_THRESHOLD': 90
+    }
+    host = system_metrics.evaluate_thresholds(metrics, dict(config, ALERT_SCOPE='host'))
+    assert host['cpu'] == 'normal'
+    assert host['memory'] == 'normal'
+
+    cgroup = system_metrics.evaluate_thresholds(metrics, dict(config, ALERT_SCOPE='cgroup'))
+    assert cgroup['cpu'] == 'critical'
+    assert cgroup['memory'] == 'warning'
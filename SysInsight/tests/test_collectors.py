@@ -0,0 +1,64 @@
+"""
+Collector registry and scheduler tests
+"""
+import pytest
+from app.services.collectors import (
+    CollectorRegistry, CollectorScheduler, COST_HIGH, parse_intervals
+)
+
+def counting_collector(calls, name):
+    """Collector that records each run"""
+    def collect():
+        calls.append(name)
+        return {'runs': calls.count(name)}
+    return collect
+
+def test_collectors_run_on_their_own_schedule():
+    """Test cheap and expensive collectors run at different intervals"""
+    calls = []
+    registry = CollectorRegistry()
+    registry.register('cpu', counting_collector(calls, 'cpu'))
+    registry.register('processes', counting_collector(calls, 'processes'), COST_HIGH)
+    scheduler = CollectorScheduler(registry, low_interval=1, high_interval=30)
+
+    assert scheduler.run_due(now=100.0) == ['cpu', 'processes']
+    assert scheduler.run_due(now=100.5) == []
+    assert scheduler.run_due(now=101.0) == ['cpu']
+    assert scheduler.run_due(now=130.0) == ['cpu', 'processes']
+    assert scheduler.tick_interval == 1
+
+def test_snapshot_merges_latest_results():
+    """Test the snapshot keeps every section with its own metadata"""
+    calls = []
+    registry = CollectorRegistry()
+    registry.register('cpu', counting_collector(calls, 'cpu'))
+    registry.register('processes', counting_collector(calls, 'processes'), COST_HIGH)
+    scheduler = CollectorScheduler(registry, low_interval=1, high_interval=30)
+    scheduler.run_due(now=100.0)
+    scheduler.run_due(now=101.0)
+
+    snapshot = scheduler.snapshot()
+    assert snapshot['cpu'] == {'runs': 2}
+    assert snapshot['processes'] == {'runs': 1}
+    assert snapshot['sections']['processes']['interval'] == 30
+    assert snapshot['sections']['cpu']['cost'] == 'low'
+    assert 'timestamp' in snapshot
+
+def test_overrides_and_failures():
+    """Test per-collector overrides and that a failing collector is reported"""
+    registry = CollectorRegistry()
+    registry.register('broken', lambda: 1 / 0)
+    scheduler = CollectorScheduler(registry, overrides=parse_intervals(['broken=2', '']))
+    assert scheduler.interval_for(registry.get('broken')) == 2
+
+    scheduler.run_due(now=0.0)
+    assert 'error' in scheduler.snapshot()['broken']
+
+    registry.unregister('broken')
+    scheduler.run_due(now=10.0)
+    assert 'broken' not in scheduler.snapshot()
+
+def test_invalid_cost():
+    """Test unknown cost classes are rejected"""
+    with pytest.raises(ValueError):
+        CollectorRegistry().register('cpu', dict, cost='medium')
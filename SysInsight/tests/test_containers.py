@@ -0,0 +1,74 @@
+"""
+Container table tests
+"""
+import shutil
+
+import pytest
+
+from app.services.containers import ContainerTable, container_id, sort_containers
+from tests.test_cgroup import write_cgroup
+
+DOCKER_ID = 'a' * 64
+PODMAN_ID = 'b' * 64
+
+def make_tree(root):
+    """Build a cgroup v2 tree with two containers and unrelated services"""
+    (root / 'cgroup.controllers').write_text('cpu io memory\n')
+    write_cgroup(root / 'system.slice' / f'docker-{DOCKER_ID}.scope',
+                 usage_usec=0, periods=0, throttled=0, rbytes=0)
+    write_cgroup(root / 'machine.slice' / f'libpod-{PODMAN_ID}.scope' / 'container',
+                 usage_usec=0, periods=0, throttled=0, rbytes=0)
+    write_cgroup(root / 'machine.slice' / f'libpod-{PODMAN_ID}.scope',
+                 usage_usec=0, periods=0, throttled=0, rbytes=0)
+    (root / 'machine.slice' / f'libpod-conmon-{PODMAN_ID}.scope').mkdir()
+    (root / 'system.slice' / 'sshd.service').mkdir()
+
+def test_container_id():
+    """Test short ids from systemd and cgroupfs driver paths"""
+    assert container_id(f'system.slice/docker-{DOCKER_ID}.scope') == 'a' * 12
+    assert container_id(f'docker/{DOCKER_ID}') == 'a' * 12
+
+def test_walk_finds_containers_only(tmp_path):
+    """Test the walk matches container scopes without descending into them"""
+    make_tree(tmp_path)
+    table = ContainerTable(root=str(tmp_path), host_cpus=4)
+    data = table.sample()
+
+    assert ContainerTable.available(str(tmp_path))
+    assert data['count'] == 2
+    assert sorted(c['id'] for c in data['containers']) == ['a' * 12, 'b' * 12]
+
+def test_cached_list_is_reused(tmp_path):
+    """Test known containers are re-read without walking the tree again"""
+    make_tree(tmp_path)
+    table = ContainerTable(root=str(tmp_path), host_cpus=4, rescan_interval=3600)
+    table.sample()
+    cgroup = tmp_path / 'system.slice' / f'docker-{DOCKER_ID}.scope'
+    write_cgroup(cgroup, usage_usec=2_000_000, periods=0, throttled=0, rbytes=0)
+    data = table.sample()
+
+    assert table.walks == 1
+    row = next(c for c in data['containers'] if c['id'] == 'a' * 12)
+    assert row['cpu']['usage_cores'] > 0
+
+    # A vanished container triggers a walk on the next sample
+    shutil.rmtree(cgroup)
+    assert table.sample()['count'] == 1
+    table.sample()
+    assert table.walks == 2
+
+def test_sort_containers():
+    """Test ordering and top-N of container rows"""
+    rows = [
+        {'cpu': {'usage_cores': 0.5}, 'memory': {'current_mb': 10},
+         'io': {'read_mb_s': 0, 'write_mb_s': 3}},
+        {'cpu': {'usage_cores': 1.5}, 'memory': {'current_mb': 5},
+         'io': {'read_mb_s': 1, 'write_mb_s': 0}},
+    ]
+    assert sort_containers(rows, 'cpu', 1) == [rows[1]]
+    assert sort_containers(rows, 'memory', None) == rows
+    assert sort_containers(rows, 'io', None)[0] is rows[0]
+    with pytest.raises(ValueError):
+        sort_containers(rows, 'bogus', None)
+    with pytest.raises(ValueError):
+        sort_containers(rows, 'cpu', -1)
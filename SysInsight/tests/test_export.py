@@ -0,0 +1,43 @@
+"""
+History export encoding tests
+"""
+import gzip
+import json
+import math
+
+import pytest
+
+from app.services.export import CHUNK_BYTES, ROLLUP_COLUMNS, encode_rows
+
+def test_encode_rows_formats():
+    """Test NDJSON and CSV encoding, with and without gzip"""
+    rows = [('cpu.percent', 100, 1.5), ('disk."a"', 105, 2.0)]
+    ndjson = b''.join(encode_rows(iter(rows), 'ndjson', ('value',)))
+    assert [json.loads(line) for line in ndjson.splitlines()] == [
+        {'series': 'cpu.percent', 'ts': 100, 'value': 1.5},
+        {'series': 'disk."a"', 'ts': 105, 'value': 2.0}
+    ]
+    compressed = b''.join(encode_rows(iter(rows), 'ndjson', ('value',), compress=True))
+    assert gzip.decompress(compressed) == ndjson
+
+    buckets = [('cpu.percent', 60, 1.0, 3.0, 2.0, 12, 2.5)]
+    csv = b''.join(encode_rows(iter(buckets), 'csv', ROLLUP_COLUMNS)).decode()
+    assert csv == 'series,ts,min,max,avg,count,last\ncpu.percent,60,1.0,3.0,2.0,12,2.5\n'
+    with pytest.raises(ValueError):
+        next(encode_rows(iter(rows), 'xml', ('value',)))
+
+def test_encode_rows_chunks_large_exports():
+    """Test long exports are streamed in bounded chunks"""
+    rows = ((f'series{i % 50}', i, float(i)) for i in range(20000))
+    chunks = list(encode_rows(rows, 'ndjson', ('value',)))
+    assert len(chunks) > 1
+    assert all(len(chunk) < 2 * CHUNK_BYTES for chunk in chunks)
+    assert sum(chunk.count(b'\n') for chunk in chunks) == 20000
+
+def test_non_finite_values_export_as_null():
+    """Test inf/nan are written as JSON nulls"""
+    rows = [('cpu.percent', 100, 1.5), ('cpu.info', 105, math.inf),
+            ('cpu.percent', 110, -math.inf), ('cpu.percent', 115, math.nan)]
+    ndjson = b''.join(encode_rows(iter(rows), 'ndjson', ('value',)))
+    values = [json.loads(line)['value'] for line in ndjson.splitlines()]
+    assert values == [1.5, None, None, None]
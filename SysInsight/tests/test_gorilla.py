@@ -0,0 +1,26 @@
+"""
+Gorilla chunk encoding tests
+"""
+import math
+import random
+
+from app.services.gorilla import HEADER, decode_chunk, encode_chunk
+
+def test_chunk_round_trip():
+    """Test irregular timestamps and awkward floats decode bit for bit"""
+    rng = random.Random(7)
+    timestamps = [1700000000 + 5 * i + rng.choice((0, 0, 1, -1)) for i in range(100)]
+    timestamps += [1800000000, 4000000000]  # deltas too wide for the short classes
+    values = [round(rng.uniform(0, 100), 1) for _ in range(96)]
+    values += [0.0, -0.0, math.inf, -1.5, 5e-324, 1e308]
+    decoded_ts, decoded_values = decode_chunk(encode_chunk(timestamps, values))
+    assert decoded_ts == timestamps
+    assert [v.hex() for v in decoded_values] == [v.hex() for v in values]
+    assert decode_chunk(encode_chunk([], [])) == ([], [])
+
+def test_regular_series_compress():
+    """Test a steady interval and repeated values cost about a bit each"""
+    timestamps = [1700000000 + 5 * i for i in range(120)]
+    data = encode_chunk(timestamps, [42.0] * 120)
+    # 2 x 119 one-bit codes, plus the first delta
+    assert len(data) - HEADER.size <= 32
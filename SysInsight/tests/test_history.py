@@ -0,0 +1,281 @@
+"""
+Historical storage tests
+"""
+import os
+import time
+
+import pytest
+
+from app.services import segment_store
+from app.services.history import MetricsHistory, flatten, open_store
+from app.services.recent_history import RecentHistory, SeriesRing
+from app.services.segment_store import SegmentStore
+from app.services.sketch import DDSketch
+from app.services.sqlite_store import DAY, SqliteStore, partition_name
+
+def test_flatten_snapshot_section():
+    """Test numeric leaves become dotted series names"""
+    section = {
+        'percent': 12.5,
+        'per_core': [10, 15],
+        'interfaces': [{'name': 'eth0', 'bytes_recv_s': 100}],
+        'frequency_mhz': None,
+        'timestamp': '2024-01-01T00:00:00'
+    }
+    assert dict(flatten(section, 'cpu')) == {
+        'cpu.percent': 12.5,
+        'cpu.per_core.0': 10.0,
+        'cpu.per_core.1': 15.0,
+        'cpu.interfaces.eth0.bytes_recv_s': 100.0
+    }
+
+def test_store_write_and_query_across_days(tmp_path):
+    """Test batched writes land in day partitions and read back in order"""
+    store = SqliteStore(str(tmp_path / 'metrics.db'))
+    day = 19700 * DAY
+    rows = [(day + DAY - 1, 'cpu.percent', 50.0), (day + 10, 'cpu.percent', 10.0),
+            (day + DAY + 5, 'cpu.percent', 70.0), (day + 10, 'memory.virtual.percent', 40.0)]
+    assert store.write_batch(rows) == 4
+    # Same series and second: replaced, not duplicated
+    store.write_batch([(day + 10, 'cpu.percent', 11.0)])
+
+    assert store.query('cpu.percent', day, day + 2 * DAY) == [
+        (day + 10, 11.0), (day + DAY - 1, 50.0), (day + DAY + 5, 70.0)
+    ]
+    assert store.query('cpu.percent', day + DAY, day + 2 * DAY) == [(day + DAY + 5, 70.0)]
+    assert store.query('missing', day, day + DAY) == []
+    assert store.series_names() == ['cpu.percent', 'memory.virtual.percent']
+    store.close()
+
+def test_retention_drops_whole_partitions(tmp_path):
+    """Test expired days are dropped as tables"""
+    store = SqliteStore(str(tmp_path / 'metrics.db'), retention_days=2)
+    day = 19700 * DAY
+    store.write_batch([(day + i * DAY, 'cpu.percent', float(i)) for i in range(4)])
+
+    dropped = store.drop_expired(now=day + 4 * DAY + 60)
+    assert len(dropped) == 2
+    assert [v for _, v in store.query('cpu.percent', day, day + 5 * DAY)] == [2.0, 3.0]
+    store.close()
+
+def test_writer_records_only_recollected_sections(tmp_path):
+    """Test sections are stored once per collection and flushed in one batch"""
+    history = MetricsHistory()
+    history.configure({'ENABLE_HISTORICAL_STORAGE': True, 'STORAGE_FLUSH_INTERVAL': 3600,
+                       'STORAGE_PATH': str(tmp_path / 'metrics.db')})
+    snapshot = {
+        'cpu': {'percent': 5.0},
+        'processes': {'count': 100},
+        'disk': {'error': 'boom'},
+        'sections': {'cpu': {'collected_at': time.time()}}
+    }
+    history.record(snapshot)
+    history.record(snapshot)
+    assert history.writer.flush() == 1
+    assert history.store.series_names() == ['cpu.percent']
+    history.close()
+
+def test_history_disabled_by_default():
+    """Test the testing config does not open a store"""
+    history = MetricsHistory()
+    history.configure({'ENABLE_HISTORICAL_STORAGE': False})
+    assert not history.enabled
+    history.record({'cpu': {'percent': 1.0}})
+
+def test_rollups_updated_incrementally(tmp_path):
+    """Test 1m and 1h buckets merge across batches, including late samples"""
+    store = SqliteStore(str(tmp_path / 'metrics.db'))
+    hour = 19700 * DAY
+    store.write_batch([(hour + 10, 'cpu.percent', 10.0), (hour + 20, 'cpu.percent', 30.0)])
+    store.write_batch([(hour + 70, 'cpu.percent', 50.0)])
+    # Out of order: belongs to the first minute but is not its last sample
+    store.write_batch([(hour + 5, 'cpu.percent', 2.0)])
+
+    minutes = store.query_tier('cpu.percent', hour, hour + 3599, store.tier('1m'))
+    assert [(b.ts, b.min, b.max, b.avg, b.count, b.last) for b in minutes] == [
+        (hour, 2.0, 30.0, 14.0, 3, 30.0),
+        (hour + 60, 50.0, 50.0, 50.0, 1, 50.0)
+    ]
+    (hourly,) = store.query_tier('cpu.percent', hour + 30, hour + 3599, store.tier('1h'))
+    assert (hourly.min, hourly.max, hourly.avg, hourly.count, hourly.last) == \
+        (2.0, 50.0, 23.0, 4, 50.0)
+    store.close()
+
+def test_rewritten_samples_not_double_counted(tmp_path):
+    """Test replacing stored samples, as rows or in blocks, keeps rollups exact"""
+    store = SqliteStore(str(tmp_path / 'metrics.db'), chunk_samples=4)
+    hour = int(time.time()) // 3600 * 3600 - 3600
+    store.write_batch([(hour + i, 'cpu.percent', 10.0) for i in range(6)])
+    store.compact()  # first four sealed into a block, two left as rows
+    store.write_batch([(hour + 1, 'cpu.percent', 50.0), (hour + 5, 'cpu.percent', 40.0),
+                       (hour + 6, 'cpu.percent', 10.0), (hour + 6, 'cpu.percent', 20.0)])
+
+    (minute,) = store.query_tier('cpu.percent', hour, hour + 59, store.tier('1m'))
+    assert (minute.count, minute.min, minute.max, minute.avg, minute.last) == \
+        (7, 10.0, 50.0, 150.0 / 7, 20.0)
+    assert store.sketch('cpu.percent', hour, hour + 3599).count == 7
+    store.close()
+
+def test_tier_selection_and_retention(tmp_path):
+    """Test queries use the coarsest sufficient tier and tiers expire separately"""
+    store = SqliteStore(str(tmp_path / 'metrics.db'), retention_days=2,
+                        rollup_retention_days={'1m': 10, '1h': 100})
+    now = 19700 * DAY
+    assert store.select_tier(now - 3600, resolution=1, now=now).name == 'raw'
+    assert store.select_tier(now - 3600, resolution=300, now=now).name == '1m'
+    assert store.select_tier(now - 3600, resolution=7200, now=now).name == '1h'
+    # Raw data no longer covers the range: fall back to the finest tier that does
+    assert store.select_tier(now - 5 * DAY, resolution=1, now=now).name == '1m'
+    assert store.select_tier(now - 50 * DAY, resolution=1, now=now).name == '1h'
+
+    store.write_batch([(now - 5 * DAY, 'cpu.percent', 1.0)])
+    dropped = store.drop_expired(now=now)
+    assert [name.split('_')[0] for name in dropped] == ['samples']
+    assert store.query_tier('cpu.percent', now - 6 * DAY, now, store.tier('1m'))
+    store.close()
+
+def test_series_ring_wraps_and_serves_views():
+    """Test the ring overwrites its oldest samples and reads without copying"""
+    ring = SeriesRing(capacity=4)
+    for ts in range(100, 106):
+        ring.append(ts, float(ts))
+    ring.append(103, 0.0)  # older than the newest: dropped
+    ring.append(105, 5.0)  # same second: replaced
+    assert (len(ring), ring.oldest, ring.newest) == (4, 102, 105)
+
+    timestamps, values = ring.window(104, 200)
+    assert isinstance(timestamps, memoryview)
+    assert (list(timestamps), list(values)) == ([104, 105], [104.0, 5.0])
+    # Straddles the wrap point: copied in time order
+    timestamps, values = ring.window(0, 200)
+    assert list(timestamps) == [102, 103, 104, 105]
+
+def test_recent_history_buffers_snapshots():
+    """Test snapshots are buffered per series and memory is reported"""
+    history = MetricsHistory()
+    history.configure({'RECENT_HISTORY_HOURS': 1, 'METRICS_INTERVAL': 60})
+    now = time.time()
+    history.record({'cpu': {'percent': 5.0}, 'sections': {'cpu': {'collected_at': now}}})
+    assert history.recent.capacity == 60
+
+    source, timestamps, values = history.points('cpu.percent', 0, 2 ** 32 - 1)
+    assert source == 'memory'
+    assert list(values) == [5.0]
+    usage = history.memory_usage()
+    assert usage['series']['cpu.percent']['samples'] == 1
+    assert usage['series']['cpu.percent']['bytes'] >= 60 * 12
+    assert (usage['processes'], usage['all_processes_bytes']) == (1, usage['total_bytes'])
+    history.close()
+    assert history.recent is None
+
+    # Sized by how often the sampler ticks, and reported for every worker
+    history.configure({'RECENT_HISTORY_HOURS': 1, 'METRICS_INTERVAL': 60,
+                       'METRICS_SHARED_PATH': '/dev/shm/x', 'GUNICORN_WORKERS': 9}, interval=2)
+    assert history.recent.capacity == 1800
+    history.record({'cpu': {'percent': 5.0}, 'sections': {'cpu': {'collected_at': now}}})
+    usage = history.memory_usage()
+    assert usage['all_processes_bytes'] == 9 * usage['total_bytes']
+    history.close()
+
+def test_recent_history_drops_stale_series():
+    """Test a series that stops reporting is evicted from the buffer"""
+    recent = RecentHistory(hours=1, interval=60)
+    now = 1_700_000_000
+    recent.extend([(now, 'net.veth1.bytes_recv_s', 1.0), (now, 'cpu.percent', 5.0)], now=now)
+    before = recent.memory_usage()
+    assert before['series_count'] == 2
+
+    # The interface is gone; only cpu keeps reporting
+    for tick in range(1, 62):
+        recent.extend([(now + 60 * tick, 'cpu.percent', 5.0)], now=now + 60 * tick)
+    after = recent.memory_usage()
+    assert list(after['series']) == ['cpu.percent']
+    assert after['total_bytes'] < before['total_bytes']
+    assert not recent.covers('net.veth1.bytes_recv_s', now)
+    assert recent.window('net.veth1.bytes_recv_s', now, now) == ((), ())
+
+def test_compaction_into_blocks(tmp_path):
+    """Test raw rows are sealed into blocks and late rows still read back"""
+    store = SqliteStore(str(tmp_path / 'metrics.db'), chunk_samples=10)
+    day = 19700 * DAY
+    store.write_batch([(day + 5 * i, 'cpu.percent', float(i)) for i in range(25)])
+    # Two full blocks; the last 5 rows wait for more samples
+    assert store.compact(now=day + 200) == 20
+    (raw,) = [p for p in store._partitions if p.startswith('samples_')]
+    assert store._conn.execute(f'SELECT COUNT(*) FROM {raw}').fetchone() == (5,)
+    expected = [(day + 5 * i, float(i)) for i in range(25)]
+    assert store.query('cpu.percent', day, day + DAY) == expected
+
+    # A late correction inside a sealed block wins on read and on re-sealing
+    store.write_batch([(day + 15, 'cpu.percent', 99.0)])
+    expected[3] = (day + 15, 99.0)
+    assert store.query('cpu.percent', day, day + DAY) == expected
+    assert store.query('cpu.percent', day + 12, day + 22) == expected[3:5]
+    # Day over: everything is sealed
+    assert store.compact(now=day + DAY) == 6
+    assert store.query('cpu.percent', day, day + DAY) == expected
+    store.close()
+
+def test_segment_store_range_reads(tmp_path, monkeypatch):
+    """Test segments serve ranges across days, blocks and late samples"""
+    monkeypatch.setattr(segment_store, 'BLOCK_RECORDS', 4)
+    store = SegmentStore(str(tmp_path / 'segments'))
+    reader = SegmentStore(str(tmp_path / 'segments'))
+    day = 19700 * DAY
+    store.write_batch([(day + DAY - 50 + 5 * i, 'disk./.percent', float(i)) for i in range(20)])
+    expected = [(day + DAY - 50 + 5 * i, float(i)) for i in range(20)]
+    assert reader.query('disk./.percent', day, day + 2 * DAY) == expected
+    assert reader.query('disk./.percent', day + DAY - 20, day + DAY + 4) == expected[6:11]
+
+    # Appended later and out of order: seen by the existing reader
+    store.write_batch([(day + DAY - 40, 'disk./.percent', 99.0),
+                       (day + DAY + 500, 'disk./.percent', 7.0)])
+    expected[2] = (day + DAY - 40, 99.0)
+    assert reader.query('disk./.percent', day, day + 2 * DAY) == expected + [(day + DAY + 500, 7.0)]
+    assert reader.series_names() == ['disk./.percent']
+
+    assert store.drop_expired(now=day + 8 * DAY + 1) == [partition_name(day, '', DAY)]
+    assert reader.query('disk./.percent', day, day + DAY - 1) == []
+    store.close()
+    reader.close()
+
+def test_segment_writer_holds_no_descriptors(tmp_path):
+    """Test many series are written without keeping a file open per series"""
+    store = SegmentStore(str(tmp_path / 'segments'))
+    before = len(os.listdir('/proc/self/fd'))
+    now = int(time.time())
+    for ts in (now, now + 5):
+        store.write_batch([(ts, f'disk.dev{i}.busy', 1.0) for i in range(2000)])
+    assert len(os.listdir('/proc/self/fd')) <= before
+    assert store.query('disk.dev1999.busy', now, now + 5) == [(now, 1.0), (now + 5, 1.0)]
+    store.close()
+
+def test_backend_selected_from_config(tmp_path):
+    """Test STORAGE_BACKEND picks the store"""
+    store = open_store({'STORAGE_BACKEND': 'segments', 'SEGMENT_PATH': str(tmp_path)})
+    assert isinstance(store, SegmentStore)
+    store.close()
+    with pytest.raises(ValueError):
+        open_store({'STORAGE_BACKEND': 'csv'})
+
+def test_window_sketch_merges_tiers(tmp_path):
+    """Test window percentiles come from 1h, 1m and raw pieces exactly once"""
+    store = SqliteStore(str(tmp_path / 'metrics.db'), chunk_samples=120)
+    hour = int(time.time()) // 3600 * 3600 - 3 * 3600
+    store.write_batch([(hour + i, 'cpu.percent', float(i % 97)) for i in range(3 * 3600)])
+    store.compact()
+
+    start, end = hour + 1234, hour + 3 * 3600 - 77
+    direct = DDSketch()
+    direct.update(v for _, v in store.query('cpu.percent', start, end))
+    merged = store.sketch('cpu.percent', start, end)
+    assert merged.count == end - start + 1
+    assert merged.positive == direct.positive and merged.zero == direct.zero
+
+    # Rollups from before sketches existed have none to offer
+    partition = partition_name(hour, store.tier('1h').prefix, store.tier('1h').span)
+    store._conn.execute(f'UPDATE {partition} SET sketch = NULL')
+    store._conn.commit()
+    assert store.sketch('cpu.percent', start, end) is None
+    assert store.sketch('cpu.percent', start, start + 600).count == 601
+    store.close()
@@ -0,0 +1,80 @@
+"""
+History import tests
+"""
+import gzip
+import time
+
+import pytest
+
+from app.services.export import encode_rows
+from app.services.importer import HistoryImporter, detect_format, open_export, parse_export
+from app.services.sqlite_store import SqliteStore
+
+def write_export(path, rows, fmt, compress=False):
+    """Write rows the way /api/metrics/export does"""
+    with open(path, 'wb') as f:
+        for chunk in encode_rows(iter(rows), fmt, ('value',), compress):
+            f.write(chunk)
+
+@pytest.mark.parametrize('fmt,name', [('ndjson', 'export.ndjson'), ('csv', 'export.csv.gz')])
+def test_import_rebuilds_exact_rollups(tmp_path, fmt, name):
+    """Test out-of-order imports, loaded twice, leave exact rollups"""
+    hour = int(time.time()) // 3600 * 3600 - 7200
+    rows = [('cpu.percent', hour + 3599 - i, float(i % 10)) for i in range(3600)]
+    path = str(tmp_path / name)
+    write_export(path, rows, fmt, compress=name.endswith('.gz'))
+    assert detect_format(path) == fmt
+
+    store = SqliteStore(str(tmp_path / 'metrics.db'), chunk_samples=120)
+    for _ in range(2):
+        importer = HistoryImporter(store, batch_size=1000)
+        with open_export(path) as stream:
+            assert importer.load(*parse_export(stream, fmt)) == 3600
+        stats = importer.finish()
+    assert stats['rows'] == 3600 and stats['buckets'] == 61
+
+    (hourly,) = store.query_tier('cpu.percent', hour, hour + 3599, store.tier('1h'))
+    assert (hourly.count, hourly.min, hourly.max, hourly.avg) == (3600, 0.0, 9.0, 4.5)
+    minutes = store.query_tier('cpu.percent', hour, hour + 3599, store.tier('1m'))
+    assert len(minutes) == 60 and all(b.count == 60 for b in minutes)
+    assert len(store.query('cpu.percent', hour, hour + 3599)) == 3600
+    store.close()
+
+def test_import_skips_unreadable_rows(tmp_path):
+    """Test malformed lines are counted, not fatal"""
+    path = tmp_path / 'export.csv.gz'
+    path.write_bytes(gzip.compress(b'series,ts,value\ncpu.percent,100,1.5\ncpu.percent,oops,2\n'))
+    store = SqliteStore(str(tmp_path / 'metrics.db'))
+    importer = HistoryImporter(store)
+    with open_export(str(path)) as stream:
+        columns, rows = parse_export(stream, 'csv')
+        assert importer.load(columns, rows) == 1
+    assert importer.skipped == 1
+    with pytest.raises(ValueError):
+        importer.load(columns, iter([]), tier='1m')
+    store.close()
+
+def test_ndjson_values_converted_like_csv(tmp_path):
+    """Test NDJSON rows with null or text values are skipped, not stored"""
+    path = tmp_path / 'export.ndjson'
+    path.write_text('{"series":"cpu.percent","ts":100,"value":1.5}\n'
+                    '{"series":"cpu.percent","ts":105,"value":null}\n'
+                    '{"series":"cpu.percent","ts":110,"value":"high"}\n'
+                    '{"series":"cpu.percent","ts":115,"value":"2.5"}\n'
+                    '{"series":null,"ts":120,"value":3}\n')
+    with open_export(str(path)) as stream:
+        columns, rows = parse_export(stream, 'ndjson')
+        assert list(rows) == [(100, 'cpu.percent', 1.5), None, None,
+                              (115, 'cpu.percent', 2.5), None]
+
+def test_non_finite_values_import_as_skipped(tmp_path):
+    """Test inf/nan, exported as null, come back as skipped rows"""
+    import math
+
+    path = str(tmp_path / 'export.ndjson')
+    write_export(path, [('cpu.percent', 100, 1.5), ('cpu.info', 105, math.inf),
+                        ('cpu.percent', 110, -math.inf), ('cpu.percent', 115, math.nan)],
+                 'ndjson')
+    with open_export(path) as stream:
+        columns, rows = parse_export(stream, 'ndjson')
+        assert list(rows) == [(100, 'cpu.percent', 1.5), None, None, None]
@@ -0,0 +1,95 @@
+"""
+Partition cache tests
+"""
+from collections import namedtuple
+from app.services.partitions import MountWatcher, PartitionCache
+
+Partition = namedtuple('Partition', 'device mountpoint fstype')
+
+class FakeWatcher:
+    """Mount watcher controlled by the test"""
+
+    def __init__(self):
+        self.flag = False
+
+    def changed(self):
+        changed, self.flag = self.flag, False
+        return changed
+
+    def close(self):
+        pass
+
+def make_cache(mounts, **kwargs):
+    """Build a cache over a mutable mount list, counting rebuilds"""
+    calls = []
+
+    def list_partitions():
+        calls.append(1)
+        return list(mounts)
+
+    watcher = FakeWatcher()
+    cache = PartitionCache(watcher=watcher, list_partitions=list_partitions, **kwargs)
+    return cache, watcher, calls
+
+def test_partition_list_rebuilt_only_on_mount_change():
+    """Test the partition list is cached until the mount table changes"""
+    mounts = [Partition('/dev/root', '/', 'ext4')]
+    cache, watcher, calls = make_cache(mounts)
+
+    assert [p['mountpoint'] for p in cache.partitions()] == ['/']
+    cache.partitions()
+    assert len(calls) == 1
+
+    mounts.append(Partition('tmpfs', '/tmp', 'tmpfs'))
+    watcher.flag = True
+    assert [p['mountpoint'] for p in cache.partitions()] == ['/', '/tmp']
+    assert len(calls) == 2
+
+def test_partition_filters(monkeypatch):
+    """Test fstype and mountpoint include/exclude filters"""
+    monkeypatch.setattr('app.services.partitions.statvfs_usage',
+                        lambda mountpoint: {'percent': 0.0})
+    mounts = [
+        Partition('/dev/root', '/', 'ext4'),
+        Partition('/dev/loop0', '/snap/core/1', 'squashfs'),
+        Partition('overlay', '/var/lib/docker/overlay2/x/merged', 'overlay'),
+        Partition('tmpfs', '/tmp', 'tmpfs'),
+    ]
+    cache, _, _ = make_cache(
+        mounts,
+        exclude_fstypes=['squashfs', ''],
+        exclude_mountpoints=['/var/lib/docker/*']
+    )
+    assert [p['mountpoint'] for p in cache.partitions()] == ['/', '/tmp']
+
+    cache, _, _ = make_cache(mounts, include_fstypes=['ext4'])
+    assert [p['mountpoint'] for p in cache.partitions()] == ['/']
+
+    cache, _, _ = make_cache(mounts, include_mountpoints=['/snap/*'])
+    assert [p['fstype'] for p in cache.partitions()] == ['squashfs']
+
+def test_usage_refreshed_on_its_own_schedule(monkeypatch):
+    """Test statvfs is only called when a mount's refresh is due"""
+    statvfs_calls = []
+
+    def fake_usage(mountpoint):
+        statvfs_calls.append(mountpoint)
+        return {'total': 100, 'used': 40, 'free': 60, 'percent': 40.0}
+
+    monkeypatch.setattr('app.services.partitions.statvfs_usage', fake_usage)
+    cache, _, _ = make_cache([Partition('/dev/root', '/', 'ext4')], usage_interval=60)
+    cache.partitions()
+    cache.partitions()
+    assert statvfs_calls == ['/']
+
+    cache._entries['/']['next_refresh'] = 0
+    cache.partitions()
+    assert statvfs_calls == ['/', '/']
+
+def test_mount_watcher_quiet_without_changes():
+    """Test the mountinfo watcher does not report spurious changes"""
+    watcher = MountWatcher()
+    try:
+        assert watcher.changed() is False
+    finally:
+        watcher.close()
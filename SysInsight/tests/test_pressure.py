@@ -0,0 +1,61 @@
+"""
+Pressure stall information tests
+"""
+from app.services.pressure import PressureMetrics, parse_pressure
+from app.services.system_metrics import system_metrics
+
+def write_pressure(root, cpu_total, memory_total):
+    """Write /proc/pressure style files"""
+    root.mkdir(exist_ok=True)
+    (root / 'cpu').write_text(
+        f'some avg10=12.50 avg60=3.00 avg300=1.00 total={cpu_total}\n'
+        'full avg10=0.00 avg60=0.00 avg300=0.00 total=0\n'
+    )
+    (root / 'memory').write_text(
+        f'some avg10=0.00 avg60=0.00 avg300=0.00 total={memory_total}\n'
+        f'full avg10=0.00 avg60=0.00 avg300=0.00 total={memory_total // 2}\n'
+    )
+
+def test_parse_pressure():
+    """Test parsing some/full lines"""
+    lines = parse_pressure('some avg10=1.50 avg60=0.25 avg300=0.00 total=4200\n')
+    assert lines == {'some': {'avg10': 1.5, 'avg60': 0.25, 'avg300': 0.0, 'total': 4200}}
+
+def test_stall_percent_from_total(tmp_path):
+    """Test stall rates come from total deltas and missing files are skipped"""
+    root = tmp_path / 'pressure'
+    write_pressure(root, cpu_total=0, memory_total=0)
+    metrics = PressureMetrics(str(root))
+    assert PressureMetrics.available(str(root))
+    metrics.collect(now=0.0)
+
+    # 0.5 s of CPU stall and 0.2 s of memory stall over 2 s
+    write_pressure(root, cpu_total=500_000, memory_total=200_000)
+    data = metrics.collect(now=2.0)
+
+    assert data['cpu']['some']['avg10'] == 12.5
+    assert data['cpu']['some']['stall_percent'] == 25.0
+    assert data['cpu']['some']['total_ms'] == 500
+    assert data['memory']['some']['stall_percent'] == 10.0
+    assert data['memory']['full']['stall_percent'] == 5.0
+    assert 'io' not in data
+
+def test_pressure_alerts():
+    """Test PSI thresholds produce per-resource alerts"""
+    metrics = {'pressure': {
+        'cpu': {'some': {'avg10': 60.0}},
+        'memory': {'some': {'avg10': 12.0}},
+        'io': {'some': {'avg10': 1.0}}
+    }}
+    config = {
+        'DISK_WARNING_THRESHOLD': 80, 'DISK_CRITICAL_THRESHOLD': 90,
+        'PSI_CPU_WARNING_THRESHOLD': 20, 'PSI_CPU_CRITICAL_THRESHOLD': 50,
+        'PSI_MEMORY_WARNING_THRESHOLD': 10, 'PSI_MEMORY_CRITICAL_THRESHOLD': 30,
+        'PSI_IO_WARNING_THRESHOLD': 20, 'PSI_IO_CRITICAL_THRESHOLD': 50
+    }
+    alerts = system_metrics.evaluate_thresholds(metrics, config)
+    assert alerts == {
+        'cpu_pressure': 'critical',
+        'memory_pressure': 'warning',
+        'io_pressure': 'normal'
+    }
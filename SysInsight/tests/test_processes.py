@@ -0,0 +1,46 @@
+"""
+Process table tests
+"""
+import os
+import time
+import pytest
+from app.services.processes import ProcessTable, select_top
+
+def burn_cpu(seconds):
+    """Keep this process busy"""
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        pass
+
+@pytest.mark.parametrize('use_proc', [True, False])
+def test_cpu_percent_from_deltas(use_proc):
+    """Test a busy process shows up at the top by CPU on the second sample"""
+    table = ProcessTable(top_n=5, use_proc=use_proc)
+    table.sample()
+    burn_cpu(0.3)
+    data = table.sample()
+
+    assert data['count'] > 0
+    top = data['top']['cpu']
+    assert len(top) <= 5
+    me = [row for row in top if row['pid'] == os.getpid()]
+    assert me and me[0]['cpu_percent'] > 10
+    assert me[0]['name']
+    assert me[0]['rss_mb'] > 0
+
+def test_state_tracks_live_pids_only():
+    """Test per-PID state is pruned to the processes seen in the last scan"""
+    table = ProcessTable()
+    data = table.sample()
+    assert len(table._states) == data['count']
+    assert os.getpid() in table._states
+
+def test_select_top():
+    """Test choosing and limiting a top-N list"""
+    sample = {'top': {'cpu': [{'pid': 1}, {'pid': 2}], 'memory': [], 'io': []}}
+    assert select_top(sample, 'cpu', 1) == [{'pid': 1}]
+    assert select_top(sample, 'cpu', None) == [{'pid': 1}, {'pid': 2}]
+    with pytest.raises(ValueError):
+        select_top(sample, 'name', 1)
+    with pytest.raises(ValueError):
+        select_top(sample, 'cpu', -1)
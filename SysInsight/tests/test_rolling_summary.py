@@ -0,0 +1,55 @@
+"""
+Rolling-window statistics tests
+"""
+import json
+import random
+import statistics
+
+import pytest
+
+from app.services.rolling_summary import RollingSummary, RollingWindow
+
+def test_window_matches_recomputation():
+    """Test incremental statistics match a full recomputation as samples expire"""
+    rng = random.Random(7)
+    window = RollingWindow(60)
+    kept = []
+    ts = 1700000000
+    for step in range(2000):
+        ts += rng.choice((1, 2, 5))
+        # Large offset: sums taken naively would cancel out
+        value = 1e9 + rng.gauss(0, 50) + step
+        window.add(ts, value)
+        window.expire(ts)
+        kept = [(t, v) for t, v in kept + [(ts, value)] if t > ts - 60]
+        if step % 97 != 96:
+            continue
+        stats = window.stats()
+        times, values = zip(*kept)
+        assert stats['count'] == len(kept)
+        assert (stats['min'], stats['max']) == (round(min(values), 3), round(max(values), 3))
+        assert stats['mean'] == pytest.approx(statistics.fmean(values), abs=1e-3)
+        assert stats['stddev'] == pytest.approx(statistics.pstdev(values), abs=1e-3)
+        assert stats['slope'] == pytest.approx(
+            statistics.linear_regression(times, values).slope, abs=1e-5)
+
+    window.expire(ts + 60)
+    assert window.stats() is None and window.n == 0
+
+def test_summary_expires_series_and_encodes_once():
+    """Test the pre-encoded summary covers each window and drops stale series"""
+    summary = RollingSummary((60, 300))
+    summary.update([(1000 + i, 'cpu.percent', float(i)) for i in range(0, 300, 5)], now=1300)
+    summary.update([(1299, 'disk.gone', 1.0)], now=1300)
+    data = json.loads(summary.body)
+    assert data['windows'] == {'1m': 60, '5m': 300}
+    cpu = data['series']['cpu.percent']
+    assert cpu['1m']['count'] == 11 and cpu['1m']['min'] == 245.0
+    assert cpu['5m']['count'] == 59 and cpu['5m']['slope'] == pytest.approx(1.0)
+    assert data['series']['disk.gone']['1m']['slope'] is None
+
+    summary.update([], now=1360)
+    data = json.loads(summary.body)
+    assert data['series']['cpu.percent']['1m'] is None
+    summary.update([], now=1600)
+    assert len(summary) == 0
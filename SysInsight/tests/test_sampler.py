@@ -0,0 +1,57 @@
+"""
+Background sampler tests
+"""
+import time
+from app.services.sampler import MetricsSampler
+
+def fake_collect():
+    """Return a fixed metrics snapshot"""
+    return {'cpu': {'percent': 12.5}, 'timestamp': 'now'}
+
+def test_latest_samples_on_demand():
+    """Test snapshot is collected lazily when the thread is not running"""
+    sampler = MetricsSampler(collect=fake_collect, interval=60)
+    data = sampler.latest()
+    assert data['cpu']['percent'] == 12.5
+    assert 'sample_age' in data
+    assert data['sample_age'] >= 0
+
+def test_latest_section():
+    """Test a single section is returned with its sample age"""
+    sampler = MetricsSampler(collect=fake_collect, interval=60)
+    data = sampler.latest('cpu')
+    assert data == {'percent': 12.5, 'sample_age': data['sample_age']}
+
+def test_background_thread_refreshes_snapshot():
+    """Test the background thread publishes samples without requests"""
+    calls = []
+
+    def collect():
+        calls.append(1)
+        return {'count': len(calls)}
+
+    sampler = MetricsSampler(collect=collect, interval=0.01)
+    sampler.start()
+    try:
+        deadline = time.monotonic() + 2
+        while len(calls) < 3 and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        sampler.stop(timeout=1)
+
+    assert len(calls) >= 3
+    assert sampler.latest()['count'] >= 3
+
+def test_failed_collection_keeps_previous_snapshot():
+    """Test a collector error does not discard the last good sample"""
+    results = [{'ok': True}]
+
+    def collect():
+        if not results:
+            raise OSError('boom')
+        return results.pop()
+
+    sampler = MetricsSampler(collect=collect, interval=60)
+    sampler.sample_once()
+    sampler.sample_once()
+    assert sampler.latest()['ok'] is True
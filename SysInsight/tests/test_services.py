@@ -1,17 +1,49 @@
 """
 Service layer tests
 """
+import os
 import pytest
-from app.services.system_metrics import system_metrics
+import psutil
+import time
+from collections import namedtuple
+from app.services.system_metrics import (
+    system_metrics, ProcReader, PsutilReader, SystemMetricsService, SubSampler,
+    CpuTimes, cpu_utilisation, DiskCounters, disk_io_rates, TCP_STATE_RE
+)
+
+proc_only = pytest.mark.skipif(
+    not ProcReader.available(), reason='/proc fast path requires Linux'
+)
 
 def test_get_cpu_metrics():
     """Test CPU metrics collection"""
     data = system_metrics.get_cpu_metrics()
     assert 'percent' in data
-    assert 'cores' in data
+    assert 'frequency_mhz' in data
     assert 'timestamp' in data
     assert isinstance(data['percent'], (int, float))
     assert 0 <= data['percent'] <= 100
+    assert 'iowait' in data['breakdown']
+    assert all(0 <= core <= 100 for core in data['per_core'])
+
+def test_cpu_metrics_do_not_block():
+    """Test CPU metrics are computed from deltas without sleeping"""
+    started = time.monotonic()
+    for _ in range(3):
+        system_metrics.get_cpu_metrics()
+    assert time.monotonic() - started < 0.5
+
+def test_cpu_utilisation_breakdown():
+    """Test utilisation and breakdown from two cumulative readings"""
+    prev = CpuTimes(10, 0, 5, 80, 5, 0, 0, 0)
+    cur = CpuTimes(40, 0, 15, 120, 15, 5, 0, 5)
+    usage = cpu_utilisation(prev, cur)
+    assert usage['user'] == 30.0
+    assert usage['system'] == 10.0
+    assert usage['iowait'] == 10.0
+    assert usage['steal'] == 5.0
+    assert usage['percent'] == 50.0
+    assert cpu_utilisation(cur, cur) is None
 
 def test_get_memory_metrics():
     """Test memory metrics collection"""
@@ -19,8 +51,21 @@ def test_get_memory_metrics():
     assert 'virtual' in data
     assert 'swap' in data
     assert 'timestamp' in data
-    assert 'total_gb' in data['virtual']
+    assert 'used_gb' in data['virtual']
     assert 'percent' in data['virtual']
+    # Static totals moved to host info
+    assert 'total_gb' not in data['virtual']
+
+def test_get_host_info():
+    """Test static host facts"""
+    data = system_metrics.get_host_info()
+    assert data['cpu']['logical'] >= 1
+    assert 'physical' in data['cpu']
+    assert data['memory']['total_gb'] > 0
+    assert 'kernel' in data
+    assert 'boot_time' in data
+    assert isinstance(data['partitions'], list)
+    assert system_metrics.get_host_info() is data
 
 def test_get_disk_metrics():
     """Test disk metrics collection"""
@@ -28,6 +73,93 @@ def test_get_disk_metrics():
     assert 'partitions' in data
     assert 'timestamp' in data
     assert isinstance(data['partitions'], list)
+    assert isinstance(data['devices'], list)
+    for device in data['devices']:
+        assert device['read_mb_s'] >= 0
+        assert 0 <= device['util_percent'] <= 100
+
+def test_disk_io_rates():
+    """Test per-device rates from counter deltas"""
+    deltas = DiskCounters(
+        read_count=100, write_count=300,
+        read_bytes=20 * 1024**2, write_bytes=60 * 1024**2,
+        read_time=400, write_time=1200, busy_time=1000
+    )
+    rates = disk_io_rates(deltas, 2.0)
+    assert rates['read_mb_s'] == 10.0
+    assert rates['write_mb_s'] == 30.0
+    assert rates['read_iops'] == 50.0
+    assert rates['write_iops'] == 150.0
+    assert rates['await_ms'] == 4.0
+    assert rates['util_percent'] == 50.0
+
+def test_get_network_metrics():
+    """Test network metrics collection"""
+    data = system_metrics.get_network_metrics()
+    assert 'interfaces' in data
+    assert 'timestamp' in data
+    assert data['tcp']['total'] == sum(
+        count for state, count in data['tcp'].items() if state != 'total'
+    )
+    for interface in data['interfaces']:
+        assert interface['bytes_recv_s'] >= 0
+
+def test_tcp_state_column_parsing():
+    """Test only the state column of /proc/net/tcp lines is matched"""
+    table = (
+        b'  sl  local_address rem_address   st tx_queue rx_queue tr tm->when\n'
+        b'   0: 0100007F:BC8F 00000000:0000 0A 00000000:00000000 00:00000000\n'
+        b'   1: 0100007F:1F90 0100007F:C350 01 00000000:00000000 00:00000000\n'
+        b'10000: 0100007F:1F90 0100007F:C351 06 00000000:00000000 00:00000000\n'
+    )
+    assert TCP_STATE_RE.findall(table) == [b'0A', b'01', b'06']
+
+def test_get_kernel_metrics(monkeypatch):
+    """Test load, scheduler and paging activity collection"""
+    cores = system_metrics.get_host_info()['cpu']['logical']
+    # The core count comes from the static host facts, not a call per sample
+    monkeypatch.setattr(psutil, 'cpu_count', None)
+    data = system_metrics.get_kernel_metrics()
+    assert 'error' not in data
+    assert data['load']['1m'] >= 0
+    assert abs(data['load']['per_core_1m'] - data['load']['1m'] / cores) <= 0.01
+    for key in ('context_switches_s', 'interrupts_s', 'major_faults_s',
+                'swap_in_kb_s', 'swap_out_kb_s'):
+        assert data[key] >= 0
+
+def test_subsampler_catches_short_spikes():
+    """Test sub-interval readings expose a burst hidden by the interval average"""
+    class Reader:
+        user = idle = 0.0
+
+        def cpu_times(self):
+            return CpuTimes(self.user, 0, 0, self.idle, 0, 0, 0, 0), []
+
+        def memory(self):
+            return {'percent': 40.0}
+
+        def disk_io(self):
+            return {}
+
+        def net_io(self):
+            return {}
+
+    reader = Reader()
+    subsampler = SubSampler(reader)
+    subsampler.sample(now=0.0)
+    for step, busy in enumerate([False, False, True, False]):
+        # One 0.25s burst at 100% among idle readings
+        if busy:
+            reader.user += 0.25
+        else:
+            reader.idle += 0.25
+        subsampler.sample(now=(step + 1) * 0.25)
+
+    window = subsampler.take('cpu')['percent']
+    assert window['max'] == 100.0
+    assert window['avg'] == 25.0
+    assert window['samples'] == 4
+    assert subsampler.take('cpu') == {'percent': None}
 
 def test_get_all_metrics():
     """Test all metrics collection"""
@@ -35,6 +167,7 @@ def test_get_all_metrics():
     assert 'cpu' in data
     assert 'memory' in data
     assert 'disk' in data
+    assert 'network' in data
     assert 'timestamp' in data
 
 def test_evaluate_thresholds():
@@ -58,3 +191,66 @@ def test_evaluate_thresholds():
     assert alerts['cpu'] == 'warning'
     assert alerts['memory'] == 'normal'
     assert alerts['disk'] == 'warning'
+
+@proc_only
+def test_proc_reader_matches_psutil():
+    """Test the /proc fast path agrees with psutil"""
+    proc, fallback = ProcReader(), PsutilReader()
+    try:
+        total, per_cpu = proc.cpu_times()
+        ref_total, ref_per_cpu = fallback.cpu_times()
+        assert len(per_cpu) == len(ref_per_cpu)
+        assert abs(total.idle - ref_total.idle) < 5 * len(per_cpu)
+
+        mem, ref_mem = proc.memory(), fallback.memory()
+        assert mem['total'] == ref_mem['total']
+        assert mem['swap_total'] == ref_mem['swap_total']
+        assert 0 <= mem['percent'] <= 100
+
+        assert set(proc.disk_io()) == set(fallback.disk_io())
+
+        gauges, counters = proc.kernel_activity()
+        ref_gauges, ref_counters = fallback.kernel_activity()
+        assert abs(gauges.load15 - ref_gauges.load15) < 1
+        assert counters.ctx_switches <= ref_counters.ctx_switches
+        assert counters.major_faults <= counters.page_faults
+    finally:
+        proc.close()
+
+@proc_only
+def test_proc_reader_grows_buffer():
+    """Test files larger than the read buffer are read completely"""
+    reader = ProcReader()
+    try:
+        reader._bufsize['/proc/meminfo'] = 16
+        assert reader.memory()['total'] > 0
+        assert reader._bufsize['/proc/meminfo'] > 16
+    finally:
+        reader.close()
+
+def test_psutil_fallback():
+    """Test the service works with the fast path disabled"""
+    service = SystemMetricsService(use_proc=False)
+    assert service.reader.name == 'psutil'
+    data = service.get_memory_metrics()
+    assert 'percent' in data['virtual']
+    assert 'error' not in data
+
+def test_psutil_disk_io_skips_partitions(monkeypatch):
+    """Test partitions are not counted as devices alongside their disk"""
+    sdiskio = namedtuple('sdiskio', 'read_count write_count read_bytes write_bytes '
+                                    'read_time write_time busy_time')
+    counters = {
+        'sda': sdiskio(30, 40, 3000, 4000, 3, 4, 7),
+        'sda1': sdiskio(10, 15, 1000, 1500, 1, 2, 3),
+        'sda2': sdiskio(20, 25, 2000, 2500, 2, 2, 4),
+        'nvme0n1': sdiskio(5, 6, 500, 600, 1, 1, 2),
+        'nvme0n1p1': sdiskio(5, 6, 500, 600, 1, 1, 2)
+    }
+    monkeypatch.setattr(psutil, 'disk_io_counters', lambda perdisk=False: counters)
+    monkeypatch.setattr(os.path, 'isdir', lambda path: path == '/sys/block')
+    monkeypatch.setattr(os.path, 'exists',
+                        lambda path: path in ('/sys/block/sda', '/sys/block/nvme0n1'))
+    devices = PsutilReader().disk_io()
+    assert set(devices) == {'sda', 'nvme0n1'}
+    assert sum(d.read_bytes for d in devices.values()) == 3500
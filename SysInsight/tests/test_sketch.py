@@ -0,0 +1,46 @@
+"""
+Quantile sketch tests
+"""
+import random
+
+from app.services import sketch as sketch_module
+from app.services.sketch import ALPHA, DDSketch, merge_encoded
+
+def test_quantiles_within_relative_error():
+    """Test merged sketches equal one fed directly and stay within ALPHA"""
+    rng = random.Random(7)
+    values = [rng.lognormvariate(0, 2) * rng.choice((1, 1, 1, -1)) for _ in range(5000)]
+    values += [0.0] * 100
+    direct = DDSketch()
+    direct.update(values)
+    merged = DDSketch()
+    for i in range(0, len(values), 60):
+        part = DDSketch()
+        part.update(values[i:i + 60])
+        merged.merge(part)
+    assert merged.count == len(values)
+    assert (merged.positive, merged.negative, merged.zero) == \
+        (direct.positive, direct.negative, direct.zero)
+
+    ordered = sorted(values)
+    for q in (0, 0.01, 0.5, 0.95, 0.99, 1):
+        truth = ordered[int(q * (len(values) - 1))]
+        assert abs(merged.quantile(q) - truth) <= ALPHA * abs(truth) + 1e-12
+    assert DDSketch().quantile(0.5) is None
+
+def test_encoding_and_bin_limit(monkeypatch):
+    """Test sketches round-trip and fold low bins past MAX_BINS"""
+    first, second = DDSketch(), DDSketch()
+    first.update([-3.5, 0.0, 1e-12, 2.0, 2.0, 1e9])
+    second.update([7.0])
+    data = merge_encoded(first.to_bytes(), second.to_bytes())
+    decoded = DDSketch.from_bytes(data)
+    assert decoded.count == 7 and decoded.zero == 2
+    assert merge_encoded(None, data) == data
+    assert len(first.to_bytes()) == sketch_module.HEADER.size + 6 * 3
+
+    monkeypatch.setattr(sketch_module, 'MAX_BINS', 8)
+    wide = DDSketch()
+    wide.update(1.5 ** i for i in range(40))
+    assert len(wide.positive) == 8 and wide.count == 40
+    assert abs(wide.quantile(1) - 1.5 ** 39) <= ALPHA * 1.5 ** 39
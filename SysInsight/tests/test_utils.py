@@ -0,0 +1,59 @@
+"""
+Utility tests
+"""
+import random
+
+from app.utils.downsample import lttb
+from app.utils.rates import RateTracker
+from app.utils.stats import P2Quantile, WindowStats
+
+def test_rate_tracker():
+    """Test rates between readings, resets and pruning"""
+    tracker = RateTracker()
+    assert tracker.rates('eth0', (100, 10), now=10.0) is None
+    assert tracker.rates('eth0', (300, 30), now=12.0) == (100.0, 10.0)
+
+    # Counter reset yields no rate, then resumes from the new baseline
+    assert tracker.rates('eth0', (5, 1), now=13.0) is None
+    assert tracker.rates('eth0', (15, 2), now=14.0) == (10.0, 1.0)
+
+    tracker.rates('eth1', (1,), now=14.0)
+    tracker.forget_missing(['eth1'])
+    assert 'eth0' not in tracker
+    assert len(tracker) == 1
+
+def test_window_stats():
+    """Test min/max/avg/p95 of a window and reset"""
+    window = WindowStats()
+    assert window.summary() is None
+    for value in [5.0] * 19 + [100.0]:
+        window.add(value)
+    summary = window.summary()
+    assert summary == {'min': 5.0, 'max': 100.0, 'avg': 9.75, 'p95': 9.75, 'samples': 20}
+
+    window.reset()
+    assert window.summary() is None
+
+def test_p2_quantile_bounded_memory():
+    """Test the streaming p95 stays close to the exact value in 5 markers"""
+    rng = random.Random(42)
+    values = [rng.uniform(0, 100) for _ in range(5000)]
+    quantile = P2Quantile(0.95)
+    for value in values:
+        quantile.add(value)
+    exact = sorted(values)[int(0.95 * (len(values) - 1))]
+    assert len(quantile.heights) == 5
+    assert abs(quantile.value() - exact) < 1.0
+
+def test_lttb_keeps_spikes_and_ends():
+    """Test downsampling to a budget keeps the endpoints and a lone spike"""
+    xs = list(range(1000))
+    ys = [1.0] * 1000
+    ys[437] = 100.0
+    kept = lttb(xs, ys, 50)
+    assert len(kept) == 50
+    assert kept[0] == 0 and kept[-1] == 999
+    assert kept == sorted(kept)
+    assert 437 in kept
+    # Under budget: everything is kept
+    assert lttb(xs[:10], ys[:10], 50) == list(range(10))